@@ -7,10 +7,17 @@ import jwt
 import traceback
 from uuid import UUID
 from app.services.logs import log_error
+from app.token_cache import TokenVerifier
 
 def create_app():
     app = Flask(__name__)
     
+    # Secret and algorithms are resolved once; verified tokens are cached until they expire
+    token_verifier = TokenVerifier(os.environ.get("JWT_SECRET"), algorithms=["HS256"])
+    app.extensions["token_verifier"] = token_verifier
+    
+    from app.routes.batch import BATCH_USER_ENVIRON_KEY
+    
     # Setup JWT authentication middleware
     @app.before_request
     def authenticate():
@@ -18,6 +25,16 @@ def create_app():
         if request.method == 'OPTIONS':
             return
             
+        # GET /metrics checks its own monitoring token instead of a user token
+        if request.endpoint == 'metrics.get_metrics':
+            return
+            
+        # Sub-requests of POST /batch reuse the batch's authentication
+        batch_user_id = request.environ.get(BATCH_USER_ENVIRON_KEY)
+        if batch_user_id:
+            request.user_id = batch_user_id
+            return
+            
         # Get the auth token
         auth_header = request.headers.get('Authorization')
         
@@ -29,8 +46,7 @@ def create_app():
         
         try:
             # Decode JWT token
-            jwt_secret = os.environ.get("JWT_SECRET")
-            payload = jwt.decode(token, jwt_secret, algorithms=["HS256"])
+            payload = token_verifier.verify(token)
             
             # Add user_id to request object for controllers to use
             request.user_id = payload.get('user_id')
@@ -48,11 +64,17 @@ def create_app():
     from app.routes.expenses import expenses_bp
     from app.routes.ai_tips import ai_tips_bp
     from app.routes.auth import auth_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.batch import batch_bp
+    from app.routes.dashboard import dashboard_bp
     
     app.register_blueprint(categories_bp)
     app.register_blueprint(expenses_bp)
     app.register_blueprint(ai_tips_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(dashboard_bp)
     
     # Error handlers
     @app.errorhandler(400)
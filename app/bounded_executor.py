@@ -0,0 +1,228 @@
+"""Bounded Executor
+~~~~~~~~~~~~~~~~
+Process-wide thread pool with a bounded queue and per-task deadlines.
+
+Tasks are submitted together with an absolute deadline.  The caller waits at
+most until that deadline and then returns, whatever the task is doing; the
+pool never blocks a request on a late task.  A task still queued when its
+deadline passes is dropped without running, one already running finishes in
+the background and its result is discarded.  When ``max_workers +
+max_queue`` tasks are pending, new submissions are rejected immediately
+instead of queueing behind work that would miss its deadline anyway.
+
+Queue wait and execution time are tracked separately, so metrics show whether
+slow responses come from a saturated pool or from slow tasks.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Deque, Dict, List, Sequence, Tuple, TypeVar
+
+__all__ = [
+    "BoundedExecutor",
+    "DeadlineExceeded",
+    "ExecutorSaturated",
+    "get_bounded_executor",
+    "bounded_executor_metrics",
+]
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(Exception):
+    """Raised by `BoundedExecutor.run` when the queue is full."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised by `BoundedExecutor.run` when the task misses its deadline."""
+
+
+class _Dropped(Exception):
+    """Internal: the task was dequeued after its deadline and not run."""
+
+
+class BoundedExecutor:
+    """Thread pool with queue-depth limit, deadlines and timing metrics."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_workers: int = 4,
+        max_queue: int = 16,
+        max_samples: int = 500,
+    ) -> None:
+        self.name = name
+        self.max_workers = int(max_workers)
+        self.max_queue = int(max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-worker")
+
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._running = 0
+        self._queue_waits: Deque[float] = deque(maxlen=max_samples)
+        self._run_times: Deque[float] = deque(maxlen=max_samples)
+
+        # Counters exported as metrics
+        self._completed = 0
+        self._rejected = 0
+        self._dropped = 0
+        self._timed_out = 0
+        self._failed = 0
+
+    # ---------------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------------
+
+    def run(self, fn: Callable[..., T], *args: Any, timeout: float, **kwargs: Any) -> T:
+        """Run ``fn(*args, **kwargs)`` on the pool and wait at most *timeout* seconds.
+
+        Raises `ExecutorSaturated` without queueing when the pool is full and
+        `DeadlineExceeded` once the deadline passes; exceptions raised by *fn*
+        propagate unchanged.
+        """
+        deadline = time.monotonic() + timeout
+        return self._wait(self._submit(fn, args, kwargs, deadline), deadline, timeout)
+
+    def run_many(
+        self, calls: Sequence[Callable[[], T]], *, timeout: float
+    ) -> List[Tuple[T | None, BaseException | None]]:
+        """Run independent *calls* in parallel under one shared deadline.
+
+        Returns one ``(result, None)`` or ``(None, exception)`` pair per call,
+        in order; calls that do not fit in the queue fail with
+        `ExecutorSaturated` and late ones with `DeadlineExceeded`.
+        """
+        deadline = time.monotonic() + timeout
+        futures: List[Future | ExecutorSaturated] = []
+        for fn in calls:
+            try:
+                futures.append(self._submit(fn, (), {}, deadline))
+            except ExecutorSaturated as exc:
+                futures.append(exc)
+
+        outcomes: List[Tuple[T | None, BaseException | None]] = []
+        for future in futures:
+            if isinstance(future, ExecutorSaturated):
+                outcomes.append((None, future))
+                continue
+            try:
+                outcomes.append((self._wait(future, deadline, timeout), None))
+            except Exception as exc:  # noqa: BLE001 - reported per call
+                outcomes.append((None, exc))
+        return outcomes
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, outcome counters and queue-wait vs. run-time percentiles."""
+        with self._lock:
+            waits = list(self._queue_waits)
+            runs = list(self._run_times)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "dropped": self._dropped,
+                "timed_out": self._timed_out,
+                "queue_wait_p50": _percentile(waits, 50),
+                "queue_wait_p95": _percentile(waits, 95),
+                "run_time_p50": _percentile(runs, 50),
+                "run_time_p95": _percentile(runs, 95),
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; queued tasks are cancelled."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------------------------------------------------------------
+    # Private helpers
+    # ---------------------------------------------------------------------
+
+    def _submit(self, fn: Callable[..., T], args: tuple, kwargs: dict, deadline: float) -> Future:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(f"Executor '{self.name}' queue is full")
+            self._pending += 1
+        return self._pool.submit(self._execute, fn, args, kwargs, time.monotonic(), deadline)
+
+    def _wait(self, future: Future, deadline: float, timeout: float) -> T:
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except (FutureTimeoutError, _Dropped, CancelledError):
+            # A queued task is cancelled right away; a running one finishes
+            # in the background and releases its slot in _execute.
+            if future.cancel():
+                self._release()
+            with self._lock:
+                self._timed_out += 1
+            raise DeadlineExceeded(f"Task on executor '{self.name}' missed its {timeout:.2f}s deadline")
+
+    def _execute(self, fn: Callable[..., T], args: tuple, kwargs: dict, submitted_at: float, deadline: float) -> T:
+        started_at = time.monotonic()
+        with self._lock:
+            self._queue_waits.append(started_at - submitted_at)
+            if started_at >= deadline:
+                # Nobody is waiting for the result any more
+                self._dropped += 1
+                self._pending -= 1
+                raise _Dropped()
+            self._running += 1
+
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._run_times.append(time.monotonic() - started_at)
+                self._running -= 1
+                self._pending -= 1
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+
+def _percentile(values: list, pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+
+_executors: Dict[str, BoundedExecutor] = {}
+_registry_lock = threading.Lock()
+
+
+def get_bounded_executor(name: str, **kwargs: Any) -> BoundedExecutor:
+    """Return the process-wide executor for *name*, creating it on first use."""
+    with _registry_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = BoundedExecutor(name, **kwargs)
+        return executor
+
+
+def bounded_executor_metrics() -> Dict[str, Any]:
+    """Metrics of every executor created in this process, keyed by name."""
+    with _registry_lock:
+        executors = list(_executors.values())
+    return {executor.name: executor.metrics() for executor in executors}
@@ -0,0 +1,242 @@
+"""Circuit Breaker
+~~~~~~~~~~~~~~~
+Process-wide circuit breaker with adaptive timeouts for calls to external
+services (OpenRouter).
+
+The breaker keeps a rolling window of recent calls.  When the error rate or
+the share of slow calls in that window crosses a threshold it *opens* and
+callers fail fast instead of waiting out their timeouts.  After a cool-down it
+becomes *half-open* and lets a single probe through; a successful probe closes
+it again, a failed one re-opens it.
+
+Per-call timeouts follow the observed p95 latency of successful calls
+(times a safety multiplier), capped by the caller's configured timeout.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, NamedTuple
+
+__all__ = [
+    "BreakerState",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "get_circuit_breaker",
+    "circuit_breaker_metrics",
+]
+
+logger = logging.getLogger("circuit_breaker")
+
+
+class BreakerState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the breaker is open."""
+
+
+class _Call(NamedTuple):
+    at: float
+    ok: bool
+    latency: float
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker driven by rolling error rate and latency."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 8.0,
+        slow_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        timeout_multiplier: float = 1.5,
+        min_timeout: float = 2.0,
+        max_samples: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.window_seconds = float(window_seconds)
+        self.min_calls = int(min_calls)
+        self.error_rate_threshold = float(error_rate_threshold)
+        self.slow_call_seconds = float(slow_call_seconds)
+        self.slow_rate_threshold = float(slow_rate_threshold)
+        self.open_seconds = float(open_seconds)
+        self.timeout_multiplier = float(timeout_multiplier)
+        self.min_timeout = float(min_timeout)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._calls: Deque[_Call] = deque(maxlen=max_samples)
+        self._state = BreakerState.closed
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        # Counters exported as metrics
+        self._times_opened = 0
+        self._rejected = 0
+
+    # ---------------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------------
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self) -> None:
+        """Admit a call or raise `CircuitOpenError` to fail fast."""
+        with self._lock:
+            state = self._current_state()
+            if state is BreakerState.closed:
+                return
+            if state is BreakerState.half_open and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self._rejected += 1
+        raise CircuitOpenError(f"Circuit '{self.name}' is open, failing fast")
+
+    def record_success(self, latency: float) -> None:
+        """Record a completed call."""
+        self._record(True, latency)
+
+    def record_failure(self, latency: float) -> None:
+        """Record a failed call (timeout, transport error or 5xx)."""
+        self._record(False, latency)
+
+    def timeout_for(self, default: float) -> float:
+        """Adaptive per-call timeout: p95 latency x multiplier, capped by *default*."""
+        with self._lock:
+            latencies = [c.latency for c in self._window() if c.ok]
+        if len(latencies) < self.min_calls:
+            return default
+        adaptive = _percentile(latencies, 95) * self.timeout_multiplier
+        return min(default, max(self.min_timeout, adaptive))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of breaker state and rolling-window statistics."""
+        with self._lock:
+            state = self._current_state()
+            calls = self._window()
+            latencies = [c.latency for c in calls if c.ok]
+            return {
+                "state": state.value,
+                "calls": len(calls),
+                "error_rate": _rate(calls, lambda c: not c.ok),
+                "slow_rate": _rate(calls, self._is_slow),
+                "p95_latency": _percentile(latencies, 95) if latencies else None,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+            }
+
+    def reset(self) -> None:
+        """Close the breaker and forget all recorded calls."""
+        with self._lock:
+            self._calls.clear()
+            self._state = BreakerState.closed
+            self._probe_in_flight = False
+
+    # ---------------------------------------------------------------------
+    # Private helpers (callers must hold ``self._lock``)
+    # ---------------------------------------------------------------------
+
+    def _record(self, ok: bool, latency: float) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state is BreakerState.half_open:
+                self._probe_in_flight = False
+                if ok:
+                    self._transition(BreakerState.closed)
+                    self._calls.clear()
+                else:
+                    self._open()
+                return
+
+            self._calls.append(_Call(self._clock(), ok, float(latency)))
+            if state is BreakerState.closed and self._should_trip():
+                self._open()
+
+    def _current_state(self) -> BreakerState:
+        if self._state is BreakerState.open and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(BreakerState.half_open)
+        return self._state
+
+    def _window(self) -> list:
+        cutoff = self._clock() - self.window_seconds
+        while self._calls and self._calls[0].at < cutoff:
+            self._calls.popleft()
+        return list(self._calls)
+
+    def _is_slow(self, call: _Call) -> bool:
+        return call.latency >= self.slow_call_seconds
+
+    def _should_trip(self) -> bool:
+        calls = self._window()
+        if len(calls) < self.min_calls:
+            return False
+        return (
+            _rate(calls, lambda c: not c.ok) >= self.error_rate_threshold
+            or _rate(calls, self._is_slow) >= self.slow_rate_threshold
+        )
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._times_opened += 1
+        self._transition(BreakerState.open)
+
+    def _transition(self, state: BreakerState) -> None:
+        if state is not self._state:
+            logger.warning(
+                "circuit_breaker.transition",
+                extra={"breaker": self.name, "from": self._state.value, "to": state.value},
+            )
+        self._state = state
+
+
+def _rate(calls: list, predicate: Callable[[_Call], bool]) -> float:
+    if not calls:
+        return 0.0
+    return sum(1 for c in calls if predicate(c)) / len(calls)
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, **kwargs: Any) -> CircuitBreaker:
+    """Return the process-wide breaker for *name*, creating it on first use."""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+def circuit_breaker_metrics() -> Dict[str, Any]:
+    """Metrics of every breaker created in this process, keyed by name."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.metrics() for breaker in breakers}
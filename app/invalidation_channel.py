@@ -0,0 +1,159 @@
+"""Invalidation Channel
+~~~~~~~~~~~~~~~~~~~~
+Cross-process cache invalidation for workers on the same host.
+
+Each cache key has a version counter stored in a small SQLite file shared by
+all gunicorn workers.  Writers bump the version with `publish`; readers
+compare the version they cached a value under with the current one and
+refetch on mismatch.  A version check is a single primary-key lookup in a
+local file, far cheaper than the database round-trip it saves.
+
+The channel is optional: without ``CACHE_INVALIDATION_PATH`` each worker only
+sees its own invalidations, versioned by process-local counters.  Caches use
+`publish_invalidation` and `cache_version`, which pick the right one.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+
+__all__ = [
+    "InvalidationChannel",
+    "cache_version",
+    "get_invalidation_channel",
+    "publish_invalidation",
+]
+
+logger = logging.getLogger("invalidation_channel")
+
+
+class InvalidationChannel:
+    """Per-key version counters in a shared SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                "create table if not exists versions (key text primary key, version integer not null)"
+            )
+
+    def publish(self, key: str) -> None:
+        """Invalidate *key* in every process sharing the channel."""
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "insert into versions (key, version) values (?, 1)"
+                    " on conflict (key) do update set version = version + 1",
+                    (key,),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("invalidation_channel.publish_error", extra={"key": key, "error": str(exc)})
+
+    def version(self, key: str) -> int | None:
+        """Current version of *key*; ``None`` when the channel cannot be read.
+
+        Callers must not serve cached values for a ``None`` version.
+        """
+        try:
+            with self._connect() as conn:
+                row = conn.execute("select version from versions where key = ?", (key,)).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as exc:
+            logger.warning("invalidation_channel.read_error", extra={"key": key, "error": str(exc)})
+            return None
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection: commit on success, always close."""
+        conn = sqlite3.connect(self.path, timeout=1.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class _LocalVersions:
+    """Per-key version counters within one process, the channel's stand-in.
+
+    Versions come from one increasing counter.  Least recently published keys
+    are evicted beyond ``max_keys``; keys not held report the highest version
+    evicted so far, so an evicted key never goes back to a version a cached
+    value may have been stored under.
+    """
+
+    def __init__(self, max_keys: int = 10000) -> None:
+        self.max_keys = max_keys
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def publish(self, key: str) -> None:
+        with self._lock:
+            self._counter += 1
+            self._versions[key] = self._counter
+            self._versions.move_to_end(key)
+            while len(self._versions) > self.max_keys:
+                _, evicted = self._versions.popitem(last=False)
+                self._floor = max(self._floor, evicted)
+
+    def version(self, key: str) -> int:
+        with self._lock:
+            return self._versions.get(key, self._floor)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide instance
+# ---------------------------------------------------------------------------
+
+_shared_channel: InvalidationChannel | None = None
+_shared_lock = threading.Lock()
+
+
+def get_invalidation_channel() -> InvalidationChannel | None:
+    """Return the process-wide channel, ``None`` unless ``CACHE_INVALIDATION_PATH`` is set."""
+    global _shared_channel
+    path = os.getenv("CACHE_INVALIDATION_PATH")
+    if not path:
+        return None
+    with _shared_lock:
+        if _shared_channel is None or _shared_channel.path != path:
+            try:
+                _shared_channel = InvalidationChannel(path)
+            except sqlite3.Error as exc:
+                logger.warning("invalidation_channel.open_error", extra={"path": path, "error": str(exc)})
+                return None
+        return _shared_channel
+
+
+_local_versions = _LocalVersions()
+
+
+def publish_invalidation(key: str) -> None:
+    """Invalidate *key* in every worker sharing the channel, or in this process without one."""
+    channel = get_invalidation_channel()
+    if channel is not None:
+        channel.publish(key)
+    else:
+        _local_versions.publish(key)
+
+
+def cache_version(key: str) -> int | None:
+    """
+    Current version of *key*, from the channel when configured.
+
+    Read it before loading the value to cache and store the value under it:
+    an invalidation racing with the load then leaves an entry that no longer
+    matches.  ``None`` means the value must not be cached or served from cache.
+    """
+    channel = get_invalidation_channel()
+    if channel is not None:
+        return channel.version(key)
+    return _local_versions.version(key)
@@ -0,0 +1,148 @@
+"""Model Router
+~~~~~~~~~~~~
+Latency-aware routing across an ordered list of candidate models.
+
+For every model the router keeps an exponentially weighted moving average
+(EWMA) of latency and of the error rate.  Requests go to the fastest healthy
+model first; the remaining candidates are returned in order as fallbacks for
+5xx responses, 429s and timeouts.  A model whose error EWMA crosses the threshold is
+considered unhealthy and is only retried after a cool-down.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+__all__ = [
+    "ModelRouter",
+    "get_model_router",
+    "model_router_metrics",
+]
+
+
+class _ModelStats:
+    __slots__ = ("latency", "error_rate", "calls", "failures", "last_failure_at")
+
+    def __init__(self) -> None:
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.last_failure_at: float | None = None
+
+
+class ModelRouter:
+    """Thread-safe EWMA-based router over an ordered list of models."""
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        *,
+        alpha: float = 0.2,
+        error_threshold: float = 0.5,
+        cooldown_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models: List[str] = list(dict.fromkeys(models))
+        self.alpha = float(alpha)
+        self.error_threshold = float(error_threshold)
+        self.cooldown_seconds = float(cooldown_seconds)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _ModelStats] = {m: _ModelStats() for m in self.models}
+
+    # ---------------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------------
+
+    def candidates(self) -> List[str]:
+        """Models in the order they should be tried for the next request.
+
+        Healthy models come first, fastest EWMA latency first.  A model
+        without latency data ranks as fastest so that every candidate gets
+        measured; ties keep the configured order.
+        """
+        with self._lock:
+            now = self._clock()
+            return sorted(
+                self.models,
+                key=lambda m: (
+                    not self._is_healthy(self._stats[m], now),
+                    self._stats[m].latency or 0.0,
+                    self.models.index(m),
+                ),
+            )
+
+    def record_success(self, model: str, latency: float) -> None:
+        """Record a completed call to *model*."""
+        self._record(model, True, latency)
+
+    def record_failure(self, model: str, latency: float) -> None:
+        """Record a 5xx, 429 or timeout from *model*."""
+        self._record(model, False, latency)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model EWMA latency, error rate, counters and health."""
+        with self._lock:
+            now = self._clock()
+            return {
+                model: {
+                    "ewma_latency": s.latency,
+                    "ewma_error_rate": s.error_rate,
+                    "calls": s.calls,
+                    "failures": s.failures,
+                    "healthy": self._is_healthy(s, now),
+                }
+                for model, s in self._stats.items()
+            }
+
+    # ---------------------------------------------------------------------
+    # Private helpers
+    # ---------------------------------------------------------------------
+
+    def _record(self, model: str, ok: bool, latency: float) -> None:
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                return
+            stats.calls += 1
+            stats.error_rate += self.alpha * ((0.0 if ok else 1.0) - stats.error_rate)
+            if ok:
+                # Failed calls (often timeouts) would skew the latency estimate
+                stats.latency = latency if stats.latency is None else stats.latency + self.alpha * (latency - stats.latency)
+            else:
+                stats.failures += 1
+                stats.last_failure_at = self._clock()
+
+    def _is_healthy(self, stats: _ModelStats, now: float) -> bool:
+        if stats.error_rate < self.error_threshold:
+            return True
+        # Give an unhealthy model another chance once the cool-down is over
+        return stats.last_failure_at is not None and now - stats.last_failure_at >= self.cooldown_seconds
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+
+_routers: Dict[str, ModelRouter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_model_router(name: str, models: Sequence[str], **kwargs: Any) -> ModelRouter:
+    """Return the process-wide router for *name*, creating it on first use."""
+    with _registry_lock:
+        router = _routers.get(name)
+        if router is None or router.models != list(dict.fromkeys(models)):
+            router = _routers[name] = ModelRouter(models, **kwargs)
+        return router
+
+
+def model_router_metrics() -> Dict[str, Dict[str, Any]]:
+    """Per-model stats of every router created in this process, keyed by name."""
+    with _registry_lock:
+        routers = dict(_routers)
+    return {name: router.stats() for name, router in routers.items()}
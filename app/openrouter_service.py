@@ -11,26 +11,51 @@ added in subsequent iterations.
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
 import os
+import threading
 import time
-from typing import Any, Dict, List, MutableMapping, Protocol, runtime_checkable
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Protocol,
+    Sequence,
+    Tuple,
+    runtime_checkable,
+)
 
 import httpx
 import backoff
 import jsonschema
 
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from app.model_router import ModelRouter
+from app.response_cache import ResponseCache
+
 __all__ = [
     "OpenRouterService",
+    "CompletionResult",
+    "UsageRecord",
     # custom errors
     "OpenRouterError",
     "OpenRouterConfigError",
     "OpenRouterSchemaError",
+    "OpenRouterUnavailableError",
 ]
 
 logger = logging.getLogger("openrouter_service")
 
+# Sentinel returned by ``_parse_stream_line`` for the terminating ``[DONE]`` event.
+_STREAM_DONE: Any = object()
+
 # ---------------------------------------------------------------------------
 # Custom exceptions
 # ---------------------------------------------------------------------------
@@ -48,6 +73,10 @@ class OpenRouterSchemaError(OpenRouterError):
     """Raised when the response fails JSON schema validation in strict mode."""
 
 
+class OpenRouterUnavailableError(OpenRouterError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
 # ---------------------------------------------------------------------------
 # Protocols & helper types
 # ---------------------------------------------------------------------------
@@ -66,10 +95,123 @@ class HTTPClientProtocol(Protocol):
     async def get(self, url: str, timeout: float) -> httpx.Response:  # noqa: D401,E501
         ...
 
+    def stream(self, method: str, url: str, json: Any, headers: MutableMapping[str, str], timeout: float) -> AsyncContextManager[httpx.Response]:  # noqa: E501
+        ...
+
     async def aclose(self) -> None:  # noqa: D401
         ...
 
 
+@dataclass
+class CompletionResult:
+    """Outcome of a single request within `chat_completion_many`.
+
+    Exactly one of ``response`` / ``error`` is set.
+    """
+
+    index: int
+    response: Dict[str, Any] | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class UsageRecord:
+    """Token usage and latency of a single completed API call.
+
+    ``cost`` is reported by OpenRouter in credits when usage accounting is
+    requested; it stays ``None`` when the response does not carry it.
+    """
+
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    cost: float | None = None
+    streamed: bool = False
+
+    @classmethod
+    def from_usage(cls, model: str, usage: Dict[str, Any] | None, latency: float, *, streamed: bool = False) -> "UsageRecord":
+        usage = usage or {}
+        cost = usage.get("cost")
+        return cls(
+            model=model,
+            prompt_tokens=int(usage.get("prompt_tokens") or 0),
+            completion_tokens=int(usage.get("completion_tokens") or 0),
+            latency=latency,
+            cost=float(cost) if cost is not None else None,
+            streamed=streamed,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Response validation helpers
+# ---------------------------------------------------------------------------
+
+# Compiled validators, keyed by schema identity (fast path) and by content
+# hash (so equal schemas built per call still share one validator).  Response
+# schemas are treated as immutable once passed to the service.
+_VALIDATOR_CACHE_SIZE = 128
+_validators_by_id: Dict[int, Tuple[Dict[str, Any], Any]] = {}
+_validators_by_hash: Dict[str, Any] = {}
+_validators_lock = threading.Lock()
+
+
+def _compiled_validator(schema: Dict[str, Any]) -> Any:
+    """Return a cached, already schema-checked validator for *schema*."""
+    entry = _validators_by_id.get(id(schema))
+    if entry is not None and entry[0] is schema:
+        return entry[1]
+
+    digest = hashlib.sha256(json.dumps(schema, sort_keys=True).encode("utf-8")).hexdigest()
+    with _validators_lock:
+        validator = _validators_by_hash.get(digest)
+        if validator is None:
+            validator_cls = jsonschema.validators.validator_for(schema)
+            validator_cls.check_schema(schema)
+            validator = validator_cls(schema)
+            if len(_validators_by_hash) >= _VALIDATOR_CACHE_SIZE:
+                _validators_by_hash.clear()
+            _validators_by_hash[digest] = validator
+        if len(_validators_by_id) >= _VALIDATOR_CACHE_SIZE:
+            _validators_by_id.clear()
+        # Keeping a reference to the schema pins its id() while cached.
+        _validators_by_id[id(schema)] = (schema, validator)
+    return validator
+
+
+def _parse_assistant_json(content: Any) -> Any:
+    """Parse assistant content as JSON.
+
+    Fast path: content that is already structured is returned as is, and a
+    plain JSON string goes straight to ``json.loads``.  Only if that fails is
+    a surrounding markdown code fence stripped before a second attempt.
+    """
+    if isinstance(content, (dict, list)):
+        return content
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        stripped = content.strip()
+        if not stripped.startswith("```"):
+            raise
+        stripped = stripped.strip("`")
+        if stripped.startswith("json"):
+            stripped = stripped[len("json"):]
+        return json.loads(stripped)
+
+
+def _retry_after(resp: httpx.Response) -> float:
+    """Seconds from a 429's Retry-After header; 0 when missing or not a number."""
+    try:
+        return float(resp.headers.get("Retry-After", 0))
+    except ValueError:
+        return 0.0
+
+
 # ---------------------------------------------------------------------------
 # Core service implementation
 # ---------------------------------------------------------------------------
@@ -92,6 +234,10 @@ class OpenRouterService:
         default_system_prompt: str | None = None,
         default_response_format: Dict[str, Any] | None = None,
         http_client: HTTPClientProtocol | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        response_cache: ResponseCache | None = None,
+        model_router: ModelRouter | None = None,
+        usage_recorder: Callable[[UsageRecord], None] | None = None,
     ) -> None:
         self._api_key: str | None = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self._api_key:
@@ -105,6 +251,23 @@ class OpenRouterService:
         self.default_system_prompt = default_system_prompt
         self.default_response_format = default_response_format
 
+        # Monotonic deadlines set by 429s, per model; every request to that
+        # model on this instance waits for it, so one rate-limit response paces
+        # all concurrent requests to the model, not those to other models.
+        self._rate_limited_until: Dict[str, float] = {}
+
+        # Shared per process so every caller sees the same OpenRouter health.
+        self._breaker: CircuitBreaker = circuit_breaker or get_circuit_breaker("openrouter")
+
+        # Optional; without a cache every call goes to the API.
+        self._cache: ResponseCache | None = response_cache
+
+        # Optional; without a router every call goes to ``model_name``.
+        self._router: ModelRouter | None = model_router
+
+        # Optional; called with a ``UsageRecord`` after every completed call.
+        self._usage_recorder: Callable[[UsageRecord], None] | None = usage_recorder
+
         # Use provided client or create one.
         self._client: HTTPClientProtocol = (
             http_client
@@ -130,6 +293,7 @@ class OpenRouterService:
         *,
         model_params: Dict[str, Any] | None = None,
         response_format: Dict[str, Any] | None = None,
+        cache: bool | None = None,
     ) -> Dict[str, Any]:
         """Send a chat completion request.
 
@@ -143,6 +307,10 @@ class OpenRouterService:
             etc.).  Values override those passed in *constructor* if any.
         response_format
             Optional response format following the OpenRouter JSON schema.
+        cache
+            Response cache policy (only when the service has a cache).
+            ``None`` caches deterministic requests only (``temperature`` 0),
+            ``True`` opts in regardless of temperature, ``False`` bypasses.
 
         Returns
         -------
@@ -150,22 +318,195 @@ class OpenRouterService:
             Parsed JSON response from the API.
         """
         payload = self._build_payload(messages, model_params, response_format)
+
+        candidates = self._candidate_models(payload["model"])
+        # Responses are cached per model that produced them; look up the one
+        # the router would try first.
+        cache_key = self._cache_key({**payload, "model": candidates[0]}, cache)
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)  # type: ignore[union-attr]
+            if cached is not None:
+                logger.debug("openrouter.cache_hit", extra={"key": cache_key})
+                return cached
+
         endpoint = f"{self.base_url}/chat/completions"
         headers = {
             "Authorization": f"Bearer {self._api_key}",
             "X-Title": "OpenRouterService",
         }
 
-        resp = await self._post_with_retry(endpoint, payload, headers)
+        start = time.perf_counter()
+        resp, model = await self._post_routed(endpoint, payload, headers, candidates)
         data = resp.json()
+        self._record_usage(
+            UsageRecord.from_usage(data.get("model") or model, data.get("usage"), time.perf_counter() - start)
+        )
 
         # Validate response under strict mode if defined
         final_response_format = response_format or self.default_response_format
         if final_response_format:
             self._validate_response(data, final_response_format)
 
+        if cache_key is not None:
+            self._cache.set(self._cache.make_key({**payload, "model": model}), data)  # type: ignore[union-attr]
+
         return data
 
+    async def chat_completion_many(
+        self,
+        requests: Sequence[Dict[str, Any]],
+        *,
+        max_concurrency: int = 4,
+    ) -> List[CompletionResult]:
+        """Run many chat completions concurrently over the shared HTTP client.
+
+        Parameters
+        ----------
+        requests
+            Sequence of dictionaries with ``messages`` and optional
+            ``model_params`` / ``response_format`` / ``cache`` keys, i.e. the
+            arguments of `chat_completion`.
+        max_concurrency
+            Maximum number of requests in flight at once.
+
+        Returns
+        -------
+        list[CompletionResult]
+            One result per request, in input order.  Failures are reported per
+            item instead of aborting the batch.
+
+        Notes
+        -----
+        A 429 on any request pauses the batch's requests to that model until
+        ``Retry-After`` has elapsed, so the batch as a whole backs off from the
+        rate limit.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _run(index: int, request: Dict[str, Any]) -> CompletionResult:
+            async with semaphore:
+                try:
+                    response = await self.chat_completion(
+                        request["messages"],
+                        model_params=request.get("model_params"),
+                        response_format=request.get("response_format"),
+                        cache=request.get("cache"),
+                    )
+                    return CompletionResult(index=index, response=response)
+                except Exception as exc:  # noqa: BLE001 - reported per item
+                    logger.warning("openrouter.batch_item_failed", extra={"index": index, "error": str(exc)})
+                    return CompletionResult(index=index, error=exc)
+
+        return list(await asyncio.gather(*(_run(i, r) for i, r in enumerate(requests))))
+
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        model_params: Dict[str, Any] | None = None,
+        response_format: Dict[str, Any] | None = None,
+    ) -> AsyncIterator[str]:
+        """Send a streaming chat completion request.
+
+        The request is sent with ``stream=True`` and the server-sent events
+        returned by OpenRouter are parsed on the fly.
+
+        Yields
+        ------
+        str
+            Assistant content deltas, in the order they arrive.  Joining all
+            yielded fragments gives the full assistant message.
+
+        Notes
+        -----
+        Streaming requests are not retried once the first fragment has been
+        handed to the caller: replaying the request would duplicate output.
+        With a model router, a 5xx, 429 or transport error *before* the stream
+        starts falls back to the next candidate model.  A 429 from the last
+        candidate is retried up to ``max_retries`` times with back-off, after
+        its Retry-After.
+        """
+        payload = self._build_payload(messages, model_params, response_format)
+        payload["stream"] = True
+        if self._usage_recorder is not None:
+            payload["usage"] = {"include": True}  # sent in the last chunk before [DONE]
+        endpoint = f"{self.base_url}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self._api_key}",
+            "X-Title": "OpenRouterService",
+        }
+
+        candidates = self._candidate_models(payload["model"])
+        # Every candidate gets one attempt; only a rate-limited last one gets more
+        attempts = candidates + [candidates[-1]] * (max(self.max_retries, 1) - 1)
+        for position, model in enumerate(attempts):
+            is_last = position >= len(candidates) - 1
+            payload["model"] = model
+            if position >= len(candidates):
+                await asyncio.sleep(self.backoff_factor * 2 ** (position - len(candidates)))
+
+            await self._wait_for_rate_limit(model)
+            self._admit_call()
+            start = time.perf_counter()
+            recorded = False
+            try:
+                async with self._client.stream(
+                    "POST", endpoint, json=payload, headers=headers,
+                    timeout=self._breaker.timeout_for(self.timeout),
+                ) as resp:
+                    # Time to response headers is what reflects provider health;
+                    # the body duration depends on how much the model writes.
+                    duration = time.perf_counter() - start
+                    ok = resp.status_code < 500
+                    rate_limited = resp.status_code == 429
+                    self._record_call(ok, duration)
+                    self._record_model(model, ok and not rate_limited, duration)
+                    recorded = True
+                    logger.info(
+                        "openrouter.stream",
+                        extra={"status": resp.status_code, "duration": duration, "model": model},
+                    )
+                    if rate_limited:
+                        self._note_rate_limit(model, _retry_after(resp))
+                        if position < len(attempts) - 1:
+                            continue
+                    if not ok and not is_last:
+                        logger.warning("openrouter.model_fallback", extra={"model": model, "status": resp.status_code})
+                        continue
+                    if resp.status_code >= 400:
+                        await resp.aread()
+                        resp.raise_for_status()
+
+                    usage = None
+                    async for line in resp.aiter_lines():
+                        chunk = self._parse_stream_line(line)
+                        if chunk is None:
+                            continue
+                        if chunk is _STREAM_DONE:
+                            break
+                        usage = chunk.get("usage") or usage
+                        delta = self._chunk_content(chunk)
+                        if delta is not None:
+                            yield delta
+                    self._record_usage(
+                        UsageRecord.from_usage(model, usage, time.perf_counter() - start, streamed=True)
+                    )
+                    return
+            except httpx.TransportError as exc:
+                if recorded or is_last:
+                    raise  # failed mid-body (no replay) or no candidates left
+                duration = time.perf_counter() - start
+                self._record_call(False, duration)
+                self._record_model(model, False, duration)
+                recorded = True
+                logger.warning("openrouter.model_fallback", extra={"model": model, "error": str(exc)})
+            finally:
+                if not recorded:
+                    self._record_call(False, time.perf_counter() - start)
+
     async def generate_completion(self, prompt: str, **kwargs: Any) -> str:
         """Shortcut for single user prompt, returns assistant content only."""
         messages = [{"role": "user", "content": prompt}]
@@ -220,26 +561,112 @@ class OpenRouterService:
 
         return payload
 
+    def _cache_key(self, payload: Dict[str, Any], cache: bool | None) -> str | None:
+        """Cache key for *payload*, or ``None`` when the cache must be bypassed."""
+        if self._cache is None or cache is False:
+            return None
+        # Missing temperature means the provider default (1.0), i.e. sampled output.
+        if cache is None and payload.get("temperature", 1.0) != 0:
+            self._cache.record_bypass()
+            return None
+        return self._cache.make_key(payload)
+
+    def _record_usage(self, record: UsageRecord) -> None:
+        """Hand *record* to the usage recorder; accounting never fails a call."""
+        if self._usage_recorder is None:
+            return
+        try:
+            self._usage_recorder(record)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("openrouter.usage_record_error", extra={"error": str(exc)})
+
+    def _candidate_models(self, default_model: str) -> List[str]:
+        """Models to try, in order; just *default_model* without a router."""
+        return self._router.candidates() if self._router is not None else [default_model]
+
+    def _record_model(self, model: str, ok: bool, duration: float) -> None:
+        """Feed the outcome of a call to the model router, if any."""
+        if self._router is None:
+            return
+        if ok:
+            self._router.record_success(model, duration)
+        else:
+            self._router.record_failure(model, duration)
+
+    async def _post_routed(
+        self,
+        endpoint: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        candidates: List[str],
+    ) -> Tuple[httpx.Response, str]:
+        """POST to the first candidate model, falling back on 5xx, 429 and timeouts.
+
+        Falling back replaces retrying: every candidate but the last gets a
+        single attempt, the last one gets the full ``max_retries`` with
+        back-off.  A 429 also pauses this instance's calls to that model for
+        its Retry-After (see `_note_rate_limit`); falling back to another model
+        does not wait for it.  Returns the response and the model that
+        produced it.
+        """
+        last_exc: Exception | None = None
+        for position, model in enumerate(candidates):
+            is_last = position == len(candidates) - 1
+            start = time.perf_counter()
+            try:
+                resp = await self._post_with_retry(
+                    endpoint, {**payload, "model": model}, headers,
+                    max_tries=None if is_last else 1,
+                )
+            except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code < 500 \
+                        and exc.response.status_code != 429:
+                    raise  # client errors are not the model's fault
+                self._record_model(model, False, time.perf_counter() - start)
+                if is_last:
+                    raise
+                logger.warning("openrouter.model_fallback", extra={"model": model, "error": str(exc)})
+                last_exc = exc
+                continue
+            self._record_model(model, True, time.perf_counter() - start)
+            return resp, model
+        raise OpenRouterError(f"No candidate model succeeded: {last_exc}")
+
     async def _post_with_retry(
         self,
         endpoint: str,
         payload: Dict[str, Any],
         headers: Dict[str, str],
+        max_tries: int | None = None,
     ) -> httpx.Response:
-        """POST with retry/back-off logic for transient errors."""
+        """POST with retry/back-off logic for transient errors.
+
+        ``max_tries`` overrides ``self.max_retries`` for this call.
+        """
+
+        model = payload["model"]
 
         async def _send_request() -> httpx.Response:
+            await self._wait_for_rate_limit(model)
+            self._admit_call()
             start = time.perf_counter()
-            resp = await self._client.post(endpoint, json=payload, headers=headers, timeout=self.timeout)
-            duration = time.perf_counter() - start
+            ok = False
+            try:
+                resp = await self._client.post(
+                    endpoint, json=payload, headers=headers,
+                    timeout=self._breaker.timeout_for(self.timeout),
+                )
+                ok = resp.status_code < 500
+            finally:
+                duration = time.perf_counter() - start
+                self._record_call(ok, duration)
             logger.info(
                 "openrouter.request", extra={"status": resp.status_code, "duration": duration}
             )
 
-            # Handle explicit 429 here to integrate Retry-After without raising
+            # A retry of this model waits for Retry-After before sending
             if resp.status_code == 429:
-                retry_after = float(resp.headers.get("Retry-After", 0))
-                await self._handle_rate_limit(retry_after)
+                self._note_rate_limit(model, _retry_after(resp))
                 raise httpx.HTTPStatusError("Rate limited", request=resp.request, response=resp)
 
             if 500 <= resp.status_code < 600:
@@ -254,7 +681,7 @@ class OpenRouterService:
             backoff.expo,
             (httpx.TimeoutException, httpx.HTTPStatusError),
             factor=self.backoff_factor,
-            max_tries=self.max_retries,
+            max_tries=max_tries or self.max_retries,
             jitter=None,
         )
         async def _wrapped() -> httpx.Response:  # noqa: D401
@@ -262,11 +689,38 @@ class OpenRouterService:
 
         return await _wrapped()
 
-    async def _handle_rate_limit(self, retry_after: float) -> None:
-        """Sleep coroutine respecting Retry-After header."""
+    def _admit_call(self) -> None:
+        """Fail fast with `OpenRouterUnavailableError` while the breaker is open."""
+        try:
+            self._breaker.before_call()
+        except CircuitOpenError as exc:
+            logger.warning("openrouter.circuit_open", extra={"breaker": self._breaker.name})
+            raise OpenRouterUnavailableError(str(exc)) from exc
+
+    def _record_call(self, ok: bool, duration: float) -> None:
+        """Feed the outcome of a single HTTP attempt to the circuit breaker."""
+        if ok:
+            self._breaker.record_success(duration)
+        else:
+            self._breaker.record_failure(duration)
+
+    def _note_rate_limit(self, model: str, retry_after: float) -> None:
+        """Pause calls to *model* on this instance for its Retry-After.
+
+        The pause is shared: concurrent requests to the model also wait for it
+        before sending (see `_wait_for_rate_limit`).
+        """
         wait_for = retry_after if retry_after > 0 else self.backoff_factor
-        logger.warning("openrouter.rate_limit", extra={"sleep": wait_for})
-        await asyncio.sleep(wait_for)
+        logger.warning("openrouter.rate_limit", extra={"model": model, "sleep": wait_for})
+        self._rate_limited_until[model] = max(
+            self._rate_limited_until.get(model, 0.0), time.monotonic() + wait_for
+        )
+
+    async def _wait_for_rate_limit(self, model: str) -> None:
+        """Wait until a pause requested by an earlier 429 from *model* has elapsed."""
+        delay = self._rate_limited_until.get(model, 0.0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
 
     def _validate_response(
         self,
@@ -286,12 +740,41 @@ class OpenRouterService:
 
             # Extract assistant content
             assistant_content = resp_json["choices"][0]["message"]["content"]
-            parsed = json.loads(assistant_content)
-            jsonschema.validate(instance=parsed, schema=schema_def)
+            parsed = _parse_assistant_json(assistant_content)
+            _compiled_validator(schema_def).validate(parsed)
         except (json.JSONDecodeError, jsonschema.ValidationError) as exc:
             logger.error("openrouter.schema_error", extra={"error": str(exc)})
             raise OpenRouterSchemaError(str(exc))
 
+    @staticmethod
+    def _parse_stream_line(line: str) -> Dict[str, Any] | None:
+        """Parse a single SSE line into a completion chunk.
+
+        Returns ``None`` for lines carrying no data (blank lines, comments,
+        malformed chunks) and the ``_STREAM_DONE`` sentinel for ``[DONE]``.
+        """
+        if not line.startswith("data:"):
+            return None  # blank separator or ": OPENROUTER PROCESSING" comment
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return _STREAM_DONE
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning("openrouter.stream_bad_chunk", extra={"chunk": data[:200]})
+            return None
+        if "error" in chunk:
+            raise OpenRouterError(str(chunk["error"]))
+        return chunk if isinstance(chunk, dict) else None
+
+    @staticmethod
+    def _chunk_content(chunk: Dict[str, Any]) -> str | None:
+        """Content delta of a chunk, ``None`` for role-only or usage chunks."""
+        try:
+            return chunk["choices"][0]["delta"].get("content") or None
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return None
+
     # ---------------------------------------------------------------------
     # Utility helpers
     # ---------------------------------------------------------------------
@@ -0,0 +1,221 @@
+"""Response Cache
+~~~~~~~~~~~~~~
+Content-addressed cache for OpenRouter chat completion responses.
+
+Responses are keyed by a SHA-256 hash of the normalised request payload
+(model, messages, parameters, response format), so identical prompts share an
+entry regardless of which caller sent them.  Entries live in an in-memory LRU
+with a TTL and, optionally, in an SQLite file that survives restarts and is
+shared by all worker processes on the host.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple
+
+__all__ = [
+    "ResponseCache",
+    "get_response_cache",
+    "response_cache_metrics",
+]
+
+logger = logging.getLogger("response_cache")
+
+# Payload keys that do not influence the completion itself.
+_IGNORED_KEYS = {"stream"}
+
+
+class ResponseCache:
+    """In-memory LRU + TTL cache with an optional on-disk (SQLite) tier."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600.0,
+        disk_path: str | None = None,
+    ) -> None:
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self.disk_path = disk_path
+
+        self._lock = threading.Lock()
+        # key -> (expires_at, serialized response); values are stored as JSON
+        # text so callers can never mutate a cached response in place.
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._evictions = 0
+
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "create table if not exists responses ("
+                    " key text primary key, expires_at real not null, value text not null)"
+                )
+
+    # ---------------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """Hash of the normalised payload (sorted keys, trimmed message text)."""
+        normalised = {k: v for k, v in payload.items() if k not in _IGNORED_KEYS}
+        normalised["messages"] = [
+            {**m, "content": m.get("content", "").strip()} if isinstance(m.get("content"), str) else m
+            for m in payload.get("messages", [])
+        ]
+        blob = json.dumps(normalised, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        """Return a cached response or ``None``; counts a hit or a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return json.loads(entry[1])
+                del self._memory[key]
+
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            self._remember(key, value[0], value[1])
+        return json.loads(value[1])
+
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        """Store a response under *key* for ``ttl_seconds``."""
+        expires_at = time.time() + self.ttl_seconds
+        serialized = json.dumps(response, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            self._remember(key, expires_at, serialized)
+        self._disk_set(key, expires_at, serialized)
+
+    def record_bypass(self) -> None:
+        """Count a request that was not eligible for caching."""
+        with self._lock:
+            self._bypassed += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._memory),
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "disk": bool(self.disk_path),
+            }
+
+    def clear(self) -> None:
+        """Drop all entries, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("delete from responses")
+
+    # ---------------------------------------------------------------------
+    # Private helpers
+    # ---------------------------------------------------------------------
+
+    def _remember(self, key: str, expires_at: float, serialized: str) -> None:
+        """Insert into the memory tier; caller must hold ``self._lock``."""
+        self._memory[key] = (expires_at, serialized)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection: commit on success, always close."""
+        conn = sqlite3.connect(self.disk_path, timeout=1.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _disk_get(self, key: str, now: float) -> Tuple[float, str] | None:
+        if not self.disk_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "select expires_at, value from responses where key = ? and expires_at > ?",
+                    (key, now),
+                ).fetchone()
+            return (row[0], row[1]) if row else None
+        except sqlite3.Error as exc:
+            logger.warning("response_cache.disk_error", extra={"error": str(exc)})
+            return None
+
+    def _disk_set(self, key: str, expires_at: float, serialized: str) -> None:
+        if not self.disk_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "insert or replace into responses (key, expires_at, value) values (?, ?, ?)",
+                    (key, expires_at, serialized),
+                )
+                conn.execute("delete from responses where expires_at <= ?", (time.time(),))
+        except sqlite3.Error as exc:
+            logger.warning("response_cache.disk_error", extra={"error": str(exc)})
+
+
+# ---------------------------------------------------------------------------
+# Process-wide instance
+# ---------------------------------------------------------------------------
+
+_shared_cache: ResponseCache | None = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide cache, configured from the environment.
+
+    ``OPENROUTER_CACHE_TTL`` (seconds, default 3600),
+    ``OPENROUTER_CACHE_MAX_ENTRIES`` (default 512) and
+    ``OPENROUTER_CACHE_PATH`` (SQLite file; unset = memory only).
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                max_entries=int(os.getenv("OPENROUTER_CACHE_MAX_ENTRIES", 512)),
+                ttl_seconds=float(os.getenv("OPENROUTER_CACHE_TTL", 3600)),
+                disk_path=os.getenv("OPENROUTER_CACHE_PATH") or None,
+            )
+        return _shared_cache
+
+
+def response_cache_metrics() -> Dict[str, Any] | None:
+    """Metrics of the process-wide cache, ``None`` if it was never used."""
+    with _shared_lock:
+        cache = _shared_cache
+    return cache.metrics() if cache is not None else None
@@ -1,5 +1,7 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from functools import wraps
+import json
+from datetime import date, datetime, timedelta, timezone
 from typing import List
 from uuid import UUID
 
@@ -93,4 +95,140 @@ def get_ai_tips():
             # If logging fails, continue with response
             pass
             
-        return jsonify({"error": "Internal server error"}), 500 
\ No newline at end of file
+        return jsonify({"error": "Internal server error"}), 500
+
+def _format_sse(event: str, data: dict) -> str:
+    """Serialize a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@ai_tips_bp.route('/tips/stream', methods=['GET'])
+@requires_auth
+def stream_ai_tips():
+    """
+    Stream AI-generated financial tips as Server-Sent Events.
+    
+    Each tip is sent as a `tip` event the moment the model finishes it, so the
+    first tip arrives after first-token latency instead of full-completion
+    latency. The stream ends with a `done` event carrying the tip count, or an
+    `error` event if something fails mid-stream.
+    
+    Query Parameters:
+    - limit (int, optional): Maximum number of tips to stream (default: 3, max: 3)
+    
+    Returns:
+    - 200: text/event-stream of tips
+    - 400: Invalid limit parameter
+    - 401: Unauthorized (handled by authentication middleware)
+    """
+    try:
+        user_id = UUID(request.user_id)
+    except ValueError as e:
+        return jsonify({"error": "Bad request", "message": str(e)}), 400
+    
+    limit = request.args.get('limit', default=3, type=int)
+    if limit < 1 or limit > 3:
+        return jsonify({"error": "Invalid limit parameter", "message": "Limit must be between 1 and 3"}), 400
+    
+    # Import here to avoid circular imports
+    from app.services.ai_tips_service import AiTipsService
+    
+    try:
+        # Needs the database client, fails when it is not configured
+        ai_tips_service = AiTipsService()
+    except Exception as e:
+        try:
+            log_error(
+                user_id=user_id,
+                error_code='SERVER_ERROR',
+                message=f"Unexpected error in stream_ai_tips: {str(e)}"
+            )
+        except Exception:
+            # If logging fails, continue with response
+            pass
+        
+        return jsonify({"error": "Internal server error"}), 500
+    
+    def generate():
+        count = 0
+        try:
+            for tip in ai_tips_service.stream_tips(user_id, limit):
+                count += 1
+                yield _format_sse('tip', tip.dict())
+            
+            log_info(
+                user_id=user_id,
+                message=f"Successfully streamed {count} AI tips"
+            )
+            
+            yield _format_sse('done', {"count": count})
+        except Exception as e:
+            try:
+                log_error(
+                    user_id=user_id,
+                    error_code='AI_SERVICE_ERROR',
+                    message=f"Error streaming AI tips: {str(e)}"
+                )
+            except Exception:
+                pass
+            yield _format_sse('error', {"error": "External AI service unavailable"})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Disable proxy buffering so events reach the browser immediately
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@ai_tips_bp.route('/usage', methods=['GET'])
+@requires_auth
+def get_ai_usage():
+    """
+    Get LLM token usage, cost and latency of the authenticated user.
+    
+    Query Parameters:
+    - date_from (str, optional): First day, YYYY-MM-DD (default: 29 days before date_to)
+    - date_to (str, optional): Last day, YYYY-MM-DD (default: today, UTC)
+    
+    Returns:
+    - 200: Totals, per-day totals and per-caller/model totals
+    - 400: Invalid date parameters
+    - 401: Unauthorized (handled by authentication middleware)
+    - 500: Internal server error
+    """
+    try:
+        user_id = UUID(request.user_id)
+        
+        try:
+            date_to = date.fromisoformat(request.args['date_to']) if 'date_to' in request.args \
+                else datetime.now(timezone.utc).date()
+            date_from = date.fromisoformat(request.args['date_from']) if 'date_from' in request.args \
+                else date_to - timedelta(days=29)
+        except ValueError:
+            return jsonify({"error": "Invalid date parameter", "message": "Dates must be in YYYY-MM-DD format"}), 400
+        
+        if date_from > date_to:
+            return jsonify({"error": "Invalid date range", "message": "date_from cannot be after date_to"}), 400
+        
+        # Import here to avoid circular imports
+        from app.services.llm_usage import LlmUsageService
+        
+        report = LlmUsageService().get_usage(user_id, date_from, date_to)
+        return jsonify(report.dict()), 200
+        
+    except ValueError as e:
+        return jsonify({"error": "Bad request", "message": str(e)}), 400
+        
+    except Exception as e:
+        try:
+            log_error(
+                user_id=user_id,
+                error_code='SERVER_ERROR',
+                message=f"Unexpected error in get_ai_usage: {str(e)}"
+            )
+        except Exception:
+            pass
+            
+        return jsonify({"error": "Internal server error"}), 500
@@ -0,0 +1,125 @@
+import json
+import time
+from typing import List, Optional, Tuple
+
+from flask import Blueprint, Flask, current_app, jsonify, request
+
+from app.bounded_executor import DeadlineExceeded, ExecutorSaturated, get_bounded_executor
+from app.schemas import BatchRequest, BatchSubRequest, BatchSubResponse
+
+# WSGI environ key carrying the already authenticated user into sub-requests.
+# Clients cannot set environ keys, only HTTP_* headers.
+BATCH_USER_ENVIRON_KEY = 'smartwydatki.batch_user_id'
+
+# Sub-requests of all batches in this process share one pool
+BATCH_WORKERS = 8
+BATCH_QUEUE_SIZE = 32
+BATCH_TIMEOUT_SECONDS = 15.0
+
+batch_bp = Blueprint('batch', __name__, url_prefix='/batch')
+_executor = get_bounded_executor("batch", max_workers=BATCH_WORKERS, max_queue=BATCH_QUEUE_SIZE)
+
+@batch_bp.route('', methods=['POST'])
+def run_batch():
+    """
+    Run several API calls in one request.
+
+    Sub-requests are dispatched internally through the normal routes,
+    reusing this request's authentication. Batches of GET requests run in
+    parallel; a batch containing any write runs one sub-request at a time in
+    the given order, so each one sees the effects of the previous ones. Each
+    one gets its own status, JSON body and duration; a failing sub-request
+    does not fail the batch.
+
+    Returns:
+    - 200: {"responses": [...]} in request order
+    - 400: Invalid batch
+    - 401: Unauthorized (handled by authentication middleware)
+    """
+    try:
+        batch = BatchRequest.parse_obj(request.json)
+    except ValueError as e:
+        return jsonify({"error": "Validation error", "details": str(e)}), 400
+
+    if any(sub.path.rstrip('/') == batch_bp.url_prefix for sub in batch.requests):
+        return jsonify({"error": "Validation error", "details": "Batches cannot be nested"}), 400
+
+    app = current_app._get_current_object()
+    user_id = request.user_id
+    started = time.perf_counter()
+    calls = [lambda sub=sub: _dispatch(app, user_id, sub) for sub in batch.requests]
+    if all(sub.method == 'GET' for sub in batch.requests):
+        outcomes = _executor.run_many(calls, timeout=BATCH_TIMEOUT_SECONDS)
+    else:
+        outcomes = _run_in_order(calls, deadline=time.monotonic() + BATCH_TIMEOUT_SECONDS)
+
+    responses = []
+    for result, error in outcomes:
+        if error is None:
+            responses.append(result)
+        elif isinstance(error, ExecutorSaturated):
+            responses.append(BatchSubResponse(status=503, body={"error": "Server busy"}, duration_ms=0.0))
+        elif isinstance(error, DeadlineExceeded):
+            responses.append(BatchSubResponse(
+                status=504, body={"error": "Sub-request timed out"}, duration_ms=BATCH_TIMEOUT_SECONDS * 1000
+            ))
+        else:
+            responses.append(BatchSubResponse(status=500, body={"error": "Internal server error"}, duration_ms=0.0))
+
+    return jsonify({
+        "responses": [response.dict() for response in responses],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    }), 200
+
+def _run_in_order(calls, deadline: float) -> List[Tuple[Optional[BatchSubResponse], Optional[BaseException]]]:
+    """
+    Run *calls* one after another in this thread, like `BoundedExecutor.run_many`.
+
+    A started call always runs to completion, so writes are never reordered
+    or left running in the background; calls not started by the deadline
+    fail with `DeadlineExceeded`.
+    """
+    outcomes = []
+    for call in calls:
+        if time.monotonic() >= deadline:
+            outcomes.append((None, DeadlineExceeded()))
+            continue
+        try:
+            outcomes.append((call(), None))
+        except Exception as e:
+            outcomes.append((None, e))
+    return outcomes
+
+def _dispatch(app: Flask, user_id: str, sub: BatchSubRequest) -> BatchSubResponse:
+    """Run one sub-request through the app's full request handling."""
+    started = time.perf_counter()
+    environ_overrides = {BATCH_USER_ENVIRON_KEY: user_id}
+    with app.test_request_context(
+        sub.path,
+        method=sub.method,
+        query_string={key: _query_value(value) for key, value in sub.query.items()},
+        json=sub.body,
+        environ_overrides=environ_overrides
+    ):
+        response = app.full_dispatch_request()
+
+    if response.is_streamed:
+        response.close()
+        return BatchSubResponse(
+            status=400,
+            body={"error": "Streaming endpoints are not supported in a batch"},
+            duration_ms=_elapsed_ms(started)
+        )
+
+    data = response.get_data(as_text=True)
+    try:
+        body = json.loads(data) if data else None
+    except ValueError:
+        body = data
+    return BatchSubResponse(status=response.status_code, body=body, duration_ms=_elapsed_ms(started))
+
+def _query_value(value) -> str:
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -2,11 +2,16 @@ from flask import Blueprint, request, jsonify
 from uuid import UUID
 from typing import Optional
 
-from app.schemas import CategoryCreate, CategoryUpdate, CategoryRead, CategorySuggestion
-from app.services.categories import CategoryService
+from app.schemas import (
+    CategoryCreate, CategoryBulkCreate, CategoryMerge, CategoryUpdate, CategoryRead, CategorySuggestion,
+    CategorySuggestionBatchRequest, CategorizationRuleCreate, CategorizationRuleUpdate
+)
+from app.services.categories import CategoryService, CategoryNameConflict
+from app.services.categorization_rules import CategorizationRuleService
 
 categories_bp = Blueprint('categories', __name__, url_prefix='/categories')
 category_service = CategoryService()
+rule_service = CategorizationRuleService()
 
 @categories_bp.route('', methods=['GET'])
 def list_categories():
@@ -34,6 +39,8 @@ def create_category():
         created_category = category_service.create_category(user_id, category_data.name)
         return jsonify(created_category.dict()), 201
         
+    except CategoryNameConflict as e:
+        return jsonify({"error": str(e)}), 409
     except ValueError as e:
         return jsonify({"error": "Validation error", "details": str(e)}), 400
     except Exception as e:
@@ -44,6 +51,81 @@ def create_category():
         # Log critical errors
         return jsonify({"error": str(e)}), 500
 
+@categories_bp.route('/bulk', methods=['POST'])
+def create_categories_bulk():
+    """Create up to 50 categories in one call; existing names are returned with created=false."""
+    user_id = request.user_id
+    
+    try:
+        bulk_data = CategoryBulkCreate.parse_obj(request.json)
+        
+        results = category_service.create_categories_bulk(user_id, bulk_data.names)
+        return jsonify({"categories": [result.dict() for result in results]}), 200
+        
+    except ValueError as e:
+        return jsonify({"error": "Validation error", "details": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@categories_bp.route('/rules', methods=['GET'])
+def list_categorization_rules():
+    """Get the user's categorization rules in matching order."""
+    user_id = request.user_id
+    
+    try:
+        rules = rule_service.list_rules(user_id)
+        return jsonify([rule.dict() for rule in rules]), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@categories_bp.route('/rules', methods=['POST'])
+def create_categorization_rule():
+    """Create a rule assigning a category to matching new expenses."""
+    user_id = request.user_id
+    
+    try:
+        rule_data = CategorizationRuleCreate.parse_obj(request.json)
+        
+        created_rule = rule_service.create_rule(user_id, rule_data)
+        return jsonify(created_rule.dict()), 201
+        
+    except ValueError as e:
+        return jsonify({"error": "Validation error", "details": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@categories_bp.route('/rules/<uuid:id>', methods=['PUT'])
+def update_categorization_rule(id: UUID):
+    """Replace a categorization rule by ID."""
+    user_id = request.user_id
+    
+    try:
+        rule_data = CategorizationRuleUpdate.parse_obj(request.json)
+        
+        updated_rule = rule_service.update_rule(user_id, id, rule_data)
+        if not updated_rule:
+            return jsonify({"error": "Rule not found"}), 404
+            
+        return jsonify(updated_rule.dict()), 200
+        
+    except ValueError as e:
+        return jsonify({"error": "Validation error", "details": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@categories_bp.route('/rules/<uuid:id>', methods=['DELETE'])
+def delete_categorization_rule(id: UUID):
+    """Delete a categorization rule by ID."""
+    user_id = request.user_id
+    
+    try:
+        if not rule_service.delete_rule(user_id, id):
+            return jsonify({"error": "Rule not found"}), 404
+            
+        return "", 204
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @categories_bp.route('/<uuid:id>', methods=['GET'])
 def get_category(id: UUID):
     """Get a specific category by ID."""
@@ -74,6 +156,8 @@ def update_category(id: UUID):
             
         return jsonify(updated_category.dict()), 200
     
+    except CategoryNameConflict as e:
+        return jsonify({"error": str(e)}), 409
     except ValueError as e:
         return jsonify({"error": "Validation error", "details": str(e)}), 400
     except Exception as e:
@@ -103,6 +187,25 @@ def delete_category(id: UUID):
         # Log critical errors
         return jsonify({"error": str(e)}), 500
 
+@categories_bp.route('/<uuid:id>/merge', methods=['POST'])
+def merge_category(id: UUID):
+    """Move all expenses of a category to the target category and delete it."""
+    user_id = request.user_id
+    
+    try:
+        merge_data = CategoryMerge.parse_obj(request.json)
+        
+        moved_count = category_service.merge_category(user_id, id, merge_data.target_id)
+        if moved_count is None:
+            return jsonify({"error": "Category not found"}), 404
+            
+        return jsonify({"target_id": str(merge_data.target_id), "moved_count": moved_count}), 200
+        
+    except ValueError as e:
+        return jsonify({"error": "Validation error", "details": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @categories_bp.route('/suggestions', methods=['GET'])
 def get_category_suggestions():
     """Get AI-powered category suggestions based on expense description and amount."""
@@ -125,59 +228,82 @@ def get_category_suggestions():
     except ValueError:
         return jsonify({"error": "Invalid amount format. Must be a number"}), 400
     except Exception as e:
-        error_message = str(e).lower()
-        
-        # Handle different types of errors with appropriate status codes
-        if "timeout" in error_message or "timed out" in error_message:
-            # AI timeout error - return 502 Bad Gateway
-            return jsonify({
-                "error": "AI suggestion service unavailable", 
-                "message": "The service is temporarily unavailable. Please try again later."
-            }), 502
-            
-        elif "database" in error_message or "db error" in error_message:
-            # Database error - return 500 Internal Server Error
-            return jsonify({
-                "error": "Database error", 
-                "message": "An error occurred while retrieving category data."
-            }), 500
-            
-        elif "unable to access" in error_message:
-            # Data access error - return 500 Internal Server Error
-            return jsonify({
-                "error": "System error", 
-                "message": "Unable to process category suggestions at this time."
-            }), 500
-            
-        else:
-            # General AI service error - return 502 Bad Gateway
-            return jsonify({
-                "error": "AI service error", 
-                "message": "An error occurred while generating suggestions."
-            }), 502
+        return _suggestion_error_response(e)
+
+def _suggestion_error_response(e: Exception):
+    """Map a suggestion service error to a JSON error response."""
+    error_message = str(e).lower()
+    
+    # Handle different types of errors with appropriate status codes
+    if "timeout" in error_message or "timed out" in error_message:
+        # AI timeout error - return 502 Bad Gateway
+        return jsonify({
+            "error": "AI suggestion service unavailable", 
+            "message": "The service is temporarily unavailable. Please try again later."
+        }), 502
+        
+    elif "overloaded" in error_message:
+        # Suggestion queue full - return 503 Service Unavailable
+        return jsonify({
+            "error": "AI suggestion service busy", 
+            "message": "Too many suggestion requests. Please try again shortly."
+        }), 503, {"Retry-After": "1"}
+        
+    elif "database" in error_message or "db error" in error_message:
+        # Database error - return 500 Internal Server Error
+        return jsonify({
+            "error": "Database error", 
+            "message": "An error occurred while retrieving category data."
+        }), 500
+        
+    elif "unable to access" in error_message:
+        # Data access error - return 500 Internal Server Error
+        return jsonify({
+            "error": "System error", 
+            "message": "Unable to process category suggestions at this time."
+        }), 500
+        
+    else:
+        # General AI service error - return 502 Bad Gateway
+        return jsonify({
+            "error": "AI service error", 
+            "message": "An error occurred while generating suggestions."
+        }), 502
+
+@categories_bp.route('/suggestions/batch', methods=['POST'])
+def get_category_suggestions_batch():
+    """Get category suggestions for up to 5000 expenses (e.g. a CSV import) in one call."""
+    user_id = request.user_id
+    
+    try:
+        batch = CategorySuggestionBatchRequest.parse_obj(request.json)
+    except ValueError as e:
+        return jsonify({"error": "Validation error", "details": str(e)}), 400
+    
+    try:
+        results = category_service.suggest_categories_batch(
+            user_id, [(item.description, item.amount) for item in batch.items]
+        )
+        # Suggestion objects are shared between items, serialize each once
+        serialized = {}
+        def dump(suggestion: CategorySuggestion) -> dict:
+            if id(suggestion) not in serialized:
+                serialized[id(suggestion)] = suggestion.dict()
+            return serialized[id(suggestion)]
+        
+        return jsonify({
+            "suggestions": [[dump(suggestion) for suggestion in ranked] for ranked in results]
+        }), 200
+        
+    except Exception as e:
+        return _suggestion_error_response(e)
 
 @categories_bp.route('/initial-suggestions', methods=['GET'])
 def get_initial_suggestions():
-    """Get up to 5 AI-powered category suggestions for onboarding."""
+    """Get up to 5 category suggestions for onboarding."""
     user_id = request.user_id
     try:
-        # Fetch categories with usage counts
-        raw = category_service.get_categories_with_usage(user_id)
-        # Limit to 5 suggestions
-        items = raw[:5] if raw else []
-        # Map to Pydantic model
-        suggestions = []
-        for entry in items:
-            # entry should contain id, name, usage_count keys
-            try:
-                suggestion = CategorySuggestion.parse_obj({
-                    'id': entry.get('id'),
-                    'name': entry.get('name'),
-                    'usage_count': entry.get('usage_count')
-                })
-                suggestions.append(suggestion.dict())
-            except Exception:
-                continue
-        return jsonify(suggestions), 200
+        suggestions = category_service.get_initial_suggestions(user_id, limit=5)
+        return jsonify([suggestion.dict() for suggestion in suggestions]), 200
     except Exception as e:
         return jsonify({'error': 'Nie udało się pobrać propozycji kategorii'}), 500 
\ No newline at end of file
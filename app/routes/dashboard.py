@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, request
+
+from app.services.dashboard import DashboardService
+
+# Create dashboard blueprint
+dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
+dashboard_service = DashboardService()
+
+@dashboard_bp.route('', methods=['GET'])
+def get_dashboard():
+    """
+    Get everything the dashboard shows in one call.
+    
+    Returns:
+    - 200: {"weekly", "monthly", "categories", "recent_expenses", "tips"}
+    - 401: Unauthorized (handled by authentication middleware)
+    - 500: Server error
+    """
+    try:
+        dashboard = dashboard_service.get_dashboard(request.user_id)
+        return jsonify(dashboard.dict()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
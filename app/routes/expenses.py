@@ -4,7 +4,7 @@ from typing import Optional, Dict, Any, Callable, TypeVar, cast, List
 from datetime import datetime
 from functools import wraps
 
-from app.schemas import ExpenseCreate, ExpenseUpdate, ExpenseRead
+from app.schemas import ExpenseCreate, ExpenseUpdate, ExpenseRead, ExpenseRecategorize
 from app.services.expenses import ExpenseService
 
 expenses_bp = Blueprint('expenses', __name__, url_prefix='/expenses')
@@ -141,6 +141,28 @@ def list_expenses():
         # Log error
         return jsonify({"error": str(e)}), 500
 
+@expenses_bp.route('/autocomplete', methods=['GET'])
+def autocomplete_descriptions():
+    """Get the user's most frequent past descriptions starting with the prefix."""
+    user_id = request.user_id
+    
+    prefix = request.args.get('prefix', '')
+    if not prefix.strip():
+        return jsonify({"error": "Prefix parameter is required"}), 400
+    
+    try:
+        limit = int(request.args.get('limit', 5))
+        if limit < 1 or limit > 10:
+            raise ValueError()
+    except ValueError:
+        return jsonify({"error": "Invalid value for parameter 'limit'", "details": "Must be an integer between 1 and 10"}), 400
+    
+    try:
+        suggestions = expense_service.autocomplete_descriptions(user_id, prefix, limit)
+        return jsonify([suggestion.dict() for suggestion in suggestions]), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @expenses_bp.route('/<uuid:id>', methods=['GET'])
 def get_expense(id: UUID):
     """Get a specific expense by ID."""
@@ -252,6 +274,25 @@ def bulk_delete_expenses():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@expenses_bp.route('/recategorize', methods=['POST'])
+def recategorize_expenses():
+    """Move expenses selected by ids and/or filters to one category."""
+    user_id = request.user_id
+    
+    try:
+        command = ExpenseRecategorize.parse_obj(request.json)
+        
+        moved_count = expense_service.recategorize_expenses(user_id, command)
+        if moved_count is None:
+            return jsonify({"error": "Category not found"}), 404
+            
+        return jsonify({"moved_count": moved_count}), 200
+        
+    except ValueError as e:
+        return jsonify({"error": "Validation error", "details": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @expenses_bp.route('/summary', methods=['GET'])
 def get_summary():
     """Get a summary of expenses for the specified period."""
@@ -0,0 +1,47 @@
+import hmac
+import os
+
+from flask import Blueprint, current_app, jsonify, request
+
+from app.bounded_executor import bounded_executor_metrics
+from app.circuit_breaker import circuit_breaker_metrics
+from app.model_router import model_router_metrics
+from app.response_cache import response_cache_metrics
+from app.single_flight import single_flight_metrics
+
+# Create metrics blueprint
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+@metrics_bp.route('', methods=['GET'])
+def get_metrics():
+    """
+    Get runtime metrics of this worker process.
+    
+    Metrics are kept in memory per process, so with several gunicorn workers
+    each response describes only the worker that served it.
+    
+    Metrics describe the whole process, not the caller, so the endpoint is
+    for monitoring only: it takes `Authorization: Bearer <METRICS_TOKEN>`
+    instead of a user token and does not exist without METRICS_TOKEN.
+    
+    Returns:
+    - 200: Metrics grouped by component
+    - 401: Missing or wrong metrics token
+    - 404: METRICS_TOKEN not configured
+    """
+    expected = os.environ.get("METRICS_TOKEN")
+    if not expected:
+        return jsonify({"error": "Resource not found"}), 404
+    auth_header = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(auth_header.encode(), f"Bearer {expected}".encode()):
+        return jsonify({"error": "Unauthorized", "message": "Metrics token required"}), 401
+    
+    token_verifier = current_app.extensions.get("token_verifier")
+    return jsonify({
+        "circuit_breakers": circuit_breaker_metrics(),
+        "openrouter_cache": response_cache_metrics(),
+        "model_routers": model_router_metrics(),
+        "single_flight": single_flight_metrics(),
+        "executors": bounded_executor_metrics(),
+        "token_cache": token_verifier.metrics() if token_verifier is not None else None
+    }), 200
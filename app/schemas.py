@@ -1,7 +1,7 @@
 # app/schemas.py
 
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 from uuid import UUID
 from datetime import date, datetime
 from decimal import Decimal
@@ -27,6 +27,21 @@ class CategoryCreate(BaseModel):
 CategoryUpdate = CategoryCreate
 
 
+class CategoryBulkCreate(BaseModel):
+    """Command model for creating several categories at once (onboarding)."""
+    names: List[constr(max_length=30)] = Field(..., min_length=1, max_length=50)
+
+
+class CategoryBulkResult(CategoryRead):
+    """Per-name result of a bulk create; created is False for existing names."""
+    created: bool
+
+
+class CategoryMerge(BaseModel):
+    """Command model for merging a category into another one."""
+    target_id: UUID
+
+
 class CategorySuggestion(BaseModel):
     """AI-powered suggestion for existing categories."""
     id: UUID
@@ -34,6 +49,43 @@ class CategorySuggestion(BaseModel):
     usage_count: int
 
 
+class CategorySuggestionBatchItem(BaseModel):
+    """Single expense to suggest categories for."""
+    description: constr(max_length=100)
+    amount: float = Field(..., gt=0)
+
+
+class CategorySuggestionBatchRequest(BaseModel):
+    """Command model for batch category suggestions (imports, recategorization)."""
+    items: List[CategorySuggestionBatchItem] = Field(..., min_length=1, max_length=5000)
+
+
+class RuleKind(str, Enum):
+    keyword = "keyword"
+    prefix = "prefix"
+    regex = "regex"
+    amount = "amount"
+
+
+class CategorizationRuleCreate(BaseModel):
+    """Command model for a rule assigning a category to new uncategorized expenses."""
+    category_id: UUID
+    kind: RuleKind
+    pattern: Optional[constr(min_length=1, max_length=100)] = None
+    amount_min: Optional[condecimal(gt=0, max_digits=12, decimal_places=2)] = None
+    amount_max: Optional[condecimal(gt=0, max_digits=12, decimal_places=2)] = None
+    priority: int = Field(default=0, ge=0, le=1000)  # lower first
+
+
+# Alias for update (same structure as create)
+CategorizationRuleUpdate = CategorizationRuleCreate
+
+
+class CategorizationRuleRead(CategorizationRuleCreate):
+    """DTO for reading categorization rules."""
+    id: UUID
+
+
 # 2. Expense DTOs and Commands
 
 class ExpenseRead(BaseModel):
@@ -57,6 +109,26 @@ class ExpenseCreate(BaseModel):
 ExpenseUpdate = ExpenseCreate
 
 
+class ExpenseRecategorize(BaseModel):
+    """Command model for moving expenses, by id list and/or list filters, to one category."""
+    category_id: UUID
+    expense_ids: Optional[List[UUID]] = Field(default=None, min_length=1, max_length=5000)
+    source_category_id: Optional[UUID] = None
+    search: Optional[constr(max_length=100)] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    amount_min: Optional[float] = None
+    amount_max: Optional[float] = None
+
+
+class ExpenseAutocompleteSuggestion(BaseModel):
+    """Past description matching a typed prefix, with its most frequent category and amount."""
+    description: str
+    count: int
+    category_id: Optional[UUID] = None
+    amount: Optional[condecimal(gt=0, max_digits=12, decimal_places=2)] = None
+
+
 class Pagination(BaseModel):
     """Generic pagination metadata."""
     limit: int
@@ -83,7 +155,40 @@ class AiTip(BaseModel):
     message: str
 
 
-# 4. Logs (internal)
+# 4. LLM usage
+
+class LlmUsageTotals(BaseModel):
+    """Aggregated token usage, cost and latency of LLM calls."""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cost: float = 0.0
+    avg_latency_ms: float = 0.0
+    max_latency_ms: int = 0
+
+
+class LlmUsageDay(LlmUsageTotals):
+    """LLM usage of a single day (UTC)."""
+    day: date
+
+
+class LlmUsageByCaller(LlmUsageTotals):
+    """LLM usage of a single caller (tips, suggestions) and model."""
+    caller: str
+    model: str
+
+
+class LlmUsageReport(BaseModel):
+    """DTO for the LLM usage of a user over a date range."""
+    date_from: date
+    date_to: date
+    totals: LlmUsageTotals
+    days: List[LlmUsageDay]
+    by_caller: List[LlmUsageByCaller]
+
+
+# 5. Logs (internal)
 
 class LogType(str, Enum):
     info = "info"
@@ -100,4 +205,45 @@ class LogRead(BaseModel):
     type: LogType
     error_code: Optional[constr(max_length=50)] = None
     message: constr(max_length=500)
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+
+# 6. Batch requests
+
+class BatchSubRequest(BaseModel):
+    """Single API call inside POST /batch."""
+    method: Literal["GET", "POST", "PUT", "DELETE"] = "GET"
+    path: constr(pattern=r"^/[^?#]*$", max_length=200)  # query parameters go in `query`
+    query: Dict[str, Union[str, int, float, bool]] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    """Command model for running several API calls in one request."""
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=20)
+
+
+class BatchSubResponse(BaseModel):
+    """Result of one sub-request, in request order."""
+    status: int
+    body: Optional[Any] = None
+    duration_ms: float
+
+
+# 7. Dashboard
+
+class DashboardCategory(BaseModel):
+    """Current month's spending in one category."""
+    category_id: UUID
+    name: str
+    total_amount: condecimal(ge=0, max_digits=14, decimal_places=2)
+    transaction_count: int
+
+
+class Dashboard(BaseModel):
+    """DTO for everything the dashboard shows, read in one call."""
+    weekly: ExpenseSummary
+    monthly: ExpenseSummary
+    categories: List[DashboardCategory]
+    recent_expenses: List[ExpenseRead]
+    tips: List[AiTip]
@@ -1,53 +1,143 @@
-import time
-import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 from uuid import UUID
 
+from app.bounded_executor import DeadlineExceeded, ExecutorSaturated, get_bounded_executor
 from app.schemas import CategorySuggestion
+from app.services.category_classifier import CategoryClassifier, get_classifier_store
 from app.services.logs import log_error
 
+T = TypeVar('T')
+
+# Shared by all suggestion requests of this process
+SUGGESTION_WORKERS = 4
+SUGGESTION_QUEUE_SIZE = 16
+
 class AiTimeout(Exception):
     """Exception raised when AI processing times out."""
     pass
 
-def analyze_expense(description: str, amount: float, user_categories: List[Dict[str, Any]]) -> List[CategorySuggestion]:
+class AiOverloaded(Exception):
+    """Exception raised when the suggestion queue is full."""
+    pass
+
+def analyze_expense(description: str, amount: float, user_categories: List[Dict[str, Any]],
+                    classifier: Optional[CategoryClassifier] = None) -> List[CategorySuggestion]:
     """
-    Simulated AI model to analyze expense and suggest relevant categories.
-    In a real implementation, this would call an actual AI service or model.
+    Analyze an expense and suggest relevant categories.
+    
+    Categories are ranked by the user's naive Bayes classifier (description
+    n-grams and amount bucket). Categories the classifier has no data for
+    follow, ranked by usage_count, which is also the whole ranking for users
+    without categorized expenses yet.
     
     Args:
         description: The expense description
         amount: The expense amount
         user_categories: List of user's categories with usage data
+        classifier: The user's trained classifier, if available
         
     Returns:
         List of CategorySuggestion objects, ranked by relevance
     """
-    # This function simulates the AI processing time
-    time.sleep(0.5)  # Simulate AI processing delay
-    
-    # For now, we'll just rank by usage_count and return top matches
-    # In a real implementation, we would use NLP to analyze the description
-    # and possibly consider the amount as well
-    
-    # Sort categories by usage_count (descending)
-    sorted_categories = sorted(
-        user_categories, 
-        key=lambda x: x.get('usage_count', 0), 
-        reverse=True
-    )
+    return analyze_expenses([(description, amount)], user_categories, classifier)[0]
+
+def analyze_expenses(items: List[Tuple[str, float]], user_categories: List[Dict[str, Any]],
+                     classifier: Optional[CategoryClassifier] = None) -> List[List[CategorySuggestion]]:
+    """
+    Analyze many expenses in one pass, see `analyze_expense`.
     
-    # Return top 3 as suggestions
-    suggestions = []
-    for item in sorted_categories[:3]:
-        suggestions.append(CategorySuggestion(
-            id=UUID(item['id']),
+    Args:
+        items: (description, amount) pairs
+        user_categories: List of user's categories with usage data
+        classifier: The user's trained classifier, if available
+        
+    Returns:
+        One ranked list of CategorySuggestion objects per item, in input order
+    """
+    by_id = {str(item['id']): item for item in user_categories}
+    by_usage = sorted(user_categories, key=lambda x: x.get('usage_count', 0), reverse=True)
+    suggestion_for = {
+        str(item['id']): CategorySuggestion(
+            id=UUID(str(item['id'])),
             name=item['name'],
             usage_count=item['usage_count']
-        ))
+        )
+        for item in user_categories
+    }
+    
+    rankings = classifier.predict_many(items, by_id) if classifier is not None else [[] for _ in items]
+    
+    results = []
+    for ranking in rankings:
+        ranked = [category_id for category_id, _ in ranking[:3]]
+        # Fill up with the most used categories the classifier did not rank
+        for item in by_usage:
+            if len(ranked) >= 3:
+                break
+            if str(item['id']) not in ranked:
+                ranked.append(str(item['id']))
+        results.append([suggestion_for[category_id] for category_id in ranked])
+    
+    return results
+
+def _load_classifier(user_id: UUID) -> Optional[CategoryClassifier]:
+    """Load the user's classifier, None if it cannot be loaded."""
+    try:
+        return get_classifier_store().get(user_id)
+    except Exception as e:
+        # Without a model, suggestions degrade to usage-count ranking
+        log_error(
+            user_id=user_id,
+            error_code='CLASSIFIER_ERROR',
+            message=f"Failed to load category classifier: {str(e)}"
+        )
+        return None
+
+def _suggest(user_id: UUID, description: str, amount: float,
+             user_categories: List[Dict[str, Any]]) -> List[CategorySuggestion]:
+    """Load the user's classifier and rank categories with it."""
+    return analyze_expense(description, amount, user_categories, _load_classifier(user_id))
+
+def _suggest_many(user_id: UUID, items: List[Tuple[str, float]],
+                  user_categories: List[Dict[str, Any]]) -> List[List[CategorySuggestion]]:
+    """Load the user's classifier once and rank categories for every item."""
+    return analyze_expenses(items, user_categories, _load_classifier(user_id))
+
+def _run_with_deadline(user_id: UUID, task: Callable[..., T], *args: Any, timeout_seconds: float, context: str) -> T:
+    """
+    Run a suggestion task on the shared, bounded suggestion executor.
+    
+    The call returns within `timeout_seconds` even if the task is still
+    running; a late task is dropped (if still queued) or finishes in the
+    background with its result discarded.
     
-    return suggestions
+    Raises:
+        AiTimeout: If processing exceeds the timeout limit
+        AiOverloaded: If too many suggestions are already queued
+    """
+    executor = get_bounded_executor(
+        'category_suggestions',
+        max_workers=SUGGESTION_WORKERS,
+        max_queue=SUGGESTION_QUEUE_SIZE
+    )
+    try:
+        return executor.run(task, user_id, *args, timeout=timeout_seconds)
+    except ExecutorSaturated:
+        log_error(
+            user_id=user_id,
+            error_code='AI_OVERLOADED',
+            message=f"AI suggestion rejected, {SUGGESTION_QUEUE_SIZE} requests already queued"
+        )
+        raise AiOverloaded("AI suggestion service overloaded")
+    except DeadlineExceeded:
+        # Log the timeout error
+        log_error(
+            user_id=user_id,
+            error_code='AI_TIMEOUT',
+            message=f"AI suggestion timed out after {timeout_seconds} seconds for {context}"
+        )
+        # Raise a custom timeout exception
+        raise AiTimeout(f"AI suggestion processing timed out after {timeout_seconds} seconds")
 
 def get_category_suggestions_with_timeout(
     user_id: UUID, 
@@ -71,27 +161,38 @@ def get_category_suggestions_with_timeout(
         
     Raises:
         AiTimeout: If processing exceeds the timeout limit
+        AiOverloaded: If too many suggestions are already queued
+    """
+    return _run_with_deadline(
+        user_id, _suggest, description, amount, user_categories,
+        timeout_seconds=timeout_seconds,
+        context=f"description: {description[:100]}"
+    )
+
+def get_category_suggestions_batch(
+    user_id: UUID,
+    items: List[Tuple[str, float]],
+    user_categories: List[Dict[str, Any]],
+    timeout_seconds: float = 10.0
+) -> List[List[CategorySuggestion]]:
     """
-    result = None
+    Get category suggestions for many expenses as a single executor task.
     
-    # Create a thread pool executor
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        # Submit the AI analysis task
-        future = executor.submit(analyze_expense, description, amount, user_categories)
+    Args:
+        user_id: UUID of the authenticated user
+        items: (description, amount) pairs
+        user_categories: List of user's categories with usage data
+        timeout_seconds: Maximum time to wait for the whole batch
         
-        try:
-            # Wait for the result with a timeout
-            result = future.result(timeout=timeout_seconds)
-        except TimeoutError:
-            # Log the timeout error
-            log_error(
-                user_id=user_id,
-                error_code='AI_TIMEOUT',
-                message=f"AI suggestion timed out after {timeout_seconds} seconds for description: {description[:100]}"
-            )
-            # Cancel the task if possible
-            future.cancel()
-            # Raise a custom timeout exception
-            raise AiTimeout(f"AI suggestion processing timed out after {timeout_seconds} seconds")
-    
-    return result 
\ No newline at end of file
+    Returns:
+        One ranked list of CategorySuggestion objects per item, in input order
+        
+    Raises:
+        AiTimeout: If processing exceeds the timeout limit
+        AiOverloaded: If too many suggestions are already queued
+    """
+    return _run_with_deadline(
+        user_id, _suggest_many, items, user_categories,
+        timeout_seconds=timeout_seconds,
+        context=f"batch of {len(items)} items"
+    )
@@ -0,0 +1,275 @@
+"""
+Compact, token-budgeted prompt building for AI tips.
+
+Instead of embedding raw expense rows in the prompt, the user's recent history
+is reduced to a handful of features (per-category totals, week-over-week
+deltas, top merchants and outliers) and rendered as short plain-text lines, followed by the fixed instructions.
+Lower-priority lines are dropped until the prompt fits the token budget; the
+instructions, including the required JSON reply format, are never cut.
+"""
+import math
+from datetime import datetime, timedelta
+from statistics import median
+from typing import List, Dict, Any, Optional
+
+# Rough average for English/Polish text with BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+DEFAULT_PROMPT_TOKEN_BUDGET = 600
+
+# An expense is an outlier when it is this many times its category median
+OUTLIER_MEDIAN_RATIO = 3.0
+# ...and its category has at least this many expenses to compare against
+OUTLIER_MIN_SAMPLES = 3
+
+MAX_CATEGORIES = 8
+MAX_MERCHANTS = 5
+MAX_OUTLIERS = 3
+
+NEW_USER_PROMPT = (
+    "The user is new and hasn't recorded any expenses yet. "
+    "Give up to three concise, specific, actionable tips for new users about: "
+    "getting started with expense tracking, basic financial health, "
+    "and building a tracking habit.\n"
+    "Reply ONLY with a JSON array of objects with a \"message\" field, e.g. "
+    "[{\"message\": \"Track every expense for a week to get a baseline.\"}]"
+)
+
+TIPS_INSTRUCTIONS = (
+    "Based on the above summary of the user's expenses, give up to three concise, "
+    "specific, actionable tips about spending trends and anomalies, budgets "
+    "and savings opportunities.\n"
+    "Reply ONLY with a JSON array of objects with a \"message\" field, e.g. "
+    "[{\"message\": \"Your dining out expenses increased by 20% this week.\"}]"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of prompt tokens for a piece of text.
+
+    A character-based heuristic is used instead of a real tokenizer: it is
+    fast, dependency-free and accurate enough to keep prompts within budget.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    """Parse an ISO timestamp from Supabase into a naive datetime."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+def _category_name(row: Dict[str, Any]) -> str:
+    """Get the category name from a raw expense row."""
+    category = row.get('category') or row.get('categories') or {}
+    if isinstance(category, dict) and category.get('name'):
+        return category['name']
+    return row.get('category_name') or 'Uncategorized'
+
+
+def _pct_change(current: float, previous: float) -> Optional[float]:
+    """Percentage change from previous to current, None when undefined."""
+    if previous <= 0:
+        return None
+    return (current - previous) / previous * 100
+
+
+def extract_expense_features(expenses: List[Dict[str, Any]], now: Optional[datetime] = None,
+                             category_summary: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Reduce raw expense rows to the features the tips prompt needs.
+
+    Args:
+        expenses: Expense rows from the last 14 days (amount, description,
+            date_of_expense and a nested category with a name)
+        now: Reference time, defaults to the current time
+        category_summary: Optional per-category aggregates for the whole
+            window (name, sum_amount, count). They take precedence over totals
+            computed from `expenses`, which may be a truncated slice.
+
+    Returns:
+        Dictionary with week totals, per-category totals and deltas, top
+        merchants and outliers, each list sorted by importance
+    """
+    now = now or datetime.now()
+    week_start = now - timedelta(days=7)
+
+    this_week = {'total': 0.0, 'count': 0}
+    prev_week = {'total': 0.0, 'count': 0}
+    categories: Dict[str, Dict[str, Any]] = {}
+    merchants: Dict[str, Dict[str, Any]] = {}
+
+    for row in expenses:
+        try:
+            amount = float(row.get('amount') or 0)
+        except (TypeError, ValueError):
+            continue
+        date = _parse_date(row.get('date_of_expense'))
+        is_this_week = date is None or date >= week_start
+
+        week = this_week if is_this_week else prev_week
+        week['total'] += amount
+        week['count'] += 1
+
+        name = _category_name(row)
+        category = categories.setdefault(name, {
+            'name': name, 'total': 0.0, 'count': 0,
+            'this_week': 0.0, 'prev_week': 0.0, 'amounts': []
+        })
+        category['total'] += amount
+        category['count'] += 1
+        category['this_week' if is_this_week else 'prev_week'] += amount
+        category['amounts'].append(amount)
+
+        description = ' '.join((row.get('description') or '').lower().split())
+        if description:
+            merchant = merchants.setdefault(description, {'name': description, 'total': 0.0, 'count': 0})
+            merchant['total'] += amount
+            merchant['count'] += 1
+
+    for entry in category_summary or []:
+        name = entry.get('name') or 'Uncategorized'
+        category = categories.setdefault(name, {
+            'name': name, 'total': 0.0, 'count': 0,
+            'this_week': 0.0, 'prev_week': 0.0, 'amounts': []
+        })
+        category['total'] = float(entry.get('sum_amount') or 0)
+        category['count'] = int(entry.get('count') or 0)
+
+    # Outliers are judged against the median of their own category
+    outliers = []
+    for row in expenses:
+        name = _category_name(row)
+        amounts = categories.get(name, {}).get('amounts', [])
+        if len(amounts) < OUTLIER_MIN_SAMPLES:
+            continue
+        try:
+            amount = float(row.get('amount') or 0)
+        except (TypeError, ValueError):
+            continue
+        typical = median(amounts)
+        if typical > 0 and amount >= OUTLIER_MEDIAN_RATIO * typical:
+            date = _parse_date(row.get('date_of_expense'))
+            outliers.append({
+                'category': name,
+                'description': row.get('description') or '',
+                'amount': amount,
+                'date': date.date().isoformat() if date else None,
+                'ratio': amount / typical
+            })
+
+    category_list = sorted(categories.values(), key=lambda c: c['total'], reverse=True)
+    for category in category_list:
+        category['change_pct'] = _pct_change(category['this_week'], category['prev_week'])
+        del category['amounts']
+
+    return {
+        'this_week': this_week,
+        'prev_week': prev_week,
+        'change_pct': _pct_change(this_week['total'], prev_week['total']),
+        'categories': category_list[:MAX_CATEGORIES],
+        'merchants': sorted(merchants.values(), key=lambda m: (m['count'], m['total']), reverse=True)[:MAX_MERCHANTS],
+        'outliers': sorted(outliers, key=lambda o: o['ratio'], reverse=True)[:MAX_OUTLIERS]
+    }
+
+
+def _format_change(change_pct: Optional[float]) -> str:
+    """Format a percentage change, 'new' when there is no previous value."""
+    return 'new' if change_pct is None else f"{change_pct:+.0f}%"
+
+
+def render_features(features: Dict[str, Any]) -> str:
+    """
+    Render extracted features as compact plain-text lines.
+
+    Args:
+        features: Output of `extract_expense_features`
+
+    Returns:
+        Multi-line summary text
+    """
+    this_week, prev_week = features['this_week'], features['prev_week']
+    lines = [
+        f"This week: {this_week['total']:.2f} ({this_week['count']} tx); "
+        f"previous week: {prev_week['total']:.2f} ({prev_week['count']} tx); "
+        f"change: {_format_change(features['change_pct'])}"
+    ]
+
+    if features['categories']:
+        lines.append("Categories (14d total, count, this wk, prev wk, change):")
+        for c in features['categories']:
+            lines.append(
+                f"- {c['name']}: {c['total']:.2f}, {c['count']}, "
+                f"{c['this_week']:.2f}, {c['prev_week']:.2f}, {_format_change(c['change_pct'])}"
+            )
+
+    if features['merchants']:
+        lines.append("Top merchants (count, total):")
+        for m in features['merchants']:
+            lines.append(f"- {m['name']}: {m['count']}, {m['total']:.2f}")
+
+    if features['outliers']:
+        lines.append("Unusual expenses:")
+        for o in features['outliers']:
+            lines.append(
+                f"- {o['date'] or '?'} {o['category']} \"{o['description']}\": "
+                f"{o['amount']:.2f} ({o['ratio']:.1f}x category median)"
+            )
+
+    return '\n'.join(lines)
+
+
+def build_tips_prompt(expenses: List[Dict[str, Any]], token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+                      now: Optional[datetime] = None,
+                      category_summary: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Build the tips prompt from raw expenses within a token budget.
+
+    When the prompt is over budget, the least important entries are dropped
+    first: outliers, then merchants, then the smallest categories. The data
+    comes first and the instructions last, so a last-resort truncation only
+    shortens the data.
+
+    Args:
+        expenses: Expense rows from the last 14 days
+        token_budget: Maximum estimated prompt tokens
+        now: Reference time, defaults to the current time
+        category_summary: Optional per-category aggregates for the window
+
+    Returns:
+        Prompt for the AI service
+    """
+    if not expenses:
+        return NEW_USER_PROMPT
+
+    features = extract_expense_features(expenses, now, category_summary)
+
+    def render(data: str) -> str:
+        return f"{data}\n\n{TIPS_INSTRUCTIONS}"
+
+    data = render_features(features)
+    while estimate_tokens(render(data)) > token_budget:
+        if features['outliers']:
+            features['outliers'].pop()
+        elif features['merchants']:
+            features['merchants'].pop()
+        elif len(features['categories']) > 1:
+            features['categories'].pop()
+        else:
+            # Nothing left to drop, hard-truncate the data as a last resort
+            data_chars = token_budget * CHARS_PER_TOKEN - len(render(''))
+            return render(data[:max(data_chars, 0)])
+        data = render_features(features)
+
+    return render(data)
@@ -1,22 +1,135 @@
+import asyncio
+import threading
 import time
-import requests
 import os
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterator, Tuple
 from uuid import UUID
 import json
 
+import httpx
+
+from app.model_router import get_model_router
+from app.openrouter_service import OpenRouterError, OpenRouterService, OpenRouterUnavailableError
 from app.schemas import AiTip
+from app.response_cache import get_response_cache
+from app.single_flight import get_single_flight
+from app.services.ai_tips_prompt import build_tips_prompt, DEFAULT_PROMPT_TOKEN_BUDGET, NEW_USER_PROMPT
+from app.services.llm_usage import CALLER_TIPS, LlmUsageService
 from app.services.logs import log_error
 from app.services.database import get_supabase_client
 
+FALLBACK_TIP_MESSAGE = "Consider reviewing your recent expenses to identify potential savings opportunities."
+
+# Last successfully generated tips per user, served while the AI service is
+# unavailable (e.g. the OpenRouter circuit breaker is open)
+TIPS_CACHE_MAX_USERS = 1000
+TIPS_CACHE_TTL_SECONDS = 24 * 60 * 60
+_tips_cache: "OrderedDict[str, Tuple[float, List[AiTip]]]" = OrderedDict()
+_tips_cache_lock = threading.Lock()
+
+
+def get_cached_tips(user_id: UUID, limit: int = 3) -> List[AiTip]:
+    """
+    The user's last generated tips, without calling the AI service.
+    
+    Args:
+        user_id (UUID): The ID of the authenticated user
+        limit (int): Maximum number of tips to return
+        
+    Returns:
+        List[AiTip]: The last good tips if still fresh, otherwise an empty list
+    """
+    with _tips_cache_lock:
+        cached = _tips_cache.get(str(user_id))
+    if cached and time.monotonic() - cached[0] < TIPS_CACHE_TTL_SECONDS:
+        return cached[1][:limit]
+    return []
+
+
+class TipStreamParser:
+    """
+    Incrementally extracts complete tip objects from a streamed JSON array.
+    
+    The model answers with a JSON array of ``{"message": ...}`` objects, but
+    over a stream it arrives in arbitrary fragments. The parser tracks brace
+    depth (ignoring braces inside strings) and returns every top-level object
+    as soon as its closing brace has been seen. Text outside objects - the
+    array brackets, commas or a markdown code fence - is ignored.
+    """
+    
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next fragment of model output.
+        
+        Args:
+            chunk (str): Next piece of assistant content
+            
+        Returns:
+            List[Dict[str, Any]]: Objects completed by this fragment (may be empty)
+        """
+        completed = []
+        for char in chunk:
+            if self._depth > 0:
+                self._buffer.append(char)
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            
+            if char == '"' and self._depth > 0:
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._buffer = [char]
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads(''.join(self._buffer)))
+                    except json.JSONDecodeError:
+                        pass  # Malformed object - skip it and keep streaming
+                    self._buffer = []
+        return completed
+
+
+_tips_flight = get_single_flight("ai_tips")
+
+DEFAULT_AI_TIPS_MODELS = "openai/gpt-3.5-turbo,openai/gpt-4o-mini,mistralai/mistral-7b-instruct"
+
+
 class AiTipsService:
     """Service for generating AI-powered financial tips for users."""
     
     def __init__(self):
         self.api_key = os.environ.get("OPENROUTER_API_KEY")
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.timeout = 10  # 10-second timeout
+        # Candidate models, routed by observed latency with fallback on failure
+        self.models = [
+            m.strip() for m in os.environ.get("AI_TIPS_MODELS", DEFAULT_AI_TIPS_MODELS).split(",") if m.strip()
+        ] or DEFAULT_AI_TIPS_MODELS.split(",")
+        self.model = self.models[0]
+        self.system_prompt = "You are a helpful financial advisor assistant."
+        self.timeout = 10  # Upper bound, the circuit breaker adapts it to observed latency
         self.max_retries = 3
+        self.recent_expenses_limit = 200
+        self.prompt_token_budget = int(
+            os.environ.get("AI_TIPS_PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET)
+        )
+        self.usage_service = LlmUsageService()
         
     def get_tips(self, user_id: UUID, limit: int = 3) -> List[AiTip]:
         """
@@ -32,6 +145,12 @@ class AiTipsService:
         Raises:
             Exception: If AI service fails after retries
         """
+        # Concurrent requests for the same user (several tabs, double clicks)
+        # share one generation instead of each calling the AI service
+        return list(_tips_flight.do((str(user_id), limit), self._generate_tips, user_id, limit))
+    
+    def _generate_tips(self, user_id: UUID, limit: int) -> List[AiTip]:
+        """Generate tips for `get_tips`, falling back to cached or generic tips."""
         try:
             # Build prompt with user's financial data
             prompt = self._build_prompt(user_id)
@@ -41,8 +160,12 @@ class AiTipsService:
             
             # Process the AI response
             tips = self._process_ai_response(response, limit)
+            if tips:
+                # Only well-formed model output is remembered as the user's tips
+                self._cache_tips(user_id, tips)
+                return tips
             
-            return tips
+            return self._extract_tip_lines(response, limit) or self._fallback_tips(user_id, limit)
             
         except Exception as e:
             # Log any unexpected errors
@@ -51,74 +174,167 @@ class AiTipsService:
                 error_code='AI_TIPS_ERROR',
                 message=f"Error getting AI tips: {str(e)}"
             )
-            # Return a generic tip for MVP (in production we'd re-raise)
-            return [AiTip(message="Consider reviewing your recent expenses to identify potential savings opportunities.")]
+            # Serve the last good tips, or a generic tip for MVP (in production we'd re-raise)
+            return self._fallback_tips(user_id, limit)
     
-    def _build_prompt(self, user_id: UUID) -> str:
+    def stream_tips(self, user_id: UUID, limit: int = 3) -> Iterator[AiTip]:
         """
-        Build the prompt for the AI service using the user's expense patterns.
+        Stream AI-generated financial tips one by one as the model produces them.
+        
+        The OpenRouter call runs on a private event loop, so this generator can
+        be consumed directly from a synchronous Flask response.
         
         Args:
             user_id (UUID): The ID of the authenticated user
+            limit (int): Maximum number of tips to yield (default: 3, max: 3)
             
-        Returns:
-            str: Prompt for the AI service
+        Yields:
+            AiTip: Each tip as soon as it has been fully parsed
         """
-        # Get user's expense data from Supabase
-        expense_data = self._get_user_expense_data(user_id)
-        
-        # Check if we have enough data to generate meaningful tips
-        has_expenses = expense_data.get('recent_expenses') and len(expense_data.get('recent_expenses', [])) > 0
-        has_categories = expense_data.get('category_summary') and len(expense_data.get('category_summary', [])) > 0
+        loop = asyncio.new_event_loop()
+        tips = self._stream_tips_async(user_id, limit)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(tips.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(tips.aclose())
+            loop.close()
+    
+    async def _stream_tips_async(self, user_id: UUID, limit: int) -> AsyncIterator[AiTip]:
+        """
+        Async generator behind `stream_tips`.
         
-        if not has_expenses:
-            # If no expenses, use a prompt for new users
-            prompt = """
-            You are a financial advisor assistant. The user is new and hasn't recorded any expenses yet.
-            
-            Provide up to three concise, specific and actionable financial tips for new users.
-            
-            Your response should ONLY include the tips in a JSON array format, each with a 'message' field.
-            Focus on:
-            1. Getting started with expense tracking
-            2. Basic financial health tips
-            3. Habit formation for financial tracking
-            
-            Format example:
-            [
-                {"message": "Start by tracking all your expenses for a week to get a baseline understanding of your spending habits."},
-                {"message": "Set up categories for your regular expenses to help identify where your money is going."}
+        Falls back to cached or generic tips when the AI service fails before
+        the first tip was produced, mirroring `get_tips`.
+        """
+        emitted: List[AiTip] = []
+        try:
+            prompt = self._build_prompt(user_id)
+            self._check_usage_budget(user_id)
+            messages = [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": prompt}
             ]
-            """
-            return prompt
+            parser = TipStreamParser()
+            
+            async with OpenRouterService(
+                api_key=self.api_key,
+                model_name=self.model,
+                timeout=self.timeout,
+                model_router=get_model_router("ai_tips", self.models),
+                usage_recorder=self.usage_service.recorder_for(user_id, CALLER_TIPS)
+            ) as service:
+                deltas = service.stream_chat_completion(
+                    messages,
+                    model_params={"temperature": 0.7, "max_tokens": 300}
+                )
+                # aclosing() releases the HTTP stream as soon as we stop early
+                async with aclosing(deltas):
+                    async for delta in deltas:
+                        for tip_data in parser.feed(delta):
+                            if isinstance(tip_data, dict) and 'message' in tip_data:
+                                tip = AiTip(message=tip_data['message'])
+                                emitted.append(tip)
+                                yield tip
+                                if len(emitted) >= limit:
+                                    break
+                        if len(emitted) >= limit:
+                            break
+            
+            if emitted:
+                self._cache_tips(user_id, emitted)
+                
+        except Exception as e:
+            log_error(
+                user_id=user_id,
+                error_code='AI_TIPS_STREAM_ERROR',
+                message=f"Error streaming AI tips: {str(e)}"
+            )
         
-        # Build prompt based on expense data
-        prompt = f"""
-        You are a financial advisor assistant. Based on the following user's expense data, 
-        provide up to three concise, specific and actionable financial tips:
+        if not emitted:
+            for tip in self._fallback_tips(user_id, limit):
+                yield tip
+    
+    def _cache_tips(self, user_id: UUID, tips: List[AiTip]) -> None:
+        """
+        Remember the last successfully generated tips for the user, in this
+        process and in the `ai_tips_latest` table.
         
-        User's recent expenses:
-        {json.dumps(expense_data, indent=2)}
+        Args:
+            user_id (UUID): The ID of the authenticated user
+            tips (List[AiTip]): Tips to remember
+        """
+        key = str(user_id)
+        with _tips_cache_lock:
+            _tips_cache[key] = (time.monotonic(), list(tips))
+            _tips_cache.move_to_end(key)
+            while len(_tips_cache) > TIPS_CACHE_MAX_USERS:
+                _tips_cache.popitem(last=False)
         
-        Your response should ONLY include the tips in a JSON array format, each with a 'message' field.
-        Focus on:
-        1. Spending trends and anomalies
-        2. Budget recommendations
-        3. Savings opportunities
+        # Stored for every worker too; the dashboard reads them from there
+        try:
+            get_supabase_client().table('ai_tips_latest').upsert({
+                'user_id': key,
+                'tips': [tip.dict() for tip in tips],
+                'generated_at': datetime.now(timezone.utc).isoformat()
+            }).execute()
+        except Exception as e:
+            # The tips were generated fine, so a failed save must not fail the request
+            try:
+                log_error(
+                    user_id=user_id,
+                    message=f"Failed to save AI tips: {str(e)}",
+                    error_code="AI_TIPS_SAVE_ERROR"
+                )
+            except Exception:
+                pass
+    
+    def _fallback_tips(self, user_id: UUID, limit: int) -> List[AiTip]:
+        """
+        Tips to serve when the AI service is unavailable.
         
-        Format example:
-        [
-            {{"message": "Your dining out expenses increased by 20% this week."}},
-            {{"message": "Consider setting a budget for entertainment."}}
-        ]
+        Args:
+            user_id (UUID): The ID of the authenticated user
+            limit (int): Maximum number of tips to return
+            
+        Returns:
+            List[AiTip]: The user's last good tips if still fresh, otherwise a generic tip
         """
+        return get_cached_tips(user_id, limit) or [AiTip(message=FALLBACK_TIP_MESSAGE)]
+    
+    def _build_prompt(self, user_id: UUID) -> str:
+        """
+        Build the prompt for the AI service using the user's expense patterns.
         
-        return prompt
+        The raw expenses are reduced to a compact feature summary that fits
+        within `prompt_token_budget` (see `app.services.ai_tips_prompt`).
+        
+        Args:
+            user_id (UUID): The ID of the authenticated user
+            
+        Returns:
+            str: Prompt for the AI service
+        """
+        # Get user's expense data from Supabase
+        expense_data = self._get_user_expense_data(user_id)
+        
+        return build_tips_prompt(
+            expense_data.get('recent_expenses') or [],
+            token_budget=self.prompt_token_budget,
+            category_summary=expense_data.get('category_summary')
+        )
     
     def _get_user_expense_data(self, user_id: UUID) -> Dict[str, Any]:
         """
         Get the user's expense data from the database.
         
+        Uses the `get_ai_tips_context` RPC, which returns the most recent
+        expenses of the last 2 weeks together with per-category sums and
+        counts for the whole window.
+        
         Args:
             user_id (UUID): The ID of the authenticated user
             
@@ -131,31 +347,20 @@ class AiTipsService:
             # Get last 2 weeks of expenses
             two_weeks_ago = time.strftime("%Y-%m-%d", time.localtime(time.time() - 14 * 24 * 60 * 60))
             
-            # Query expenses
-            response = supabase.table('expenses').select(
-                'id,amount,description,date_of_expense,category:categories(id,name)'
-            ).eq(
-                'user_id', str(user_id)
-            ).gte(
-                'date_of_expense', two_weeks_ago
-            ).order(
-                'date_of_expense', desc=True
-            ).execute()
-            
-            # Get category summary
-            category_summary = supabase.table('expenses').select(
-                'category_id,categories(name),sum_amount:amount(sum),count:id(count)'
-            ).eq(
-                'user_id', str(user_id)
-            ).gte(
-                'date_of_expense', two_weeks_ago
-            ).group(
-                'category_id,categories(name)'
+            # Recent expenses and per-category aggregates in one round-trip
+            response = supabase.rpc(
+                'get_ai_tips_context',
+                {
+                    'user_id_param': str(user_id),
+                    'since_param': two_weeks_ago,
+                    'recent_limit_param': self.recent_expenses_limit
+                }
             ).execute()
             
+            context = response.data or {}
             expense_data = {
-                'recent_expenses': response.data[:20],  # Limit to 20 most recent expenses
-                'category_summary': category_summary.data
+                'recent_expenses': context.get('recent_expenses') or [],
+                'category_summary': context.get('category_summary') or []
             }
             
             return expense_data
@@ -174,6 +379,10 @@ class AiTipsService:
         """
         Call the AI service with retry logic and timeout handling.
         
+        Goes through `OpenRouterService`, so retries, adaptive timeouts and
+        the process-wide circuit breaker are shared with every other
+        OpenRouter caller. While the breaker is open the call fails fast.
+        
         Args:
             user_id (UUID): The ID of the authenticated user
             prompt (str): The prompt for the AI service
@@ -192,64 +401,91 @@ class AiTipsService:
                 message="OpenRouter API key not configured"
             )
             raise Exception("OpenRouter API key not configured")
+        
+        self._check_usage_budget(user_id)
+        
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        
+        try:
+            # The new-user prompt is identical for everyone, so its tips are
+            # worth reusing even though they are sampled at temperature 0.7
+            return asyncio.run(self._chat_completion(user_id, messages, cache=prompt == NEW_USER_PROMPT))
+            
+        except OpenRouterUnavailableError as e:
+            log_error(
+                user_id=user_id,
+                error_code='AI_CIRCUIT_OPEN',
+                message=f"AI service call skipped: {str(e)}"
+            )
+            raise Exception("AI service unavailable, circuit breaker is open")
             
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        except httpx.TimeoutException:
+            log_error(
+                user_id=user_id,
+                error_code='AI_TIMEOUT',
+                message=f"AI service timeout after {self.max_retries} attempts"
+            )
+            raise Exception("AI service timeout after maximum retries")
+            
+        except (httpx.HTTPError, OpenRouterError) as e:
+            log_error(
+                user_id=user_id,
+                error_code='AI_ERROR',
+                message=f"AI service error: {str(e)}"
+            )
+            raise Exception(f"AI service error after maximum retries: {str(e)}")
+    
+    def _check_usage_budget(self, user_id: UUID) -> None:
+        """
+        Refuse to call the AI service once the user's daily token budget is used up.
         
-        payload = {
-            "model": "openai/gpt-3.5-turbo",
-            "messages": [
-                {"role": "system", "content": "You are a helpful financial advisor assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 300
-        }
+        Args:
+            user_id (UUID): The ID of the authenticated user
+            
+        Raises:
+            Exception: If the budget is exceeded
+        """
+        if self.usage_service.is_over_budget(user_id):
+            log_error(
+                user_id=user_id,
+                error_code='AI_BUDGET_EXCEEDED',
+                message=f"Daily LLM token budget of {self.usage_service.daily_token_budget} exceeded"
+            )
+            raise Exception("AI usage budget exceeded")
+    
+    async def _chat_completion(self, user_id: UUID, messages: List[Dict[str, str]],
+                               cache: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Run a single chat completion on a short-lived OpenRouterService.
         
-        # Try up to max_retries times
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.post(
-                    self.base_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=self.timeout
-                )
-                
-                # Raise exception for HTTP errors
-                response.raise_for_status()
-                
-                # Return JSON response
-                return response.json()
-                
-            except requests.exceptions.Timeout:
-                # Log timeout error
-                log_error(
-                    user_id=user_id,
-                    error_code='AI_TIMEOUT',
-                    message=f"AI service timeout (attempt {attempt + 1}/{self.max_retries})"
-                )
-                
-                # Retry or raise exception on last attempt
-                if attempt == self.max_retries - 1:
-                    raise Exception("AI service timeout after maximum retries")
-                    
-            except requests.exceptions.RequestException as e:
-                # Log error
-                log_error(
-                    user_id=user_id,
-                    error_code='AI_ERROR',
-                    message=f"AI service error: {str(e)} (attempt {attempt + 1}/{self.max_retries})"
-                )
-                
-                # Retry or raise exception on last attempt
-                if attempt == self.max_retries - 1:
-                    raise Exception(f"AI service error after maximum retries: {str(e)}")
-                    
-                # Wait before retrying (exponential backoff)
-                time.sleep(2 ** attempt)  # 1, 2, 4 seconds
+        Token usage of the call is recorded against the user.
+        
+        Args:
+            user_id (UUID): The ID of the authenticated user
+            messages (List[Dict[str, str]]): Chat messages to send
+            cache (Optional[bool]): Response cache policy, see `OpenRouterService.chat_completion`
+            
+        Returns:
+            Dict[str, Any]: Response from the AI service
+        """
+        async with OpenRouterService(
+            api_key=self.api_key,
+            model_name=self.model,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            backoff_factor=1.0,  # 1, 2, 4 seconds between attempts
+            response_cache=get_response_cache(),
+            model_router=get_model_router("ai_tips", self.models),
+            usage_recorder=self.usage_service.recorder_for(user_id, CALLER_TIPS)
+        ) as service:
+            return await service.chat_completion(
+                messages,
+                model_params={"temperature": 0.7, "max_tokens": 300},
+                cache=cache
+            )
     
     def _process_ai_response(self, response: Dict[str, Any], limit: int) -> List[AiTip]:
         """
@@ -260,7 +496,7 @@ class AiTipsService:
             limit (int): Maximum number of tips to return
             
         Returns:
-            List[AiTip]: List of AI-generated financial tips
+            List[AiTip]: Tips parsed from the model's JSON answer, empty if it is malformed
         """
         try:
             # Extract content from response
@@ -274,31 +510,35 @@ class AiTipsService:
             for tip_data in tips_data[:limit]:
                 if isinstance(tip_data, dict) and 'message' in tip_data:
                     tips.append(AiTip(message=tip_data['message']))
-            
-            # If we got no valid tips, fall back to a generic tip
-            if not tips:
-                return [AiTip(message="Consider reviewing your recent expenses to identify potential savings opportunities.")]
-                
             return tips
             
-        except (KeyError, json.JSONDecodeError, TypeError, IndexError) as e:
-            # If parsing fails, try to extract any text that looks like a tip
-            content = response.get('choices', [{}])[0].get('message', {}).get('content', '')
+        except (KeyError, json.JSONDecodeError, TypeError, IndexError):
+            return []
+    
+    def _extract_tip_lines(self, response: Dict[str, Any], limit: int) -> List[AiTip]:
+        """
+        Salvage tips from a response that is not the requested JSON array.
+        
+        Args:
+            response (Dict[str, Any]): Response from the AI service
+            limit (int): Maximum number of tips to return
             
-            # Create fallback tips
-            fallback_tips = []
-            lines = content.split('\n')
-            for line in lines:
-                # Look for lines that might be tips
-                line = line.strip()
-                if line and len(line) > 10 and len(line) < 200 and not line.startswith('{') and not line.startswith('['):
-                    fallback_tips.append(AiTip(message=line))
-                    if len(fallback_tips) >= limit:
-                        break
-            
-            # If we found any usable tips, return them
-            if fallback_tips:
-                return fallback_tips
-                
-            # Otherwise, return a generic tip
-            return [AiTip(message="Consider reviewing your recent expenses to identify potential savings opportunities.")] 
\ No newline at end of file
+        Returns:
+            List[AiTip]: Lines of the answer that look like tips, possibly empty
+        """
+        try:
+            content = response.get('choices', [{}])[0].get('message', {}).get('content', '')
+        except (AttributeError, IndexError):
+            return []
+        if not isinstance(content, str):
+            return []
+        
+        fallback_tips = []
+        for line in content.split('\n'):
+            # Look for lines that might be tips
+            line = line.strip()
+            if line and len(line) > 10 and len(line) < 200 and not line.startswith('{') and not line.startswith('['):
+                fallback_tips.append(AiTip(message=line))
+                if len(fallback_tips) >= limit:
+                    break
+        return fallback_tips
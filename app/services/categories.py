@@ -1,10 +1,148 @@
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
-from app.schemas import CategoryRead, CategorySuggestion
+from app.invalidation_channel import cache_version, publish_invalidation
+from app.schemas import CategoryRead, CategoryBulkResult, CategorySuggestion
 from app.services.database import get_supabase_client
 from app.services.logs import log_error
-from app.services.ai import get_category_suggestions_with_timeout, AiTimeout
+from app.services.ai import (
+    get_category_suggestions_with_timeout, get_category_suggestions_batch, AiOverloaded, AiTimeout
+)
+from app.services.categorization_rules import get_rule_matcher, invalidate_rule_cache
+from app.services.category_classifier import amount_bucket, get_classifier_store, normalize_description
+from app.services.category_popularity import get_category_popularity
+from app.services.description_index import get_description_index_store
+from app.single_flight import get_single_flight
+
+_usage_flight = get_single_flight("category_usage")
+
+# Suggestions per user, keyed by (normalized description, amount bucket).
+# Invalidated on category and expense writes; with CACHE_INVALIDATION_PATH set,
+# writes in other workers invalidate it too.
+SUGGESTION_CACHE_MAX_USERS = 1000
+SUGGESTION_CACHE_MAX_ENTRIES_PER_USER = 100
+SUGGESTION_CACHE_TTL_SECONDS = 5 * 60
+# user id -> key -> (cached at, version, suggestions)
+_suggestion_cache: "OrderedDict[str, OrderedDict[Tuple[str, Optional[int]], Tuple[float, Optional[int], List[CategorySuggestion]]]]" = OrderedDict()
+_suggestion_cache_lock = threading.Lock()
+
+
+# Category lists per user. Invalidated by category writes; with
+# CACHE_INVALIDATION_PATH set, writes in other workers invalidate it too.
+CATEGORY_CACHE_MAX_USERS = 1000
+CATEGORY_CACHE_TTL_SECONDS = 10 * 60
+# user id -> (cached at, version, categories)
+_category_cache: "OrderedDict[str, Tuple[float, Optional[int], List[CategoryRead]]]" = OrderedDict()
+_category_cache_lock = threading.Lock()
+
+
+def invalidate_category_cache(user_id: UUID) -> None:
+    """
+    Drop the user's cached category list in this and, if configured, every other worker.
+    
+    Args:
+        user_id: UUID of the user
+    """
+    with _category_cache_lock:
+        _category_cache.pop(str(user_id), None)
+    publish_invalidation(f"categories:{user_id}")
+
+
+def invalidate_suggestion_cache(user_id: UUID) -> None:
+    """
+    Drop the user's cached category suggestions in this and, if configured,
+    every other worker.
+    
+    Call after any change to the user's categories or to expense categories
+    (which changes usage counts and the classifier).
+    
+    Args:
+        user_id: UUID of the user
+    """
+    with _suggestion_cache_lock:
+        _suggestion_cache.pop(str(user_id), None)
+    publish_invalidation(f"suggestions:{user_id}")
+
+
+def _suggestion_cache_version(user_id: UUID) -> Optional[int]:
+    """Version of the user's suggestions; None when it cannot be read."""
+    return cache_version(f"suggestions:{user_id}")
+
+
+def _get_cached_suggestions(
+    user_id: UUID, key: Tuple[str, Optional[int]], version: Optional[int]
+) -> Optional[List[CategorySuggestion]]:
+    """Cached suggestions for the key, None on a miss, expired or invalidated entry."""
+    if version is None:
+        return None
+    with _suggestion_cache_lock:
+        entries = _suggestion_cache.get(str(user_id))
+        if entries is None:
+            return None
+        cached = entries.get(key)
+        if (cached is None or cached[1] != version
+                or time.monotonic() - cached[0] >= SUGGESTION_CACHE_TTL_SECONDS):
+            return None
+        entries.move_to_end(key)
+        _suggestion_cache.move_to_end(str(user_id))
+        return list(cached[2])
+
+
+def _cache_suggestions(
+    user_id: UUID, key: Tuple[str, Optional[int]], version: Optional[int], suggestions: List[CategorySuggestion]
+) -> None:
+    """Remember suggestions for the key, evicting least recently used users and keys."""
+    if version is None:
+        return
+    with _suggestion_cache_lock:
+        entries = _suggestion_cache.setdefault(str(user_id), OrderedDict())
+        entries[key] = (time.monotonic(), version, list(suggestions))
+        entries.move_to_end(key)
+        while len(entries) > SUGGESTION_CACHE_MAX_ENTRIES_PER_USER:
+            entries.popitem(last=False)
+        _suggestion_cache.move_to_end(str(user_id))
+        while len(_suggestion_cache) > SUGGESTION_CACHE_MAX_USERS:
+            _suggestion_cache.popitem(last=False)
+
+
+# Postgres SQLSTATEs mapped to service errors
+UNIQUE_VIOLATION = '23505'
+FOREIGN_KEY_VIOLATION = '23503'
+NO_DATA_FOUND = 'P0002'  # raised by RPCs for another user's or a missing row
+INVALID_PARAMETER_VALUE = '22023'  # raised by RPCs for invalid requests
+
+
+class CategoryNameConflict(Exception):
+    """Raised when a write would duplicate one of the user's category names."""
+
+
+def _is_unique_violation(error: Exception) -> bool:
+    """True for a PostgREST error caused by a unique constraint."""
+    return getattr(error, 'code', None) == UNIQUE_VIOLATION
+
+
+def _apply_rules(rule_matches: List[Optional[str]], results: List[List[CategorySuggestion]],
+                 user_categories: List[Dict[str, Any]]) -> List[List[CategorySuggestion]]:
+    """Rank the category chosen by a rule first in each item's suggestions."""
+    by_id = {str(category['id']): category for category in user_categories}
+    # Shared between items, like the classifier's suggestions
+    ruled: Dict[str, CategorySuggestion] = {}
+    for index, category_id in enumerate(rule_matches):
+        if category_id is None or category_id not in by_id:
+            continue
+        if category_id not in ruled:
+            category = by_id[category_id]
+            ruled[category_id] = CategorySuggestion(
+                id=UUID(category_id), name=category['name'], usage_count=category.get('usage_count', 0)
+            )
+        results[index] = [ruled[category_id]] + [
+            suggestion for suggestion in results[index] if str(suggestion.id) != category_id
+        ]
+    return results
+
 
 class CategoryService:
     """Service class for managing category operations."""
@@ -23,6 +161,18 @@ class CategoryService:
         Returns:
             List of CategoryRead objects
         """
+        key = str(user_id)
+        # Read the version before querying, so a write racing with the query
+        # leaves an entry that the next read already treats as stale
+        version = cache_version(f"categories:{key}")
+        
+        with _category_cache_lock:
+            cached = _category_cache.get(key)
+            if (cached is not None and version is not None and cached[1] == version
+                    and time.monotonic() - cached[0] < CATEGORY_CACHE_TTL_SECONDS):
+                _category_cache.move_to_end(key)
+                return list(cached[2])
+        
         # Query categories from Supabase
         response = self.supabase.table('categories') \
             .select('id, name, is_default') \
@@ -38,6 +188,13 @@ class CategoryService:
                 is_default=item['is_default']
             ))
         
+        if version is not None:
+            with _category_cache_lock:
+                _category_cache[key] = (time.monotonic(), version, list(categories))
+                _category_cache.move_to_end(key)
+                while len(_category_cache) > CATEGORY_CACHE_MAX_USERS:
+                    _category_cache.popitem(last=False)
+        
         return categories
     
     def get_category(self, user_id: UUID, category_id: UUID) -> Optional[CategoryRead]:
@@ -71,6 +228,10 @@ class CategoryService:
         """
         Create a new category for the user.
         
+        The insert relies on the unique_name_per_user constraint instead of a
+        prior duplicate lookup, so concurrent creates of the same name cannot
+        both succeed.
+        
         Args:
             user_id: UUID of the authenticated user
             name: Name of the new category (max 30 chars)
@@ -79,30 +240,26 @@ class CategoryService:
             The created CategoryRead object
             
         Raises:
-            Exception: If a duplicate name is found
+            CategoryNameConflict: If the user already has a category with this name
         """
-        # Check for duplicate name
-        existing = self.supabase.table('categories') \
-            .select('id') \
-            .eq('user_id', str(user_id)) \
-            .eq('name', name) \
-            .execute()
-            
-        if existing.data:
-            raise ValueError("Category with this name already exists")
-        
-        # Insert new category
-        response = self.supabase.table('categories') \
-            .insert({
-                'name': name,
-                'user_id': str(user_id),
-                'is_default': False
-            }) \
-            .execute()
+        try:
+            response = self.supabase.table('categories') \
+                .insert({
+                    'name': name,
+                    'user_id': str(user_id),
+                    'is_default': False
+                }) \
+                .execute()
+        except Exception as e:
+            if _is_unique_violation(e):
+                raise CategoryNameConflict("Category with this name already exists") from e
+            raise
         
         if not response.data:
             raise Exception("Failed to create category")
             
+        invalidate_suggestion_cache(user_id)
+        invalidate_category_cache(user_id)
         item = response.data[0]
         return CategoryRead(
             id=UUID(item['id']),
@@ -110,10 +267,58 @@ class CategoryService:
             is_default=item['is_default']
         )
     
+    def create_categories_bulk(self, user_id: UUID, names: List[str]) -> List[CategoryBulkResult]:
+        """
+        Create several categories in one statement, skipping names that already exist.
+        
+        Args:
+            user_id: UUID of the authenticated user
+            names: Category names (max 30 chars each); repeated names are created once
+        
+        Returns:
+            One CategoryBulkResult per distinct name, in request order
+        """
+        names = list(dict.fromkeys(names))
+        response = self.supabase.rpc('create_categories_bulk', {
+            'user_id_param': str(user_id),
+            'names_param': names
+        }).execute()
+        rows = {row['name']: row for row in response.data or []}
+        
+        # A name inserted by a concurrent request after the statement started is
+        # neither inserted nor visible to it; read those back
+        missing = [name for name in names if not rows.get(name, {}).get('id')]
+        if missing:
+            existing = self.supabase.table('categories') \
+                .select('id, name, is_default') \
+                .eq('user_id', str(user_id)) \
+                .in_('name', missing) \
+                .execute()
+            for item in existing.data or []:
+                rows[item['name']] = {**item, 'created': False}
+        
+        results = [
+            CategoryBulkResult(
+                id=UUID(rows[name]['id']),
+                name=name,
+                is_default=rows[name]['is_default'],
+                created=rows[name]['created']
+            )
+            for name in names if rows.get(name, {}).get('id')
+        ]
+        if any(result.created for result in results):
+            invalidate_suggestion_cache(user_id)
+            invalidate_category_cache(user_id)
+        return results
+    
     def update_category(self, user_id: UUID, category_id: UUID, name: str) -> Optional[CategoryRead]:
         """
         Update an existing category.
         
+        The rename is a single UPDATE guarded by is_default; the category is
+        only read back when no row matched, to tell a missing category from
+        the default one.
+        
         Args:
             user_id: UUID of the authenticated user
             category_id: UUID of the category to update
@@ -124,37 +329,28 @@ class CategoryService:
             
         Raises:
             ValueError: If attempting to rename the default category
-            Exception: If a duplicate name is found
+            CategoryNameConflict: If the user already has a category with this name
         """
-        # First get the category to check if it's default
-        category = self.get_category(user_id, category_id)
-        if not category:
-            return None
-            
-        if category.is_default:
-            raise ValueError("Cannot rename the default category")
-        
-        # Check for duplicate name
-        existing = self.supabase.table('categories') \
-            .select('id') \
-            .eq('user_id', str(user_id)) \
-            .eq('name', name) \
-            .neq('id', str(category_id)) \
-            .execute()
-            
-        if existing.data:
-            raise ValueError("Category with this name already exists")
-        
-        # Update the category
-        response = self.supabase.table('categories') \
-            .update({'name': name}) \
-            .eq('user_id', str(user_id)) \
-            .eq('id', str(category_id)) \
-            .execute()
+        try:
+            response = self.supabase.table('categories') \
+                .update({'name': name}) \
+                .eq('user_id', str(user_id)) \
+                .eq('id', str(category_id)) \
+                .eq('is_default', False) \
+                .execute()
+        except Exception as e:
+            if _is_unique_violation(e):
+                raise CategoryNameConflict("Category with this name already exists") from e
+            raise
         
         if not response.data:
+            category = self.get_category(user_id, category_id)
+            if category and category.is_default:
+                raise ValueError("Cannot rename the default category")
             return None
             
+        invalidate_suggestion_cache(user_id)
+        invalidate_category_cache(user_id)
         item = response.data[0]
         return CategoryRead(
             id=UUID(item['id']),
@@ -162,6 +358,45 @@ class CategoryService:
             is_default=item['is_default']
         )
     
+    def merge_category(self, user_id: UUID, source_id: UUID, target_id: UUID) -> Optional[int]:
+        """
+        Move all expenses of a category to another one and delete it.
+        
+        Runs as one RPC transaction; usage counts are kept by the expense
+        triggers and the classifier is relabelled instead of retrained.
+        
+        Args:
+            user_id: UUID of the authenticated user
+            source_id: UUID of the category to merge away
+            target_id: UUID of the category receiving its expenses
+            
+        Returns:
+            Number of moved expenses, or None if either category is not found
+            
+        Raises:
+            ValueError: If merging the default category or a category into itself
+        """
+        try:
+            response = self.supabase.rpc('merge_categories', {
+                'user_id_param': str(user_id),
+                'source_id_param': str(source_id),
+                'target_id_param': str(target_id)
+            }).execute()
+        except Exception as e:
+            code = getattr(e, 'code', None)
+            if code == NO_DATA_FOUND:
+                return None
+            if code == INVALID_PARAMETER_VALUE:
+                raise ValueError(getattr(e, 'message', None) or str(e)) from e
+            raise
+        
+        invalidate_suggestion_cache(user_id)
+        invalidate_category_cache(user_id)
+        invalidate_rule_cache(user_id)
+        get_classifier_store().merge(user_id, source_id, target_id)
+        get_description_index_store().reset(user_id)
+        return response.data or 0
+    
     def delete_category(self, user_id: UUID, category_id: UUID) -> bool:
         """
         Delete a category.
@@ -191,6 +426,12 @@ class CategoryService:
             .eq('id', str(category_id)) \
             .execute()
             
+        # Expenses of the deleted category moved to the default one
+        invalidate_suggestion_cache(user_id)
+        invalidate_category_cache(user_id)
+        invalidate_rule_cache(user_id)
+        # Expenses moved to the default category
+        get_description_index_store().reset(user_id)
         return len(response.data) > 0
     
     def get_categories_with_usage(self, user_id: UUID) -> List[Dict[str, Any]]:
@@ -202,16 +443,23 @@ class CategoryService:
             
         Returns:
             List of dictionaries with category data including usage counts
+            (shared with concurrent callers, treat as read-only)
             
         Raises:
             Exception: If database errors occur
         """
+        return _usage_flight.do(str(user_id), self._fetch_categories_with_usage, user_id)
+    
+    def _fetch_categories_with_usage(self, user_id: UUID) -> List[Dict[str, Any]]:
+        """Run the usage count query for `get_categories_with_usage`."""
         try:
-            # Query stored procedure to get categories with usage counts
-            response = self.supabase.rpc(
-                'get_category_usage_counts',
-                {'user_id_param': str(user_id)}
-            ).execute()
+            # usage_count is kept current by triggers on expenses, so this is
+            # an indexed read of the user's categories (most used first)
+            response = self.supabase.table('categories') \
+                .select('id, name, usage_count') \
+                .eq('user_id', str(user_id)) \
+                .order('usage_count', desc=True) \
+                .execute()
             
             return response.data
         except Exception as e:
@@ -224,6 +472,35 @@ class CategoryService:
             # Re-raise as a database error
             raise Exception(f"Database error: {str(e)}")
     
+    def get_initial_suggestions(self, user_id: UUID, limit: int = 5) -> List[CategorySuggestion]:
+        """
+        Suggest categories for onboarding.
+        
+        A user with only the default category has no usage data, so the most
+        popular category names across all users are suggested from the
+        in-process snapshot (their ids are suggestion ids, not category ids).
+        Established users get their own categories, most used first.
+        
+        Args:
+            user_id: UUID of the authenticated user
+            limit: Maximum number of suggestions
+            
+        Returns:
+            List of CategorySuggestion objects
+        """
+        categories = self.list_categories(user_id)
+        if all(category.is_default for category in categories):
+            suggestions = get_category_popularity().top(
+                limit, exclude=tuple(category.name for category in categories)
+            )
+            if suggestions:
+                return suggestions
+        
+        return [
+            CategorySuggestion(id=UUID(entry['id']), name=entry['name'], usage_count=entry['usage_count'])
+            for entry in self.get_categories_with_usage(user_id)[:limit]
+        ]
+    
     def suggest_categories(self, user_id: UUID, description: str, amount: float) -> List[CategorySuggestion]:
         """
         Get AI-powered category suggestions based on description and amount.
@@ -239,6 +516,14 @@ class CategoryService:
         Raises:
             Exception: If AI service errors or times out
         """
+        # Repeated descriptions (typed again and again) skip the RPC and the classifier
+        cache_key = (normalize_description(description), amount_bucket(amount))
+        # Read before computing, so a write racing with it leaves a stale entry
+        version = _suggestion_cache_version(user_id)
+        cached = _get_cached_suggestions(user_id, cache_key, version)
+        if cached is not None:
+            return cached
+        
         try:
             # Get categories with usage data for AI processing
             try:
@@ -266,6 +551,7 @@ class CategoryService:
                 timeout_seconds=2.0
             )
             
+            _cache_suggestions(user_id, cache_key, version, suggestions)
             return suggestions
             
         except AiTimeout as e:
@@ -273,6 +559,10 @@ class CategoryService:
             # Just re-raise with a user-friendly message
             raise Exception("AI suggestion service timed out")
             
+        except AiOverloaded:
+            # Already logged in the AI service
+            raise Exception("AI suggestion service overloaded")
+            
         except Exception as e:
             # Log the error if it wasn't already logged
             if not str(e).startswith("Unable to access category data"):
@@ -282,4 +572,59 @@ class CategoryService:
                     message=str(e)
                 )
             # Re-raise to be handled by controller
-            raise Exception(f"AI suggestion service error: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"AI suggestion service error: {str(e)}") 
+    
+    def suggest_categories_batch(self, user_id: UUID, items: List[Tuple[str, float]]) -> List[List[CategorySuggestion]]:
+        """
+        Get category suggestions for many expenses at once.
+        
+        Category usage is fetched once and all items are ranked in a single
+        classifier pass, instead of one `suggest_categories` call per row.
+        The category of a matching categorization rule is ranked first.
+        
+        Args:
+            user_id: UUID of the authenticated user
+            items: (description, amount) pairs
+            
+        Returns:
+            One list of CategorySuggestion objects per item, in input order
+            
+        Raises:
+            Exception: If AI service errors or times out
+        """
+        try:
+            try:
+                user_categories = self.get_categories_with_usage(user_id)
+            except Exception as e:
+                log_error(
+                    user_id=user_id,
+                    error_code='DB_ERROR',
+                    message=f"Database error during batch AI suggestions: {str(e)}"
+                )
+                raise Exception("Unable to access category data for AI processing")
+            
+            if not user_categories:
+                return [[] for _ in items]
+            
+            results = get_category_suggestions_batch(
+                user_id=user_id,
+                items=items,
+                user_categories=user_categories,
+                timeout_seconds=10.0
+            )
+            return _apply_rules(get_rule_matcher(user_id).match_many(items), results, user_categories)
+            
+        except AiTimeout:
+            raise Exception("AI suggestion service timed out")
+            
+        except AiOverloaded:
+            raise Exception("AI suggestion service overloaded")
+            
+        except Exception as e:
+            if not str(e).startswith("Unable to access category data"):
+                log_error(
+                    user_id=user_id,
+                    error_code='AI_ERROR',
+                    message=str(e)
+                )
+            raise Exception(f"AI suggestion service error: {str(e)}")
@@ -0,0 +1,443 @@
+"""
+User-defined categorization rules.
+
+A rule assigns a category to new expenses whose description contains a
+keyword, starts with a prefix or matches a regular expression, optionally
+restricted to an amount range; `amount` rules match on the range alone. Rules
+are ordered by priority, then creation time, and the first matching rule wins.
+
+Each user's rules are compiled into a `RuleMatcher`: keyword and prefix rules
+share one Aho-Corasick automaton, so matching them is a single pass over the
+description whatever the number of rules. Regular expressions cannot be merged
+into the automaton and are limited to a few short ones per user, without the
+constructs that make backtracking exponential (nested quantifiers,
+alternation under a quantifier, backreferences). Compiled matchers are cached
+per user and rebuilt only after the user's rules change.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+try:
+    from re import _parser as _regex_parser  # Python 3.11+
+except ImportError:
+    import sre_parse as _regex_parser
+
+from app.invalidation_channel import cache_version, publish_invalidation
+from app.schemas import CategorizationRuleCreate, CategorizationRuleRead, CategorizationRuleUpdate, RuleKind
+from app.services.category_classifier import normalize_description
+from app.services.database import get_supabase_client
+from app.services.logs import log_error
+
+# Rule limits (200 per user, 20 of them regex) are enforced by a trigger on
+# categorization_rules, which raises this SQLSTATE
+INVALID_PARAMETER_VALUE = '22023'
+MAX_REGEX_LENGTH = 50
+# Quantifiers allowing more than one repetition; k of them can still cost
+# O(n^(k+1)) steps per search, so both they and the searched text are capped
+MAX_REGEX_REPEATS = 3
+MAX_REGEX_INPUT_LENGTH = 100
+
+_REGEX_REPEAT_OPS = {
+    _regex_parser.MAX_REPEAT, _regex_parser.MIN_REPEAT, getattr(_regex_parser, 'POSSESSIVE_REPEAT', None)
+} - {None}
+
+# Compiled matchers per user. Invalidated by rule writes; with
+# CACHE_INVALIDATION_PATH set, writes in other workers invalidate it too.
+RULE_CACHE_MAX_USERS = 1000
+RULE_CACHE_TTL_SECONDS = 10 * 60
+# user id -> (cached at, version, matcher)
+_matcher_cache: "OrderedDict[str, Tuple[float, Optional[int], RuleMatcher]]" = OrderedDict()
+_matcher_cache_lock = threading.Lock()
+
+# Marks the start of the searched text, so prefix patterns only match there
+_START = '\x02'
+
+_RULE_COLUMNS = 'id, category_id, kind, pattern, amount_min, amount_max, priority'
+
+
+class _Automaton:
+    """Aho-Corasick automaton reporting the values of all patterns found in a text."""
+
+    def __init__(self) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+    def add(self, pattern: str, value: int) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(value)
+
+    def build(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def search(self, text: str) -> List[int]:
+        """Values of all patterns occurring in *text* (with repeats)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: List[int] = []
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.extend(out[node])
+        return found
+
+
+class RuleMatcher:
+    """A user's rules compiled for matching; immutable once built."""
+
+    def __init__(self, rules: Sequence[Dict[str, Any]]) -> None:
+        """
+        Args:
+            rules: Rule rows in matching order (see `_RULE_COLUMNS`)
+        """
+        self.rule_count = len(rules)
+        self._categories: List[str] = []
+        self._ranges: List[Tuple[Optional[float], Optional[float]]] = []
+        self._automaton = _Automaton()
+        # (rank, compiled regex or None for amount rules), in rank order
+        self._scanned: List[Tuple[int, Optional[re.Pattern]]] = []
+
+        for rank, rule in enumerate(rules):
+            self._categories.append(str(rule['category_id']))
+            self._ranges.append((_as_float(rule.get('amount_min')), _as_float(rule.get('amount_max'))))
+            kind, pattern = rule['kind'], rule.get('pattern')
+            if kind == RuleKind.keyword.value:
+                # Padded with spaces so keywords match whole words only
+                self._automaton.add(f" {normalize_description(pattern)} ", rank)
+            elif kind == RuleKind.prefix.value:
+                self._automaton.add(_START + f" {normalize_description(pattern)}", rank)
+            elif kind == RuleKind.regex.value:
+                try:
+                    check_regex(pattern)
+                except ValueError:
+                    # Stored before the checks existed; never matches
+                    continue
+                self._scanned.append((rank, re.compile(pattern, re.IGNORECASE)))
+            else:
+                self._scanned.append((rank, None))
+        self._automaton.build()
+
+    def match(self, description: Optional[str], amount: Optional[float]) -> Optional[str]:
+        """
+        Category id of the first rule matching the expense, None if none does.
+
+        Args:
+            description: Expense description
+            amount: Expense amount
+        """
+        if not self.rule_count:
+            return None
+        best = self.rule_count
+        text = f"{_START} {normalize_description(description)} "
+        for rank in self._automaton.search(text):
+            if rank < best and self._in_range(rank, amount):
+                best = rank
+
+        # Only rules ranked before the best automaton match can still win
+        for rank, regex in self._scanned:
+            if rank >= best:
+                break
+            if self._in_range(rank, amount) and (
+                    regex is None or regex.search((description or '')[:MAX_REGEX_INPUT_LENGTH])):
+                best = rank
+                break
+        return self._categories[best] if best < self.rule_count else None
+
+    def match_many(self, items: Sequence[Tuple[Optional[str], Optional[float]]]) -> List[Optional[str]]:
+        """`match` for (description, amount) pairs, in input order."""
+        return [self.match(description, amount) for description, amount in items]
+
+    def _in_range(self, rank: int, amount: Optional[float]) -> bool:
+        low, high = self._ranges[rank]
+        if low is None and high is None:
+            return True
+        if amount is None:
+            return False
+        return (low is None or amount >= low) and (high is None or amount <= high)
+
+
+def _as_float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _raise_limit_error(error: Exception) -> None:
+    """Re-raise a rule limit violation reported by the database as ValueError."""
+    if getattr(error, 'code', None) == INVALID_PARAMETER_VALUE:
+        raise ValueError(getattr(error, 'message', None) or str(error))
+
+
+def check_regex(pattern: str) -> None:
+    """
+    Reject regular expressions that are invalid or could backtrack catastrophically.
+
+    Raises:
+        ValueError: With the reason the pattern is rejected
+    """
+    if len(pattern) > MAX_REGEX_LENGTH:
+        raise ValueError(f"Regular expressions can be at most {MAX_REGEX_LENGTH} characters long")
+    try:
+        parsed = _regex_parser.parse(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression: {str(e)}")
+    if _count_repeats(parsed, in_repeat=False) > MAX_REGEX_REPEATS:
+        raise ValueError(f"Regular expressions can use at most {MAX_REGEX_REPEATS} repeating quantifiers")
+
+
+def _count_repeats(items: Any, in_repeat: bool) -> int:
+    """Repeating quantifiers in a parsed pattern; raises ValueError on unsafe constructs."""
+    count = 0
+    for op, arg in items:
+        if op in (_regex_parser.GROUPREF, _regex_parser.GROUPREF_EXISTS):
+            raise ValueError("Regular expressions cannot use backreferences")
+        if op in _REGEX_REPEAT_OPS:
+            _, high, body = arg
+            if high > 1:
+                if in_repeat:
+                    raise ValueError("Regular expressions cannot nest quantifiers")
+                count += 1 + _count_repeats(body, in_repeat=True)
+            else:
+                count += _count_repeats(body, in_repeat)
+        elif op is _regex_parser.BRANCH:
+            if in_repeat:
+                raise ValueError("Regular expressions cannot repeat alternations")
+            count += sum(_count_repeats(branch, in_repeat) for branch in arg[1])
+        elif op is _regex_parser.SUBPATTERN:
+            count += _count_repeats(arg[-1], in_repeat)
+        elif op in (_regex_parser.ASSERT, _regex_parser.ASSERT_NOT):
+            count += _count_repeats(arg[1], in_repeat)
+        elif op is getattr(_regex_parser, 'ATOMIC_GROUP', None):
+            count += _count_repeats(arg, in_repeat)
+    return count
+
+
+def invalidate_rule_cache(user_id: UUID) -> None:
+    """
+    Drop the user's compiled rules in this and, if configured, every other worker.
+
+    Call after any change to the user's rules, including category deletes and
+    merges, which delete or retarget rules.
+
+    Args:
+        user_id: UUID of the user
+    """
+    with _matcher_cache_lock:
+        _matcher_cache.pop(str(user_id), None)
+    publish_invalidation(f"rules:{user_id}")
+
+
+def get_rule_matcher(user_id: UUID) -> RuleMatcher:
+    """
+    Get the user's compiled rules, loading and compiling them on a cache miss.
+
+    Errors are logged and yield a matcher without rules, so expense writes
+    never fail because of rules.
+
+    Args:
+        user_id: UUID of the user
+
+    Returns:
+        RuleMatcher
+    """
+    key = str(user_id)
+    version = cache_version(f"rules:{key}")
+
+    with _matcher_cache_lock:
+        cached = _matcher_cache.get(key)
+        if (cached is not None and version is not None and cached[1] == version
+                and time.monotonic() - cached[0] < RULE_CACHE_TTL_SECONDS):
+            _matcher_cache.move_to_end(key)
+            return cached[2]
+
+    try:
+        response = get_supabase_client().table('categorization_rules') \
+            .select(_RULE_COLUMNS) \
+            .eq('user_id', key) \
+            .order('priority') \
+            .order('created_at') \
+            .execute()
+        matcher = RuleMatcher(response.data)
+    except Exception as e:
+        log_error(
+            user_id=user_id,
+            error_code='RULES_ERROR',
+            message=f"Failed to load categorization rules: {str(e)}"
+        )
+        return RuleMatcher([])
+
+    if version is not None:
+        with _matcher_cache_lock:
+            _matcher_cache[key] = (time.monotonic(), version, matcher)
+            _matcher_cache.move_to_end(key)
+            while len(_matcher_cache) > RULE_CACHE_MAX_USERS:
+                _matcher_cache.popitem(last=False)
+    return matcher
+
+
+class CategorizationRuleService:
+    """Service class for managing categorization rules."""
+
+    def __init__(self):
+        """Initialize the rule service with Supabase client."""
+        self.supabase = get_supabase_client()
+
+    def list_rules(self, user_id: UUID) -> List[CategorizationRuleRead]:
+        """
+        Retrieve the user's rules in matching order.
+
+        Args:
+            user_id: UUID of the authenticated user
+
+        Returns:
+            List of CategorizationRuleRead objects
+        """
+        response = self.supabase.table('categorization_rules') \
+            .select(_RULE_COLUMNS) \
+            .eq('user_id', str(user_id)) \
+            .order('priority') \
+            .order('created_at') \
+            .execute()
+        return [CategorizationRuleRead(**item) for item in response.data]
+
+    def create_rule(self, user_id: UUID, rule: CategorizationRuleCreate) -> CategorizationRuleRead:
+        """
+        Create a rule for the user.
+
+        Args:
+            user_id: UUID of the authenticated user
+            rule: Rule definition
+
+        Returns:
+            The created CategorizationRuleRead object
+
+        Raises:
+            ValueError: If the rule is invalid, its category is not the user's
+                or the user has too many rules
+        """
+        self._validate(user_id, rule)
+
+        try:
+            response = self.supabase.table('categorization_rules') \
+                .insert({**self._row(rule), 'user_id': str(user_id)}) \
+                .execute()
+        except Exception as e:
+            _raise_limit_error(e)
+            raise
+        if not response.data:
+            raise Exception("Failed to create rule")
+
+        invalidate_rule_cache(user_id)
+        return CategorizationRuleRead(**response.data[0])
+
+    def update_rule(self, user_id: UUID, rule_id: UUID, rule: CategorizationRuleUpdate) -> Optional[CategorizationRuleRead]:
+        """
+        Replace a rule's definition.
+
+        Args:
+            user_id: UUID of the authenticated user
+            rule_id: UUID of the rule
+            rule: New rule definition
+
+        Returns:
+            Updated CategorizationRuleRead object or None if not found
+
+        Raises:
+            ValueError: If the rule is invalid, its category is not the user's
+                or it would exceed the user's regex rule limit
+        """
+        self._validate(user_id, rule)
+
+        try:
+            response = self.supabase.table('categorization_rules') \
+                .update(self._row(rule)) \
+                .eq('user_id', str(user_id)) \
+                .eq('id', str(rule_id)) \
+                .execute()
+        except Exception as e:
+            _raise_limit_error(e)
+            raise
+        if not response.data:
+            return None
+
+        invalidate_rule_cache(user_id)
+        return CategorizationRuleRead(**response.data[0])
+
+    def delete_rule(self, user_id: UUID, rule_id: UUID) -> bool:
+        """
+        Delete a rule.
+
+        Args:
+            user_id: UUID of the authenticated user
+            rule_id: UUID of the rule
+
+        Returns:
+            True if deleted, False if not found
+        """
+        response = self.supabase.table('categorization_rules') \
+            .delete() \
+            .eq('user_id', str(user_id)) \
+            .eq('id', str(rule_id)) \
+            .execute()
+        if not response.data:
+            return False
+
+        invalidate_rule_cache(user_id)
+        return True
+
+    def _validate(self, user_id: UUID, rule: CategorizationRuleCreate) -> None:
+        if rule.kind == RuleKind.amount:
+            if rule.pattern is not None:
+                raise ValueError("Amount rules take no pattern")
+            if rule.amount_min is None and rule.amount_max is None:
+                raise ValueError("Amount rules need amount_min or amount_max")
+        elif rule.pattern is None or (rule.kind != RuleKind.regex and not normalize_description(rule.pattern)):
+            raise ValueError(f"{rule.kind.value.capitalize()} rules need a pattern with letters or digits")
+
+        if rule.kind == RuleKind.regex:
+            check_regex(rule.pattern)
+
+        if rule.amount_min is not None and rule.amount_max is not None and rule.amount_min > rule.amount_max:
+            raise ValueError("amount_min cannot be greater than amount_max")
+
+        category = self.supabase.table('categories') \
+            .select('id') \
+            .eq('user_id', str(user_id)) \
+            .eq('id', str(rule.category_id)) \
+            .execute()
+        if not category.data:
+            raise ValueError("Category not found")
+
+    @staticmethod
+    def _row(rule: CategorizationRuleCreate) -> Dict[str, Any]:
+        return {
+            'category_id': str(rule.category_id),
+            'kind': rule.kind.value,
+            'pattern': rule.pattern,
+            'amount_min': float(rule.amount_min) if rule.amount_min is not None else None,
+            'amount_max': float(rule.amount_max) if rule.amount_max is not None else None,
+            'priority': rule.priority
+        }
@@ -0,0 +1,561 @@
+"""
+Per-user expense category classifier.
+
+A multinomial naive Bayes model over character n-grams and words of the
+expense description plus a logarithmic amount bucket. It is trained from the
+user's categorized expenses, updated incrementally when expenses are created,
+updated or deleted, and persisted as zlib-compressed JSON in the
+`category_classifiers` table in the background. Predictions are pure
+in-memory dictionary lookups and take well under a millisecond.
+"""
+import atexit
+import base64
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from app.services.database import get_supabase_client
+from app.services.logs import log_error
+
+MODEL_VERSION = 1
+NGRAM_SIZE = 3
+# Laplace smoothing
+ALPHA = 0.5
+
+_NON_WORD = re.compile(r'[^\w ]+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_description(description: Optional[str]) -> str:
+    """Lowercase, replace punctuation with spaces and collapse whitespace."""
+    return _SPACES.sub(' ', _NON_WORD.sub(' ', (description or '').lower())).strip()
+
+
+def amount_bucket(amount: Optional[float]) -> Optional[int]:
+    """Logarithmic amount bucket (powers of two), None for missing amounts."""
+    if amount is None or amount <= 0:
+        return None
+    return int(math.log2(amount + 1))
+
+
+def extract_features(description: Optional[str], amount: Optional[float]) -> Dict[str, int]:
+    """
+    Turn an expense into bag-of-features counts.
+
+    Features are padded character trigrams of the normalized description
+    (robust to typos and inflection, e.g. "biedronka"/"biedronce"), whole
+    words prefixed with `w:` and a single `a:` amount bucket (powers of two).
+
+    Args:
+        description: Expense description
+        amount: Expense amount
+
+    Returns:
+        Dictionary mapping feature to its count
+    """
+    features: Dict[str, int] = {}
+    text = normalize_description(description)
+    if text:
+        padded = f" {text} "
+        for i in range(len(padded) - NGRAM_SIZE + 1):
+            gram = padded[i:i + NGRAM_SIZE]
+            features[gram] = features.get(gram, 0) + 1
+        for word in text.split(' '):
+            key = f"w:{word}"
+            features[key] = features.get(key, 0) + 1
+    bucket = amount_bucket(amount)
+    if bucket is not None:
+        features[f"a:{bucket}"] = 1
+    return features
+
+
+class CategoryClassifier:
+    """Incremental multinomial naive Bayes classifier for one user."""
+
+    def __init__(self, ignored_categories: Iterable[str] = ()):
+        # category id -> number of training expenses
+        self.doc_counts: Dict[str, int] = {}
+        # category id -> feature -> count
+        self.feature_counts: Dict[str, Dict[str, int]] = {}
+        # category id -> sum of feature counts
+        self.totals: Dict[str, int] = {}
+        # feature -> count across all categories (its keys are the vocabulary)
+        self.vocabulary: Dict[str, int] = {}
+        # Categories that carry no signal (the default "Uncategorized")
+        self.ignored = set(ignored_categories)
+        self._lock = threading.Lock()
+
+    @property
+    def sample_count(self) -> int:
+        """Number of expenses the model has been trained on."""
+        return sum(self.doc_counts.values())
+
+    def learn(self, description: Optional[str], amount: Optional[float], category_id: Any) -> None:
+        """
+        Add one categorized expense to the model.
+
+        Args:
+            description: Expense description
+            amount: Expense amount
+            category_id: Category of the expense
+        """
+        self._update(description, amount, str(category_id), 1)
+
+    def unlearn(self, description: Optional[str], amount: Optional[float], category_id: Any) -> None:
+        """
+        Remove one previously learned expense from the model.
+
+        Args:
+            description: Expense description as it was learned
+            amount: Expense amount as it was learned
+            category_id: Category the expense was learned with
+        """
+        self._update(description, amount, str(category_id), -1)
+
+    def merge_category(self, source_id: Any, target_id: Any) -> None:
+        """
+        Relabel everything learned for one category as another (category merge).
+
+        Args:
+            source_id: Category that is merged away
+            target_id: Category that receives its expenses
+        """
+        source, target = str(source_id), str(target_id)
+        with self._lock:
+            docs = self.doc_counts.pop(source, 0)
+            counts = self.feature_counts.pop(source, {})
+            total = self.totals.pop(source, 0)
+            if not docs or source == target:
+                return
+            if target in self.ignored:
+                # Expenses moved to an ignored category are forgotten
+                for feature, count in counts.items():
+                    self.vocabulary[feature] -= count
+                    if self.vocabulary[feature] <= 0:
+                        del self.vocabulary[feature]
+                return
+            self.doc_counts[target] = self.doc_counts.get(target, 0) + docs
+            target_counts = self.feature_counts.setdefault(target, {})
+            for feature, count in counts.items():
+                target_counts[feature] = target_counts.get(feature, 0) + count
+            self.totals[target] = self.totals.get(target, 0) + total
+
+    def predict(self, description: Optional[str], amount: Optional[float],
+                categories: Optional[Iterable[Any]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank categories by posterior probability for an expense.
+
+        Args:
+            description: Expense description
+            amount: Expense amount
+            categories: Optional category ids to restrict the ranking to
+                (e.g. the user's current categories); unknown ids are skipped
+
+        Returns:
+            List of (category id, probability) tuples, most likely first.
+            Empty when the model has no training data for any candidate.
+        """
+        return self.predict_many([(description, amount)], categories)[0]
+
+    def predict_many(self, items: Sequence[Tuple[Optional[str], Optional[float]]],
+                     categories: Optional[Iterable[Any]] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Rank categories for many expenses in one pass.
+
+        Priors and per-category normalizers are computed once for the whole
+        batch, and items with the same normalized description and amount
+        bucket are scored only once.
+
+        Args:
+            items: (description, amount) pairs
+            categories: Optional category ids to restrict the ranking to
+
+        Returns:
+            One ranking per item, in input order (see `predict`)
+        """
+        with self._lock:
+            candidates = [str(c) for c in categories] if categories is not None else list(self.doc_counts)
+            candidates = [c for c in candidates if self.doc_counts.get(c)]
+            if not candidates:
+                return [[] for _ in items]
+
+            total_docs = sum(self.doc_counts[c] for c in candidates)
+            vocab_size = len(self.vocabulary) + 1
+            # (category, log prior, log normalizer, feature counts)
+            classes = [
+                (c, math.log(self.doc_counts[c] / total_docs),
+                 math.log(self.totals[c] + ALPHA * vocab_size), self.feature_counts[c])
+                for c in candidates
+            ]
+
+            results: List[List[Tuple[str, float]]] = []
+            memo: Dict[Tuple[str, Optional[int]], List[Tuple[str, float]]] = {}
+            for description, amount in items:
+                key = (normalize_description(description), amount_bucket(amount))
+                if key not in memo:
+                    memo[key] = self._rank(extract_features(description, amount), classes)
+                results.append(memo[key])
+            return results
+
+    @staticmethod
+    def _rank(features: Dict[str, int], classes: List[Tuple[str, float, float, Dict[str, int]]]) -> List[Tuple[str, float]]:
+        if not features:
+            return []
+        scores = []
+        for category, prior, normalizer, counts in classes:
+            score = prior
+            for feature, count in features.items():
+                score += count * (math.log(counts.get(feature, 0) + ALPHA) - normalizer)
+            scores.append((category, score))
+
+        # Softmax over log scores
+        best = max(score for _, score in scores)
+        weights = [(category, math.exp(score - best)) for category, score in scores]
+        norm = sum(w for _, w in weights)
+        return sorted(((c, w / norm) for c, w in weights), key=lambda x: x[1], reverse=True)
+
+    def to_bytes(self) -> str:
+        """
+        Serialize the model compactly (zlib-compressed JSON, base64 text).
+
+        Returns:
+            Text safe to store in a `text` column
+        """
+        with self._lock:
+            data = {
+                'v': MODEL_VERSION,
+                'ignored': sorted(self.ignored),
+                'docs': self.doc_counts,
+                'features': self.feature_counts
+            }
+            raw = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        return base64.b64encode(zlib.compress(raw, 9)).decode('ascii')
+
+    @classmethod
+    def from_bytes(cls, blob: str) -> 'CategoryClassifier':
+        """
+        Restore a model serialized with `to_bytes`.
+
+        Args:
+            blob: Serialized model
+
+        Returns:
+            CategoryClassifier
+
+        Raises:
+            ValueError: If the blob is corrupt or from an unknown version
+        """
+        try:
+            data = json.loads(zlib.decompress(base64.b64decode(blob)))
+        except (ValueError, zlib.error) as e:
+            raise ValueError(f"Corrupt classifier model: {str(e)}")
+        if data.get('v') != MODEL_VERSION:
+            raise ValueError(f"Unsupported classifier model version: {data.get('v')}")
+
+        model = cls(data.get('ignored', []))
+        model.doc_counts = {c: int(n) for c, n in data['docs'].items()}
+        model.feature_counts = {c: dict(f) for c, f in data['features'].items()}
+        for category, counts in model.feature_counts.items():
+            model.totals[category] = sum(counts.values())
+            for feature, count in counts.items():
+                model.vocabulary[feature] = model.vocabulary.get(feature, 0) + count
+        return model
+
+    def _update(self, description: Optional[str], amount: Optional[float], category: str, sign: int) -> None:
+        if category in self.ignored:
+            return
+        features = extract_features(description, amount)
+        with self._lock:
+            if sign < 0 and not self.doc_counts.get(category):
+                return
+            self.doc_counts[category] = self.doc_counts.get(category, 0) + sign
+            counts = self.feature_counts.setdefault(category, {})
+            for feature, count in features.items():
+                delta = sign * count
+                counts[feature] = counts.get(feature, 0) + delta
+                if counts[feature] <= 0:
+                    del counts[feature]
+                self.vocabulary[feature] = self.vocabulary.get(feature, 0) + delta
+                if self.vocabulary[feature] <= 0:
+                    del self.vocabulary[feature]
+                self.totals[category] = self.totals.get(category, 0) + delta
+            if self.doc_counts[category] <= 0:
+                del self.doc_counts[category]
+                del self.feature_counts[category]
+                self.totals.pop(category, None)
+
+
+# Seconds between background writes of queued model updates
+FLUSH_SECONDS = 2.0
+# Compare-and-set attempts per flush before updates wait for the next one
+MAX_WRITE_ATTEMPTS = 3
+
+_UNIQUE_VIOLATION = '23505'
+
+# Queued model update: ('observe', previous, current) with (description,
+# amount, category_id) tuples or None, or ('merge', source_id, target_id)
+_Update = Tuple[str, Any, Any]
+
+
+def _apply(model: CategoryClassifier, update: _Update) -> None:
+    kind, first, second = update
+    if kind == 'merge':
+        model.merge_category(first, second)
+        return
+    if first is not None:
+        model.unlearn(*first)
+    if second is not None:
+        model.learn(*second)
+
+
+class ClassifierStore:
+    """
+    Process-wide cache of per-user classifiers backed by Supabase.
+
+    Models are loaded on first use (or trained from the user's expenses if
+    none is stored) and kept in a bounded LRU. Expense writes do no database
+    work: the update is applied to the in-memory copy and queued, and a
+    background thread writes queued updates every `flush_seconds`. Each write
+    starts from the stored model and is a compare-and-set on its `version`,
+    so workers updating the same user concurrently never drop each other's
+    updates. Other worker processes pick up the change for predictions when
+    their copy is older than `reload_seconds`.
+    """
+
+    def __init__(self, max_users: int = 1000, reload_seconds: float = 300.0, training_limit: int = 5000,
+                 flush_seconds: float = FLUSH_SECONDS):
+        self.max_users = max_users
+        self.reload_seconds = reload_seconds
+        self.training_limit = training_limit
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # user id -> (loaded_at, classifier)
+        self._models: 'OrderedDict[str, Tuple[float, CategoryClassifier]]' = OrderedDict()
+        # user id -> [(queued_at, update)], oldest first
+        self._pending: Dict[str, List[Tuple[float, _Update]]] = {}
+        self._pending_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, user_id: UUID, refresh: bool = False) -> CategoryClassifier:
+        """
+        Get the user's classifier, loading or training it if needed.
+
+        Args:
+            user_id: UUID of the user
+            refresh: Skip the in-memory copy and reload the stored model
+
+        Returns:
+            CategoryClassifier
+        """
+        key = str(user_id)
+        with self._lock:
+            entry = self._models.get(key)
+            if not refresh and entry is not None and time.monotonic() - entry[0] < self.reload_seconds:
+                self._models.move_to_end(key)
+                return entry[1]
+
+        stored = self._load(user_id)
+        model = stored[0] if stored is not None else None
+        if model is None:
+            model = self._train(user_id)
+            # Loses to a model another worker stored meanwhile, which is as fresh
+            self._save(user_id, model, stored[1] if stored is not None else None)
+        self._remember(key, model)
+        return model
+
+    def observe(self, user_id: UUID, description: Optional[str], amount: Optional[float], category_id: Any,
+                previous: Optional[Tuple[Optional[str], Optional[float], Any]] = None) -> None:
+        """
+        Queue an incremental update for a created, updated or deleted expense.
+
+        Does no database work; see `flush`.
+
+        Args:
+            user_id: UUID of the user
+            description: New expense description (None when the expense was deleted)
+            amount: New expense amount
+            category_id: New category id (None when the expense was deleted)
+            previous: (description, amount, category_id) before an update or
+                delete, so the old version is unlearned first
+        """
+        current = (description, amount, category_id) if category_id is not None else None
+        self._enqueue(user_id, ('observe', previous, current))
+
+    def merge(self, user_id: UUID, source_id: Any, target_id: Any) -> None:
+        """
+        Queue a category merge for the user's classifier, without retraining.
+
+        Args:
+            user_id: UUID of the user
+            source_id: Category that was merged away
+            target_id: Category that received its expenses
+        """
+        self._enqueue(user_id, ('merge', str(source_id), str(target_id)))
+
+    def reset(self, user_id: UUID) -> None:
+        """
+        Drop the user's model so it is retrained from expenses on next use.
+
+        Used after bulk changes that are cheaper to retrain from than to
+        replay one by one. Queued updates are discarded, the retrained model
+        includes them. Failures are logged and never propagate.
+
+        Args:
+            user_id: UUID of the user
+        """
+        with self._pending_lock:
+            self._pending.pop(str(user_id), None)
+        with self._lock:
+            self._models.pop(str(user_id), None)
+        try:
+            get_supabase_client().table('category_classifiers') \
+                .delete() \
+                .eq('user_id', str(user_id)) \
+                .execute()
+        except Exception as e:
+            log_error(
+                user_id=user_id,
+                error_code='CLASSIFIER_ERROR',
+                message=f"Failed to reset category classifier: {str(e)}"
+            )
+
+    def flush(self) -> None:
+        """
+        Write all queued updates to the stored models (run by the background thread).
+
+        Failures are logged and the affected updates dropped; updates that
+        keep losing the compare-and-set are queued again for the next flush.
+        """
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for key, updates in pending.items():
+            try:
+                if not self._write(UUID(key), updates):
+                    with self._pending_lock:
+                        self._pending[key] = updates + self._pending.get(key, [])
+            except Exception as e:
+                log_error(
+                    user_id=UUID(key),
+                    error_code='CLASSIFIER_ERROR',
+                    message=f"Failed to update category classifier: {str(e)}"
+                )
+
+    def _enqueue(self, user_id: UUID, update: _Update) -> None:
+        key = str(user_id)
+        with self._lock:
+            entry = self._models.get(key)
+        if entry is not None:
+            # Predictions in this process see the change right away
+            _apply(entry[1], update)
+        with self._pending_lock:
+            self._pending.setdefault(key, []).append((time.monotonic(), update))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="classifier-flush", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def _write(self, user_id: UUID, updates: List[Tuple[float, _Update]]) -> bool:
+        """Apply *updates* to the stored model; False if other writers kept winning."""
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            stored = self._load(user_id)
+            if stored is None or stored[0] is None:
+                trained_at = time.monotonic()
+                model = self._train(user_id)
+                # Training read the expenses these updates were queued for
+                replay = [update for queued_at, update in updates if queued_at >= trained_at]
+            else:
+                model = stored[0]
+                replay = [update for _, update in updates]
+            for update in replay:
+                _apply(model, update)
+            if self._save(user_id, model, stored[1] if stored is not None else None):
+                return True
+        return False
+
+    def _remember(self, key: str, model: CategoryClassifier) -> None:
+        with self._lock:
+            self._models[key] = (time.monotonic(), model)
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_users:
+                self._models.popitem(last=False)
+
+    def _load(self, user_id: UUID) -> Optional[Tuple[Optional[CategoryClassifier], int]]:
+        """Stored model and its version; None without a row, (None, version) if unreadable."""
+        response = get_supabase_client().table('category_classifiers') \
+            .select('model, version') \
+            .eq('user_id', str(user_id)) \
+            .execute()
+        if not response.data:
+            return None
+        row = response.data[0]
+        try:
+            return CategoryClassifier.from_bytes(row['model']), row['version']
+        except ValueError:
+            # Unreadable or outdated model, retrain from scratch
+            return None, row['version']
+
+    def _train(self, user_id: UUID) -> CategoryClassifier:
+        supabase = get_supabase_client()
+        default_category = supabase.table('categories') \
+            .select('id') \
+            .eq('user_id', str(user_id)) \
+            .eq('is_default', True) \
+            .execute()
+        model = CategoryClassifier(row['id'] for row in default_category.data)
+
+        expenses = supabase.table('expenses') \
+            .select('description, amount, category_id') \
+            .eq('user_id', str(user_id)) \
+            .order('date_of_expense', desc=True) \
+            .limit(self.training_limit) \
+            .execute()
+        for row in expenses.data:
+            model.learn(row.get('description'), float(row['amount']), row['category_id'])
+        return model
+
+    def _save(self, user_id: UUID, model: CategoryClassifier, version: Optional[int]) -> bool:
+        """
+        Store *model* if the stored one is still at *version* (None: no stored model).
+
+        Returns:
+            False when another worker wrote first
+        """
+        table = get_supabase_client().table('category_classifiers')
+        row = {'model': model.to_bytes(), 'sample_count': model.sample_count}
+        if version is None:
+            try:
+                table.insert({**row, 'user_id': str(user_id), 'version': 1}).execute()
+            except Exception as e:
+                if getattr(e, 'code', None) == _UNIQUE_VIOLATION:
+                    return False
+                raise
+            return True
+        response = table.update({**row, 'version': version + 1}) \
+            .eq('user_id', str(user_id)) \
+            .eq('version', version) \
+            .execute()
+        return bool(response.data)
+
+
+_store: Optional[ClassifierStore] = None
+_store_lock = threading.Lock()
+
+
+def get_classifier_store() -> ClassifierStore:
+    """Return the process-wide classifier store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ClassifierStore()
+        return _store
@@ -0,0 +1,129 @@
+"""
+Global category popularity snapshot for onboarding suggestions.
+
+The `category_popularity` table holds anonymized category names used by many
+users. Each process keeps it as an in-memory snapshot, loaded and reloaded by a
+background thread started on first use, so serving suggestions never waits for
+the database; until the first load completes there are no suggestions. When
+the last rebuild (`category_popularity_refresh`) is older than
+`REFRESH_SECONDS` (no pg_cron), the reloading process rebuilds the table first.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from app.schemas import CategorySuggestion
+from app.services.database import get_supabase_client
+
+# Snapshot reload interval per process
+RELOAD_SECONDS = 15 * 60
+# Maximum age of the table before a process rebuilds it
+REFRESH_SECONDS = 26 * 3600
+
+# Suggestion ids are derived from the name: stable across reloads and
+# processes, but not category ids (create the categories by name)
+_SUGGESTION_NAMESPACE = uuid.UUID('0b7c1c5e-5d0f-4f47-9a43-3f9c3f1d2a61')
+
+logger = logging.getLogger("category_popularity")
+
+
+class CategoryPopularity:
+    """In-memory snapshot of `category_popularity`, refreshed in the background."""
+
+    def __init__(self, reload_seconds: float = RELOAD_SECONDS):
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._suggestions: List[CategorySuggestion] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def top(self, limit: int, exclude: Tuple[str, ...] = ()) -> List[CategorySuggestion]:
+        """
+        Most popular category names.
+
+        Never waits for the database: the first call starts loading the
+        snapshot in the background and returns an empty list.
+
+        Args:
+            limit: Maximum number of suggestions
+            exclude: Names to skip (e.g. the user's existing categories), case-insensitive
+
+        Returns:
+            List of CategorySuggestion objects; usage_count is the number of
+            users with the category. Empty until the snapshot is loaded.
+        """
+        if self._thread is None:
+            with self._lock:
+                self._start()
+        suggestions = self._suggestions
+        excluded = {name.strip().lower() for name in exclude}
+        return [s for s in suggestions if s.name.strip().lower() not in excluded][:limit]
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="category-popularity", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._reload()
+            time.sleep(self.reload_seconds)
+
+    def _reload(self) -> None:
+        """Load the table, rebuilding it first when stale; keep the old snapshot on errors."""
+        try:
+            if self._is_stale(self._fetch_refreshed_at()):
+                self._refresh()
+            rows = self._fetch()
+        except Exception as exc:
+            logger.warning("category_popularity.reload_error", extra={"error": str(exc)})
+            return
+        self._suggestions = [
+            CategorySuggestion(
+                id=uuid.uuid5(_SUGGESTION_NAMESPACE, row['name'].strip().lower()),
+                name=row['name'],
+                usage_count=row['user_count']
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    def _fetch() -> List[dict]:
+        return get_supabase_client().table('category_popularity') \
+            .select('name, user_count') \
+            .order('user_count', desc=True) \
+            .execute().data
+
+    @staticmethod
+    def _fetch_refreshed_at() -> Optional[str]:
+        """Time of the last rebuild, None if the table was never built."""
+        rows = get_supabase_client().table('category_popularity_refresh') \
+            .select('refreshed_at') \
+            .execute().data
+        return rows[0]['refreshed_at'] if rows else None
+
+    @staticmethod
+    def _refresh() -> None:
+        get_supabase_client().rpc('refresh_category_popularity', {}).execute()
+
+    @staticmethod
+    def _is_stale(refreshed_at: Optional[str]) -> bool:
+        if refreshed_at is None:
+            return True
+        refreshed = datetime.fromisoformat(refreshed_at.replace('Z', '+00:00'))
+        return (datetime.now(timezone.utc) - refreshed).total_seconds() > REFRESH_SECONDS
+
+
+_popularity: Optional[CategoryPopularity] = None
+_popularity_lock = threading.Lock()
+
+
+def get_category_popularity() -> CategoryPopularity:
+    """Return the process-wide popularity snapshot."""
+    global _popularity
+    with _popularity_lock:
+        if _popularity is None:
+            _popularity = CategoryPopularity()
+        return _popularity
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from app.schemas import Dashboard
+from app.services.ai_tips_service import TIPS_CACHE_TTL_SECONDS
+from app.services.database import get_supabase_client
+from app.services.expenses import get_period_bounds
+from app.services.logs import log_error
+from app.single_flight import get_single_flight
+
+# Expenses shown in the dashboard's "recent" list
+RECENT_EXPENSES_LIMIT = 5
+DASHBOARD_TIPS_LIMIT = 3
+
+_dashboard_flight = get_single_flight("dashboard")
+
+
+class DashboardService:
+    """Service assembling the dashboard from one database call."""
+
+    def __init__(self):
+        """Initialize the dashboard service with Supabase client."""
+        self.supabase = get_supabase_client()
+
+    def get_dashboard(self, user_id: UUID) -> Dashboard:
+        """
+        Get the weekly and monthly summaries, the month's per-category breakdown,
+        the most recent expenses and the user's last AI tips.
+
+        Everything comes from the `get_dashboard` SQL function, with the same
+        period boundaries as `ExpenseService.get_summary`. Tips are the last
+        ones stored in `ai_tips_latest` by any worker, never generated here;
+        the list is empty when the user has no fresh tips (fetch
+        `GET /ai/tips/stream` then).
+
+        Args:
+            user_id: UUID of the authenticated user
+
+        Returns:
+            Dashboard
+        """
+        # Identical concurrent requests (several tabs, quick reloads) share one query
+        return _dashboard_flight.do(str(user_id), self._compute_dashboard, user_id)
+
+    def _compute_dashboard(self, user_id: UUID) -> Dashboard:
+        """Query the dashboard data for `get_dashboard`."""
+        week_start, week_end = get_period_bounds('weekly')
+        month_start, month_end = get_period_bounds('monthly')
+        tips_since = datetime.now(timezone.utc) - timedelta(seconds=TIPS_CACHE_TTL_SECONDS)
+
+        try:
+            response = self.supabase.rpc('get_dashboard', {
+                'user_id_param': str(user_id),
+                'week_start_param': week_start,
+                'week_end_param': week_end,
+                'month_start_param': month_start,
+                'month_end_param': month_end,
+                'recent_limit_param': RECENT_EXPENSES_LIMIT,
+                'tips_since_param': tips_since.isoformat(),
+                'tips_limit_param': DASHBOARD_TIPS_LIMIT
+            }).execute()
+        except Exception as e:
+            log_error(
+                user_id=user_id,
+                message=f"Failed to load dashboard: {str(e)}",
+                error_code="DASHBOARD_ERROR"
+            )
+            raise
+
+        return Dashboard(**response.data)
@@ -0,0 +1,243 @@
+"""
+Per-user index of past expense descriptions for autocomplete.
+
+Each user's distinct descriptions are kept as a sorted array of normalized
+keys. A prefix lookup is a binary search for the matching key range followed
+by a top-k selection by frequency, with no database query; each entry carries
+the category and amount used most often with that description. Indexes are
+built lazily from the user's latest expenses, kept in a bounded LRU and
+updated in place on expense writes in this process; other worker processes
+rebuild theirs once their copy is older than `reload_seconds`.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.schemas import ExpenseAutocompleteSuggestion
+from app.services.category_classifier import normalize_description
+from app.services.database import get_supabase_client
+from app.services.logs import log_error
+
+
+class _Entry:
+    __slots__ = ('description', 'count', 'categories', 'amounts')
+
+    def __init__(self, description: str) -> None:
+        self.description = description
+        self.count = 0
+        self.categories: Dict[str, int] = {}
+        self.amounts: Dict[float, int] = {}
+
+
+class DescriptionIndex:
+    """Sorted array of one user's normalized descriptions with usage statistics."""
+
+    def __init__(self) -> None:
+        self._keys: List[str] = []
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, description: Optional[str], amount: Optional[float], category_id: Any) -> None:
+        """
+        Count one expense; the description is shown as most recently written.
+
+        Args:
+            description: Expense description
+            amount: Expense amount
+            category_id: Category of the expense
+        """
+        key = normalize_description(description)
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(description.strip())
+                self._keys.insert(bisect_left(self._keys, key), key)
+            else:
+                entry.description = description.strip()
+            entry.count += 1
+            _increment(entry.categories, str(category_id), 1)
+            if amount is not None:
+                _increment(entry.amounts, round(float(amount), 2), 1)
+
+    def remove(self, description: Optional[str], amount: Optional[float], category_id: Any) -> None:
+        """
+        Uncount one previously added expense.
+
+        Args:
+            description: Expense description as it was added
+            amount: Expense amount as it was added
+            category_id: Category the expense was added with
+        """
+        key = normalize_description(description)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.count -= 1
+            if entry.count <= 0:
+                del self._entries[key]
+                del self._keys[bisect_left(self._keys, key)]
+                return
+            _increment(entry.categories, str(category_id), -1)
+            if amount is not None:
+                _increment(entry.amounts, round(float(amount), 2), -1)
+
+    def complete(self, prefix: str, limit: int = 5) -> List[ExpenseAutocompleteSuggestion]:
+        """
+        Most frequent descriptions starting with *prefix*.
+
+        Args:
+            prefix: Typed text, normalized like the descriptions
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of ExpenseAutocompleteSuggestion objects, most frequent first
+        """
+        key = normalize_description(prefix)
+        if not key:
+            return []
+        with self._lock:
+            start = bisect_left(self._keys, key)
+            end = bisect_left(self._keys, key[:-1] + chr(ord(key[-1]) + 1), start)
+            entries = self._entries
+            best = heapq.nlargest(limit, self._keys[start:end], key=lambda k: entries[k].count)
+            suggestions = []
+            for k in best:
+                category_id = _most_common(entries[k].categories)
+                amount = _most_common(entries[k].amounts)
+                suggestions.append(ExpenseAutocompleteSuggestion(
+                    description=entries[k].description,
+                    count=entries[k].count,
+                    category_id=UUID(category_id) if category_id is not None else None,
+                    amount=Decimal(str(amount)) if amount is not None else None
+                ))
+            return suggestions
+
+
+def _most_common(counts: Dict[Any, int]) -> Any:
+    return max(counts, key=counts.get) if counts else None
+
+
+def _increment(counts: Dict[Any, int], key: Any, delta: int) -> None:
+    counts[key] = counts.get(key, 0) + delta
+    if counts[key] <= 0:
+        del counts[key]
+
+
+class DescriptionIndexStore:
+    """
+    Process-wide cache of per-user description indexes.
+
+    Indexes are built from the user's latest `build_limit` expenses on first
+    use. Writes only update indexes already in memory; an index that is not
+    loaded will see them when it is built.
+    """
+
+    def __init__(self, max_users: int = 1000, reload_seconds: float = 300.0, build_limit: int = 5000):
+        self.max_users = max_users
+        self.reload_seconds = reload_seconds
+        self.build_limit = build_limit
+        self._lock = threading.Lock()
+        # user id -> (built_at, index)
+        self._indexes: 'OrderedDict[str, Tuple[float, DescriptionIndex]]' = OrderedDict()
+
+    def get(self, user_id: UUID) -> DescriptionIndex:
+        """
+        Get the user's index, building it if needed.
+
+        Args:
+            user_id: UUID of the user
+
+        Returns:
+            DescriptionIndex
+        """
+        key = str(user_id)
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.reload_seconds:
+                self._indexes.move_to_end(key)
+                return entry[1]
+
+        index = self._build(user_id)
+        with self._lock:
+            self._indexes[key] = (time.monotonic(), index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def observe(self, user_id: UUID, description: Optional[str], amount: Optional[float], category_id: Any,
+                previous: Optional[Tuple[Optional[str], Optional[float], Any]] = None) -> None:
+        """
+        Apply a created, updated or deleted expense to the user's index, if loaded.
+
+        Args:
+            user_id: UUID of the user
+            description: New expense description (None when the expense was deleted)
+            amount: New expense amount
+            category_id: New category id (None when the expense was deleted)
+            previous: (description, amount, category_id) before an update or delete
+        """
+        with self._lock:
+            entry = self._indexes.get(str(user_id))
+        if entry is None:
+            return
+        index = entry[1]
+        if previous is not None:
+            index.remove(*previous)
+        if category_id is not None:
+            index.add(description, amount, category_id)
+
+    def reset(self, user_id: UUID) -> None:
+        """
+        Drop the user's index so it is rebuilt on next use (after bulk changes).
+
+        Args:
+            user_id: UUID of the user
+        """
+        with self._lock:
+            self._indexes.pop(str(user_id), None)
+
+    def _build(self, user_id: UUID) -> DescriptionIndex:
+        index = DescriptionIndex()
+        try:
+            response = get_supabase_client().table('expenses') \
+                .select('description, amount, category_id') \
+                .eq('user_id', str(user_id)) \
+                .order('date_of_expense', desc=True) \
+                .limit(self.build_limit) \
+                .execute()
+        except Exception as e:
+            log_error(
+                user_id=user_id,
+                error_code='AUTOCOMPLETE_ERROR',
+                message=f"Failed to build description index: {str(e)}"
+            )
+            raise
+        # Oldest first, so each entry shows its most recent spelling
+        for row in reversed(response.data):
+            index.add(row.get('description'), float(row['amount']), row['category_id'])
+        return index
+
+
+_store: Optional[DescriptionIndexStore] = None
+_store_lock = threading.Lock()
+
+
+def get_description_index_store() -> DescriptionIndexStore:
+    """Return the process-wide description index store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DescriptionIndexStore()
+        return _store
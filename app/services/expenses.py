@@ -1,12 +1,85 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 import calendar
 
-from app.schemas import ExpenseRead, ExpenseCreate, ExpenseUpdate, ExpenseSummary, Pagination, ExpenseList
+from app.schemas import (
+    ExpenseRead, ExpenseCreate, ExpenseUpdate, ExpenseRecategorize, ExpenseAutocompleteSuggestion, ExpenseSummary,
+    Pagination, ExpenseList
+)
 from app.services.database import get_supabase_client
+from app.services.categories import invalidate_suggestion_cache, FOREIGN_KEY_VIOLATION, NO_DATA_FOUND
+from app.services.categorization_rules import get_rule_matcher, invalidate_rule_cache
+from app.services.category_classifier import get_classifier_store
+from app.services.description_index import get_description_index_store
 from app.services.logs import log_error, log_info, LogType
+from app.single_flight import get_single_flight
+
+_summary_flight = get_single_flight("expense_summary")
+
+
+def get_period_bounds(period: str, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Resolve a summary period to a date range.
+    
+    Args:
+        period: 'weekly' (current week from Monday), 'monthly' (current month) or 'custom'
+        start_date: Custom start date in ISO format (required for 'custom' period)
+        end_date: Custom end date in ISO format (required for 'custom' period)
+        
+    Returns:
+        (start, end) as ISO strings, start inclusive and end exclusive
+        
+    Raises:
+        ValueError: If period is not supported or required dates are missing
+    """
+    period = period.lower()
+    today = datetime.now()
+    
+    if period == 'weekly':
+        # Calculate date range for current week (starting Monday)
+        start_of_week = today - timedelta(days=today.weekday())
+        start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_of_week = start_of_week + timedelta(days=7)
+        
+        start_date_iso = start_of_week.isoformat()
+        end_date_iso = end_of_week.isoformat()
+        
+    elif period == 'monthly':
+        # Calculate date range for current month
+        start_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        # Get last day of current month
+        _, last_day = calendar.monthrange(today.year, today.month)
+        end_of_month = start_of_month + timedelta(days=last_day)  # First day of next month, 00:00:00
+        
+        start_date_iso = start_of_month.isoformat()
+        end_date_iso = end_of_month.isoformat()
+        
+    elif period == 'custom':
+        # Use custom date range
+        if not start_date or not end_date:
+            raise ValueError("Both start_date and end_date are required for custom period")
+            
+        # Parse and validate dates
+        try:
+            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            
+            if start_dt > end_dt:
+                raise ValueError("start_date cannot be later than end_date")
+                
+            start_date_iso = start_dt.isoformat()
+            end_date_iso = end_dt.isoformat()
+            
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid date format: {str(e)}")
+            
+    else:
+        raise ValueError("Period must be one of: 'weekly', 'monthly', or 'custom'")
+    
+    return start_date_iso, end_date_iso
 
 
 class ExpenseService:
@@ -127,6 +200,7 @@ class ExpenseService:
         Args:
             user_id: UUID of the authenticated user
             expense_data: ExpenseCreate data with amount, description, and optional category_id
+                (when omitted, the first matching categorization rule or the default category)
             
         Returns:
             The created ExpenseRead object
@@ -135,18 +209,15 @@ class ExpenseService:
             Exception: If creation fails
         """
         try:
-            # If no category_id provided, find the default category
+            # If no category_id provided, apply the user's rules, then fall back to the default category
+            rule_matched = False
             if expense_data.category_id is None:
-                default_category = self.supabase.table('categories') \
-                    .select('id') \
-                    .eq('user_id', str(user_id)) \
-                    .eq('is_default', True) \
-                    .execute()
-                
-                if not default_category.data:
-                    raise ValueError("Default category not found")
-                    
-                category_id = default_category.data[0]['id']
+                category_id = get_rule_matcher(user_id).match(
+                    expense_data.description, float(expense_data.amount)
+                )
+                rule_matched = category_id is not None
+                if category_id is None:
+                    category_id = self._get_default_category_id(user_id)
             else:
                 category_id = str(expense_data.category_id)
                 
@@ -160,9 +231,20 @@ class ExpenseService:
             }
             
             # Insert the expense
-            response = self.supabase.table('expenses') \
-                .insert(expense) \
-                .execute()
+            try:
+                response = self.supabase.table('expenses') \
+                    .insert(expense) \
+                    .execute()
+            except Exception as e:
+                # The matched rule's category was deleted after the rules were
+                # cached: drop the match rather than fail the expense
+                if not rule_matched or getattr(e, 'code', None) != FOREIGN_KEY_VIOLATION:
+                    raise
+                invalidate_rule_cache(user_id)
+                expense['category_id'] = self._get_default_category_id(user_id)
+                response = self.supabase.table('expenses') \
+                    .insert(expense) \
+                    .execute()
                 
             if not response.data:
                 raise Exception("Failed to create expense")
@@ -176,6 +258,16 @@ class ExpenseService:
                 message=f"Created expense of {expense_data.amount} with description: '{expense_data.description}'"
             )
             
+            invalidate_suggestion_cache(user_id)
+            
+            # Teach the user's category classifier
+            get_classifier_store().observe(
+                user_id, item['description'], float(item['amount']), item['category_id']
+            )
+            get_description_index_store().observe(
+                user_id, item['description'], float(item['amount']), item['category_id']
+            )
+            
             # Return the created expense
             return ExpenseRead(
                 id=UUID(item['id']),
@@ -247,6 +339,17 @@ class ExpenseService:
                 message=f"Updated expense {expense_id}"
             )
             
+            # Move the expense to its new category in the user's classifier
+            previous = (existing_expense.description, float(existing_expense.amount), existing_expense.category_id)
+            if previous != (item['description'], float(item['amount']), UUID(item['category_id'])):
+                invalidate_suggestion_cache(user_id)
+                get_classifier_store().observe(
+                    user_id, item['description'], float(item['amount']), item['category_id'], previous=previous
+                )
+                get_description_index_store().observe(
+                    user_id, item['description'], float(item['amount']), item['category_id'], previous=previous
+                )
+            
             # Return the updated expense
             return ExpenseRead(
                 id=UUID(item['id']),
@@ -304,6 +407,13 @@ class ExpenseService:
                 message=f"Deleted expense {expense_id}"
             )
             
+            invalidate_suggestion_cache(user_id)
+            
+            # Forget the expense in the user's classifier and autocomplete index
+            previous = (existing_expense.description, float(existing_expense.amount), existing_expense.category_id)
+            get_classifier_store().observe(user_id, None, None, None, previous=previous)
+            get_description_index_store().observe(user_id, None, None, None, previous=previous)
+            
             return True
             
         except Exception as e:
@@ -381,6 +491,17 @@ class ExpenseService:
                 message=f"Bulk deleted {len(deleted_ids)} expenses"
             )
             
+            if deleted_ids:
+                invalidate_suggestion_cache(user_id)
+                # Retraining from the expenses is cheaper than replaying each delete
+                get_classifier_store().reset(user_id)
+                index_store = get_description_index_store()
+                for item in delete_response.data:
+                    index_store.observe(
+                        user_id, None, None, None,
+                        previous=(item.get('description'), float(item['amount']), item['category_id'])
+                    )
+            
             # Return the result
             return {
                 "success": len(deleted_ids) > 0,
@@ -402,6 +523,80 @@ class ExpenseService:
             # Re-raise for controller to handle
             raise Exception(f"Bulk delete operation failed: {str(e)}")
             
+    def recategorize_expenses(self, user_id: UUID, command: ExpenseRecategorize) -> Optional[int]:
+        """
+        Move many expenses to one category in a single statement.
+        
+        Expenses are selected by id list and/or the list filters; at least one
+        selector is required so a request cannot move every expense by accident.
+        
+        Args:
+            user_id: UUID of the authenticated user
+            command: Target category and expense selection
+            
+        Returns:
+            Number of moved expenses, or None if the target category is not found
+            
+        Raises:
+            ValueError: If no selector is given
+        """
+        selectors = command.dict(exclude={'category_id'}, exclude_none=True)
+        if not selectors:
+            raise ValueError("Provide expense_ids or at least one filter")
+        
+        try:
+            response = self.supabase.rpc('recategorize_expenses', {
+                'user_id_param': str(user_id),
+                'category_id_param': str(command.category_id),
+                'expense_ids_param': [str(id) for id in command.expense_ids] if command.expense_ids else None,
+                'source_category_id_param': str(command.source_category_id) if command.source_category_id else None,
+                'search_param': command.search,
+                'date_from_param': command.date_from.isoformat() if command.date_from else None,
+                'date_to_param': command.date_to.isoformat() if command.date_to else None,
+                'amount_min_param': command.amount_min,
+                'amount_max_param': command.amount_max
+            }).execute()
+        except Exception as e:
+            if getattr(e, 'code', None) == NO_DATA_FOUND:
+                return None
+            log_error(
+                user_id=user_id,
+                message=f"Failed to recategorize expenses: {str(e)}",
+                error_code="RECATEGORIZE_EXPENSES_ERROR"
+            )
+            raise
+        
+        moved_count = response.data or 0
+        if moved_count:
+            log_info(
+                user_id=user_id,
+                message=f"Recategorized {moved_count} expenses"
+            )
+            invalidate_suggestion_cache(user_id)
+            # Retraining from the expenses is cheaper than replaying each move
+            get_classifier_store().reset(user_id)
+            get_description_index_store().reset(user_id)
+        
+        return moved_count
+            
+    def autocomplete_descriptions(self, user_id: UUID, prefix: str,
+                                  limit: int = 5) -> List[ExpenseAutocompleteSuggestion]:
+        """
+        Suggest past descriptions starting with a prefix, most frequent first.
+        
+        Served from the in-memory description index; only building the index
+        queries the database.
+        
+        Args:
+            user_id: UUID of the authenticated user
+            prefix: Typed beginning of the description
+            limit: Maximum number of suggestions (max 10)
+            
+        Returns:
+            List of ExpenseAutocompleteSuggestion objects with usual category and amount
+        """
+        return get_description_index_store().get(user_id).complete(prefix, min(limit, 10))
+            
     def get_summary(self, user_id: UUID, period: str, 
                    start_date: Optional[str] = None, 
                    end_date: Optional[str] = None) -> ExpenseSummary:
@@ -420,50 +615,16 @@ class ExpenseService:
         Raises:
             ValueError: If period is not supported or required dates are missing
         """
-        period = period.lower()
-        today = datetime.now()
-        
-        if period == 'weekly':
-            # Calculate date range for current week (starting Monday)
-            start_of_week = today - timedelta(days=today.weekday())
-            start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_week = start_of_week + timedelta(days=7)
-            
-            start_date_iso = start_of_week.isoformat()
-            end_date_iso = end_of_week.isoformat()
-            
-        elif period == 'monthly':
-            # Calculate date range for current month
-            start_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            # Get last day of current month
-            _, last_day = calendar.monthrange(today.year, today.month)
-            end_of_month = today.replace(day=last_day, hour=23, minute=59, second=59)
-            end_of_month = end_of_month + timedelta(days=1)  # Move to next day's 00:00:00
-            
-            start_date_iso = start_of_month.isoformat()
-            end_date_iso = end_of_month.isoformat()
-            
-        elif period == 'custom':
-            # Use custom date range
-            if not start_date or not end_date:
-                raise ValueError("Both start_date and end_date are required for custom period")
-                
-            # Parse and validate dates
-            try:
-                start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                
-                if start_dt > end_dt:
-                    raise ValueError("start_date cannot be later than end_date")
-                    
-                start_date_iso = start_dt.isoformat()
-                end_date_iso = end_dt.isoformat()
-                
-            except (ValueError, TypeError) as e:
-                raise ValueError(f"Invalid date format: {str(e)}")
-                
-        else:
-            raise ValueError("Period must be one of: 'weekly', 'monthly', or 'custom'")
+        # Identical concurrent requests (e.g. dashboards open in several tabs)
+        # share one aggregation
+        key = (str(user_id), period.lower(), start_date, end_date)
+        return _summary_flight.do(key, self._compute_summary, user_id, period, start_date, end_date)
+    
+    def _compute_summary(self, user_id: UUID, period: str,
+                         start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> ExpenseSummary:
+        """Aggregate expenses for `get_summary`."""
+        start_date_iso, end_date_iso = get_period_bounds(period, start_date, end_date)
             
         # Query expenses for the specified period
         response = self.supabase.table('expenses') \
@@ -480,4 +641,17 @@ class ExpenseService:
         return ExpenseSummary(
             total_amount=total_amount,
             transaction_count=transaction_count
-        ) 
\ No newline at end of file
+        )
+    
+    def _get_default_category_id(self, user_id: UUID) -> str:
+        """ID of the user's default category, for expenses no rule categorizes."""
+        default_category = self.supabase.table('categories') \
+            .select('id') \
+            .eq('user_id', str(user_id)) \
+            .eq('is_default', True) \
+            .execute()
+        
+        if not default_category.data:
+            raise ValueError("Default category not found")
+            
+        return default_category.data[0]['id']
@@ -0,0 +1,167 @@
+import os
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+from app.openrouter_service import UsageRecord
+from app.schemas import LlmUsageByCaller, LlmUsageDay, LlmUsageReport, LlmUsageTotals
+from app.services.database import get_supabase_client
+from app.services.logs import log_error
+
+# Callers that tag LLM usage records (category suggestions make no LLM calls)
+CALLER_TIPS = "tips"
+
+
+class LlmUsageService:
+    """Service for recording and querying per-user LLM token usage and cost."""
+
+    def __init__(self):
+        """Initialize the usage service with Supabase client."""
+        self.supabase = get_supabase_client()
+        # Unset or 0 means no limit
+        self.daily_token_budget = int(os.environ.get("LLM_DAILY_TOKEN_BUDGET", 0) or 0)
+
+    def record(self, user_id: UUID, caller: str, usage: UsageRecord) -> None:
+        """
+        Add a single call to the user's daily aggregate.
+
+        Args:
+            user_id: UUID of the user the call was made for
+            caller: Feature that made the call (`CALLER_TIPS`)
+            usage: Token usage and latency reported by `OpenRouterService`
+        """
+        self.supabase.rpc('record_llm_usage', {
+            'user_id_param': str(user_id),
+            'caller_param': caller,
+            'model_param': usage.model[:100],
+            'prompt_tokens_param': usage.prompt_tokens,
+            'completion_tokens_param': usage.completion_tokens,
+            'latency_ms_param': int(usage.latency * 1000),
+            'cost_param': usage.cost or 0
+        }).execute()
+
+    def recorder_for(self, user_id: UUID, caller: str) -> Callable[[UsageRecord], None]:
+        """
+        Build a `usage_recorder` callback for `OpenRouterService`.
+
+        Recording errors are logged and swallowed, so accounting can never
+        fail the request it describes.
+
+        Args:
+            user_id: UUID of the user the calls are made for
+            caller: Feature making the calls
+
+        Returns:
+            Callback accepting a `UsageRecord`
+        """
+        def _record(usage: UsageRecord) -> None:
+            try:
+                self.record(user_id, caller, usage)
+            except Exception as e:
+                log_error(
+                    user_id=user_id,
+                    error_code='LLM_USAGE_RECORD_ERROR',
+                    message=f"Failed to record LLM usage: {str(e)}"
+                )
+        return _record
+
+    def get_usage(self, user_id: UUID, date_from: date, date_to: date) -> LlmUsageReport:
+        """
+        Get the user's LLM usage over a date range, per day and per caller.
+
+        Args:
+            user_id: UUID of the authenticated user
+            date_from: First day of the range (UTC, inclusive)
+            date_to: Last day of the range (UTC, inclusive)
+
+        Returns:
+            LlmUsageReport with overall totals, per-day totals and per-caller totals
+        """
+        response = self.supabase.table('llm_usage_daily') \
+            .select('day, caller, model, calls, prompt_tokens, completion_tokens, cost, total_latency_ms, max_latency_ms') \
+            .eq('user_id', str(user_id)) \
+            .gte('day', date_from.isoformat()) \
+            .lte('day', date_to.isoformat()) \
+            .order('day') \
+            .execute()
+
+        days: Dict[str, Dict[str, Any]] = {}
+        callers: Dict[tuple, Dict[str, Any]] = {}
+        totals: Dict[str, Any] = _empty_totals()
+        for row in response.data:
+            _add_row(days.setdefault(row['day'], _empty_totals()), row)
+            _add_row(callers.setdefault((row['caller'], row['model']), _empty_totals()), row)
+            _add_row(totals, row)
+
+        return LlmUsageReport(
+            date_from=date_from,
+            date_to=date_to,
+            totals=LlmUsageTotals(**_finish(totals)),
+            days=[LlmUsageDay(day=day, **_finish(t)) for day, t in days.items()],
+            by_caller=sorted(
+                (LlmUsageByCaller(caller=caller, model=model, **_finish(t)) for (caller, model), t in callers.items()),
+                key=lambda c: c.total_tokens,
+                reverse=True
+            )
+        )
+
+    def get_tokens_today(self, user_id: UUID) -> int:
+        """
+        Get the total tokens used by the user today (UTC).
+
+        Args:
+            user_id: UUID of the user
+
+        Returns:
+            Prompt plus completion tokens across all callers and models
+        """
+        today = datetime.now(timezone.utc).date().isoformat()
+        response = self.supabase.table('llm_usage_daily') \
+            .select('prompt_tokens, completion_tokens') \
+            .eq('user_id', str(user_id)) \
+            .eq('day', today) \
+            .execute()
+        return sum(int(r['prompt_tokens']) + int(r['completion_tokens']) for r in response.data)
+
+    def is_over_budget(self, user_id: UUID) -> bool:
+        """
+        Check the user's daily token budget before making a call.
+
+        Args:
+            user_id: UUID of the user
+
+        Returns:
+            True when `LLM_DAILY_TOKEN_BUDGET` is set and already used up
+        """
+        if not self.daily_token_budget:
+            return False
+        return self.get_tokens_today(user_id) >= self.daily_token_budget
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost': 0.0,
+            'total_latency_ms': 0, 'max_latency_ms': 0}
+
+
+def _add_row(totals: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """Add one `llm_usage_daily` row to a running total."""
+    totals['calls'] += int(row['calls'])
+    totals['prompt_tokens'] += int(row['prompt_tokens'])
+    totals['completion_tokens'] += int(row['completion_tokens'])
+    totals['cost'] += float(row['cost'] or 0)
+    totals['total_latency_ms'] += int(row['total_latency_ms'])
+    totals['max_latency_ms'] = max(totals['max_latency_ms'], int(row['max_latency_ms']))
+
+
+def _finish(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a running total into `LlmUsageTotals` fields."""
+    calls = totals['calls']
+    return {
+        'calls': calls,
+        'prompt_tokens': totals['prompt_tokens'],
+        'completion_tokens': totals['completion_tokens'],
+        'total_tokens': totals['prompt_tokens'] + totals['completion_tokens'],
+        'cost': round(totals['cost'], 6),
+        'avg_latency_ms': totals['total_latency_ms'] / calls if calls else 0.0,
+        'max_latency_ms': totals['max_latency_ms']
+    }
@@ -0,0 +1,118 @@
+"""Single Flight
+~~~~~~~~~~~~~
+Per-process coalescing of concurrent identical calls.
+
+While a call for a given key is in flight, other threads asking for the same
+key do not start their own computation; they wait for the first one and get
+its result (or its exception).  Nothing is cached: once the call finishes, the
+next caller for that key starts a fresh computation.
+
+Results are shared between all coalesced callers and must be treated as
+read-only.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+__all__ = [
+    "SingleFlight",
+    "get_single_flight",
+    "single_flight_metrics",
+]
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe group of in-flight calls keyed by arbitrary hashable keys."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+        # Counters exported as metrics
+        self._executions = 0
+        self._coalesced = 0
+
+    # ---------------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------------
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``fn(*args, **kwargs)`` unless a call for *key* is already running.
+
+        The first caller for *key* executes *fn*; callers arriving before it
+        finishes block and receive the same result or re-raise the same
+        exception.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executions += 1
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Executions, coalesced callers and calls currently in flight."""
+        with self._lock:
+            return {
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+
+_flights: Dict[str, SingleFlight] = {}
+_registry_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Return the process-wide group for *name*, creating it on first use."""
+    with _registry_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
+
+
+def single_flight_metrics() -> Dict[str, Any]:
+    """Metrics of every group created in this process, keyed by name."""
+    with _registry_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.metrics() for flight in flights}
@@ -0,0 +1,106 @@
+import { ref } from 'vue';
+import { AiTipDTO, UseAiTipsStream } from '../types/aiTips';
+
+/**
+ * Composable streaming AI tips from `/ai/tips/stream` (Server-Sent Events).
+ *
+ * EventSource cannot send the Authorization header, so the stream is read
+ * with fetch and parsed manually. Each tip is appended as soon as it arrives.
+ */
+export const useAiTipsStream = (): UseAiTipsStream => {
+  // State
+  const tips = ref<AiTipDTO[]>([]);
+  const loading = ref<boolean>(false);
+  const errorMessage = ref<string | null>(null);
+
+  const getAuthHeader = (): Record<string, string> => {
+    const token = localStorage.getItem('auth_token');
+    return token ? { Authorization: `Bearer ${token}` } : {};
+  };
+
+  /**
+   * Handles a single parsed SSE message
+   */
+  const handleEvent = (event: string, data: string): void => {
+    if (event === 'tip') {
+      tips.value.push(JSON.parse(data) as AiTipDTO);
+    } else if (event === 'error') {
+      errorMessage.value = 'Usługa porad AI jest niedostępna, spróbuj ponownie później.';
+    }
+  };
+
+  /**
+   * Opens the tips stream and renders tips one by one
+   */
+  const fetchTips = async (limit: number = 3): Promise<void> => {
+    loading.value = true;
+    errorMessage.value = null;
+    tips.value = [];
+
+    try {
+      const response = await fetch(`/ai/tips/stream?limit=${limit}`, {
+        method: 'GET',
+        headers: { Accept: 'text/event-stream', ...getAuthHeader() },
+        credentials: 'include'
+      });
+
+      // Unauthorized, redirect to login
+      if (response.status === 401) {
+        window.location.href = '/login';
+        throw new Error('Unauthorized');
+      }
+
+      if (!response.ok || !response.body) {
+        throw new Error(`API error: ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+          break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        // Messages are separated by a blank line
+        let separator = buffer.indexOf('\n\n');
+        while (separator !== -1) {
+          const raw = buffer.slice(0, separator);
+          buffer = buffer.slice(separator + 2);
+
+          let event = 'message';
+          let data = '';
+          raw.split('\n').forEach((line) => {
+            if (line.startsWith('event:')) {
+              event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+              data += line.slice(5).trim();
+            }
+          });
+          handleEvent(event, data);
+
+          // Hide the spinner as soon as the first tip is on screen
+          if (tips.value.length > 0) {
+            loading.value = false;
+          }
+          separator = buffer.indexOf('\n\n');
+        }
+      }
+    } catch (error) {
+      errorMessage.value = 'Usługa porad AI jest niedostępna, spróbuj ponownie później.';
+      console.error('Failed to stream AI tips:', error);
+    } finally {
+      loading.value = false;
+    }
+  };
+
+  return {
+    tips,
+    loading,
+    errorMessage,
+    fetchTips
+  };
+};
@@ -0,0 +1,79 @@
+import { ref } from 'vue';
+import { useApi } from './useApi';
+import { DashboardDTO, DashboardSummaryDTO, DashboardVM, DashboardSummaryVM, UseDashboard } from '../types/dashboard';
+
+/**
+ * Composable fetching the whole dashboard from `/dashboard` in one request
+ */
+export const useDashboard = (): UseDashboard => {
+  const api = useApi();
+
+  // State
+  const dashboard = ref<DashboardVM | null>(null);
+  const loading = ref<boolean>(false);
+  const errorMessage = ref<string | null>(null);
+
+  const formatDate = (dateStr: string): string => {
+    return new Date(dateStr).toLocaleDateString('pl-PL', {
+      day: '2-digit',
+      month: '2-digit',
+      year: 'numeric'
+    });
+  };
+
+  const mapSummary = (dto: DashboardSummaryDTO): DashboardSummaryVM => ({
+    totalAmount: Number(dto.total_amount),
+    transactionCount: dto.transaction_count
+  });
+
+  /**
+   * Maps the API response to our view model
+   */
+  const mapToViewModel = (dto: DashboardDTO): DashboardVM => {
+    const categoryNames = new Map(dto.categories.map((c) => [c.category_id, c.name]));
+    return {
+      weekly: mapSummary(dto.weekly),
+      monthly: mapSummary(dto.monthly),
+      categories: dto.categories.map((c) => ({
+        id: c.category_id,
+        name: c.name,
+        totalAmount: Number(c.total_amount),
+        transactionCount: c.transaction_count
+      })),
+      recentExpenses: dto.recent_expenses.map((e) => ({
+        id: e.id,
+        amount: Number(e.amount),
+        description: e.description || '',
+        // Only categories with spending this month are in the breakdown
+        categoryName: categoryNames.get(e.category_id) || '',
+        date: formatDate(e.date_of_expense)
+      })),
+      tips: dto.tips
+    };
+  };
+
+  /**
+   * Fetches summaries, category breakdown, recent expenses and cached tips
+   */
+  const fetchDashboard = async (): Promise<void> => {
+    loading.value = true;
+    errorMessage.value = null;
+
+    try {
+      const response = await api.get<DashboardDTO>('/dashboard');
+      dashboard.value = mapToViewModel(response);
+    } catch (error) {
+      errorMessage.value = 'Nie udało się załadować danych, spróbuj ponownie później.';
+      console.error('Failed to fetch dashboard:', error);
+    } finally {
+      loading.value = false;
+    }
+  };
+
+  return {
+    dashboard,
+    loading,
+    errorMessage,
+    fetchDashboard
+  };
+};
@@ -0,0 +1,18 @@
+import { Ref } from 'vue';
+
+/**
+ * Type definitions for AI tips
+ */
+
+// DTO received from API (single tip / SSE `tip` event payload)
+export interface AiTipDTO {
+  message: string;
+}
+
+// Hook / composable state
+export interface UseAiTipsStream {
+  tips: Ref<AiTipDTO[]>;
+  loading: Ref<boolean>;
+  errorMessage: Ref<string|null>;
+  fetchTips: (limit?: number) => Promise<void>;
+}
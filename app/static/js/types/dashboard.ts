@@ -0,0 +1,73 @@
+import { Ref } from 'vue';
+import { AiTipDTO } from './aiTips';
+
+/**
+ * Type definitions for the dashboard
+ */
+
+// DTOs received from API (`GET /dashboard`); amounts are decimal strings
+export interface DashboardSummaryDTO {
+  total_amount: string;
+  transaction_count: number;
+}
+
+export interface DashboardCategoryDTO {
+  category_id: string;
+  name: string;
+  total_amount: string;
+  transaction_count: number;
+}
+
+export interface DashboardExpenseDTO {
+  id: string;
+  amount: string;
+  description: string | null;
+  category_id: string;
+  date_of_expense: string;
+  created_at: string;
+}
+
+export interface DashboardDTO {
+  weekly: DashboardSummaryDTO;
+  monthly: DashboardSummaryDTO;
+  categories: DashboardCategoryDTO[];
+  recent_expenses: DashboardExpenseDTO[];
+  tips: AiTipDTO[];
+}
+
+// ViewModels used in component
+export interface DashboardSummaryVM {
+  totalAmount: number;
+  transactionCount: number;
+}
+
+export interface DashboardCategoryVM {
+  id: string;
+  name: string;
+  totalAmount: number;
+  transactionCount: number;
+}
+
+export interface DashboardExpenseVM {
+  id: string;
+  amount: number;
+  description: string;
+  categoryName: string;
+  date: string; // 'DD/MM/YYYY' format for display
+}
+
+export interface DashboardVM {
+  weekly: DashboardSummaryVM;
+  monthly: DashboardSummaryVM;
+  categories: DashboardCategoryVM[];
+  recentExpenses: DashboardExpenseVM[];
+  tips: AiTipDTO[];
+}
+
+// Hook / composable state
+export interface UseDashboard {
+  dashboard: Ref<DashboardVM | null>;
+  loading: Ref<boolean>;
+  errorMessage: Ref<string|null>;
+  fetchDashboard: () => Promise<void>;
+}
@@ -0,0 +1,95 @@
+"""Token Cache
+~~~~~~~~~~~
+Verified-JWT cache for the authentication hook.
+
+Verifying a token means an HMAC over the token plus base64 and JSON decoding
+of its header and payload, repeated on every request although a client sends
+the same token for its whole session.  `TokenVerifier` keeps the payloads of
+tokens it has verified, keyed by a SHA-256 digest of the token (raw tokens are
+never stored), until the token's own ``exp``.  Invalid and expired tokens are
+never cached, so every rejection goes through full verification.
+
+The secret and the accepted algorithms are fixed when the verifier is
+created, at app start.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Sequence, Tuple
+
+import jwt
+
+__all__ = [
+    "TokenVerifier",
+]
+
+
+class TokenVerifier:
+    """`jwt.decode` with a bounded LRU of verified payloads."""
+
+    def __init__(
+        self,
+        secret: str | None,
+        algorithms: Sequence[str] = ("HS256",),
+        *,
+        max_entries: int = 10000,
+        max_ttl_seconds: float = 3600.0,
+    ) -> None:
+        self.algorithms = list(algorithms)
+        self.max_entries = int(max_entries)
+        # Upper bound for tokens without ``exp``
+        self.max_ttl_seconds = float(max_ttl_seconds)
+        self._secret = secret
+
+        self._lock = threading.Lock()
+        # digest -> (expires_at as wall-clock seconds, payload)
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the token's payload; raises `jwt.InvalidTokenError` subclasses like `jwt.decode`.
+
+        The returned payload may be shared with other requests and must be
+        treated as read-only.
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                if now < entry[0]:
+                    self._entries.move_to_end(digest)
+                    self._hits += 1
+                    return entry[1]
+                # Expired: verify again so the caller gets ExpiredSignatureError
+                del self._entries[digest]
+            self._misses += 1
+
+        payload = jwt.decode(token, self._secret, algorithms=self.algorithms)
+
+        expires_at = now + self.max_ttl_seconds
+        if isinstance(payload.get("exp"), (int, float)):
+            expires_at = min(expires_at, float(payload["exp"]))
+        with self._lock:
+            self._entries[digest] = (expires_at, payload)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else None,
+            }
@@ -0,0 +1,113 @@
+"""
+Benchmark: AI tips prompt size and latency, raw JSON vs compact summary.
+
+Usage:
+    python -m benchmarks.bench_ai_tips_prompt            # prompt size only
+    python -m benchmarks.bench_ai_tips_prompt --live 5   # + 5 OpenRouter calls per variant
+
+The "before" prompt reproduces the previous `_build_prompt`, which embedded
+`json.dumps(expense_data, indent=2)` of up to 20 raw rows. The live mode needs
+OPENROUTER_API_KEY and measures end-to-end completion latency.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.services.ai_tips_prompt import build_tips_prompt, estimate_tokens
+
+CATEGORIES = ['Food', 'Transport', 'Entertainment', 'Bills', 'Health', 'Shopping', 'Home', 'Travel']
+MERCHANTS = ['Biedronka', 'Lidl', 'Orlen', 'Netflix', 'Uber', 'Rossmann', 'Zabka', 'IKEA', 'Allegro', 'Apteka']
+
+
+def make_expenses(count: int, seed: int = 42) -> list:
+    """Generate a realistic 14-day expense history."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = []
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        rows.append({
+            'id': f"00000000-0000-0000-0000-{i:012d}",
+            'amount': round(rng.lognormvariate(3.5, 0.8), 2),
+            'description': rng.choice(MERCHANTS),
+            'date_of_expense': (now - timedelta(hours=rng.randint(0, 14 * 24))).isoformat(),
+            'category': {'id': f"11111111-0000-0000-0000-{CATEGORIES.index(category):012d}", 'name': category}
+        })
+    return sorted(rows, key=lambda r: r['date_of_expense'], reverse=True)
+
+
+def build_legacy_prompt(rows: list) -> str:
+    """The pre-compaction prompt (raw rows, indented JSON)."""
+    expense_data = {'recent_expenses': rows[:20], 'category_summary': []}
+    return f"""
+        You are a financial advisor assistant. Based on the following user's expense data, 
+        provide up to three concise, specific and actionable financial tips:
+        
+        User's recent expenses:
+        {json.dumps(expense_data, indent=2)}
+        
+        Your response should ONLY include the tips in a JSON array format, each with a 'message' field.
+        Focus on:
+        1. Spending trends and anomalies
+        2. Budget recommendations
+        3. Savings opportunities
+        
+        Format example:
+        [
+            {{"message": "Your dining out expenses increased by 20% this week."}},
+            {{"message": "Consider setting a budget for entertainment."}}
+        ]
+        """
+
+
+def time_build(fn, rows, repeat: int = 200) -> float:
+    """Median build time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def time_completion(prompt: str, runs: int) -> float:
+    """Median end-to-end completion latency in seconds."""
+    from app.openrouter_service import OpenRouterService
+
+    samples = []
+    async with OpenRouterService(model_name="openai/gpt-3.5-turbo") as service:
+        for _ in range(runs):
+            start = time.perf_counter()
+            await service.chat_completion(
+                [{"role": "user", "content": prompt}],
+                model_params={"temperature": 0.7, "max_tokens": 300}
+            )
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--live', type=int, default=0, metavar='N', help='OpenRouter calls per variant')
+    args = parser.parse_args()
+
+    print(f"{'rows':>5} {'variant':>8} {'chars':>7} {'~tokens':>8} {'build ms':>9}")
+    for count in (5, 20, 60, 200):
+        rows = make_expenses(count)
+        for name, fn in (('before', build_legacy_prompt), ('after', build_tips_prompt)):
+            prompt = fn(rows)
+            print(f"{count:>5} {name:>8} {len(prompt):>7} {estimate_tokens(prompt):>8} {time_build(fn, rows):>9.3f}")
+
+    if args.live:
+        rows = make_expenses(60)
+        for name, fn in (('before', build_legacy_prompt), ('after', build_tips_prompt)):
+            latency = asyncio.run(time_completion(fn(rows), args.live))
+            print(f"live {name}: median {latency:.2f}s over {args.live} calls")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: categorization rule matching time vs. number of rules.
+
+Usage:
+    python -m benchmarks.bench_categorization_rules
+
+Compares the compiled `RuleMatcher` (one Aho-Corasick pass for keyword and
+prefix rules) with checking each rule in turn, for growing numbers of keyword
+rules and typical expense descriptions.
+"""
+import random
+import statistics
+import time
+
+from app.services.categorization_rules import RuleMatcher
+from app.services.category_classifier import normalize_description
+
+DESCRIPTIONS = [
+    "Biedronka Warszawa card payment", "uber ride to airport", "Orlen fuel #12",
+    "netflix subscription", "lunch with team at sushi bar", "apteka vitamins",
+]
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+
+
+def rules_of(count: int, rng: random.Random) -> list:
+    words = ["biedronka", "uber", "orlen", "netflix", "sushi", "apteka"]
+    # Real keywords last, so a per-rule loop has to try almost every rule
+    patterns = [random_word(rng) for _ in range(count - len(words))] + words
+    return [{'category_id': f"c{i}", 'kind': 'keyword', 'pattern': p} for i, p in enumerate(patterns)]
+
+
+def per_rule_loop(rules: list, description: str):
+    padded = f" {normalize_description(description)} "
+    for rule in rules:
+        if f" {normalize_description(rule['pattern'])} " in padded:
+            return rule['category_id']
+    return None
+
+
+def measure(fn, repeats: int = 2000) -> float:
+    samples = []
+    for i in range(repeats):
+        description = DESCRIPTIONS[i % len(DESCRIPTIONS)]
+        start = time.perf_counter()
+        fn(description)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    rng = random.Random(1)
+    print(f"{'rules':>6}{'compile ms':>12}{'matcher us':>12}{'per-rule us':>13}")
+    for count in (10, 100, 1000, 5000):
+        rules = rules_of(count, rng)
+        start = time.perf_counter()
+        matcher = RuleMatcher(rules)
+        compile_ms = (time.perf_counter() - start) * 1e3
+        compiled = measure(lambda d: matcher.match(d, 10.0))
+        looped = measure(lambda d: per_rule_loop(rules, d))
+        print(f"{count:>6}{compile_ms:>12.1f}{compiled:>12.1f}{looped:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
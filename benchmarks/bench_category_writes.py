@@ -0,0 +1,106 @@
+"""
+Micro-benchmark: category create/rename latency with and without the duplicate pre-check.
+
+Usage:
+    python -m benchmarks.bench_category_writes [--rtt-ms 15] [--iterations 50]
+
+The previous create ran `select id ... where name = ?` before the insert and
+the previous rename ran `get_category`, the same duplicate lookup and then
+the update. The current writes are single statements that rely on the
+unique_name_per_user constraint. Each PostgREST call is simulated with a fixed
+round-trip time (`--rtt-ms`), so the numbers show what the saved round-trips
+are worth at a given distance to the database.
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from app.services.categories import CategoryService
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    """Accepts any builder chain; `execute` sleeps one round-trip."""
+
+    def __init__(self, client, op='select', values=None):
+        self.client, self.op, self.values = client, op, values
+
+    def select(self, _columns):
+        return self
+
+    def insert(self, values):
+        return _Query(self.client, 'insert', values)
+
+    def update(self, values):
+        return _Query(self.client, 'update', values)
+
+    def eq(self, _column, _value):
+        return self
+
+    neq = eq
+
+    def execute(self):
+        time.sleep(self.client.rtt)
+        if self.op == 'select':
+            return _Response([])
+        return _Response([{'id': str(uuid.uuid4()), 'name': self.values['name'], 'is_default': False}])
+
+
+class _Client:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+
+    def table(self, _name):
+        return _Query(self)
+
+
+def previous_create(client, user_id, name):
+    client.table('categories').select('id').eq('user_id', user_id).eq('name', name).execute()
+    client.table('categories').insert({'name': name, 'user_id': user_id, 'is_default': False}).execute()
+
+
+def previous_update(client, user_id, category_id, name):
+    client.table('categories').select('id, name, is_default').eq('user_id', user_id).eq('id', category_id).execute()
+    client.table('categories').select('id').eq('user_id', user_id).eq('name', name).neq('id', category_id).execute()
+    client.table('categories').update({'name': name}).eq('user_id', user_id).eq('id', category_id).execute()
+
+
+def measure(fn, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--rtt-ms', type=float, default=15.0, help='simulated PostgREST round-trip time')
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    client = _Client(args.rtt_ms / 1e3)
+    service = CategoryService.__new__(CategoryService)
+    service.supabase = client
+    user_id, category_id = uuid.uuid4(), uuid.uuid4()
+
+    rows = [
+        ('create, pre-check + insert', measure(lambda: previous_create(client, str(user_id), 'Travel'), args.iterations)),
+        ('create, single insert', measure(lambda: service.create_category(user_id, 'Travel'), args.iterations)),
+        ('rename, get + pre-check + update',
+         measure(lambda: previous_update(client, str(user_id), str(category_id), 'Trips'), args.iterations)),
+        ('rename, single update', measure(lambda: service.update_category(user_id, category_id, 'Trips'), args.iterations)),
+    ]
+    print(f"simulated round-trip: {args.rtt_ms:.1f} ms, {args.iterations} iterations")
+    for label, median_ms in rows:
+        print(f"{label:<36}{median_ms:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
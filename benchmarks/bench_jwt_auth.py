@@ -0,0 +1,60 @@
+"""
+Micro-benchmark: per-request cost of JWT authentication.
+
+Usage:
+    python -m benchmarks.bench_jwt_auth
+
+Compares the previous `authenticate` body (`os.environ.get("JWT_SECRET")` and
+`jwt.decode` on every request) with `TokenVerifier.verify` for a returning
+token, and measures the whole before_request hook through the Flask test
+client with and without the cache.
+"""
+import os
+import statistics
+import time
+
+import jwt
+
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark.key.x")
+
+from app import create_app  # noqa: E402
+from app.token_cache import TokenVerifier  # noqa: E402
+
+
+def measure(fn, repeats: int = 20000) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    token = jwt.encode(
+        {"user_id": "6f1c2d3e-0000-4000-8000-000000000000", "exp": int(time.time()) + 3600,
+         "email": "user@example.com", "role": "authenticated"},
+        os.environ["JWT_SECRET"], algorithm="HS256"
+    )
+
+    uncached = measure(lambda: jwt.decode(token, os.environ.get("JWT_SECRET"), algorithms=["HS256"]))
+    verifier = TokenVerifier(os.environ["JWT_SECRET"])
+    cached = measure(lambda: verifier.verify(token))
+    print(f"{'verification only':<28}{'uncached':>10}{'cached':>10}")
+    print(f"{'median us':<28}{uncached:>10.1f}{cached:>10.1f}")
+
+    # Full hook: an authenticated request to an unknown path (auth + 404 handler)
+    app = create_app()
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    with_cache = measure(lambda: client.get("/__bench", headers=headers), repeats=3000)
+    app.extensions["token_verifier"].max_entries = 0  # every request misses
+    app.extensions["token_verifier"]._entries.clear()
+    without_cache = measure(lambda: client.get("/__bench", headers=headers), repeats=3000)
+    print(f"{'request through hook':<28}{without_cache:>10.1f}{with_cache:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
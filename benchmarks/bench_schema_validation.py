@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: per-response cost of strict JSON-schema validation.
+
+Usage:
+    python -m benchmarks.bench_schema_validation
+
+Compares the previous `_validate_response` body (`json.loads` +
+`jsonschema.validate`, which re-checks the schema and builds a validator on
+every call) with the current one (fast-path parse + cached compiled
+validator), for realistic tips and category-suggestion schemas.
+"""
+import json
+import statistics
+import time
+import uuid
+
+import jsonschema
+
+from app.openrouter_service import OpenRouterService
+
+TIPS_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ai_tips",
+        "strict": True,
+        "schema": {
+            "type": "array",
+            "maxItems": 3,
+            "items": {
+                "type": "object",
+                "properties": {"message": {"type": "string", "minLength": 1, "maxLength": 300}},
+                "required": ["message"],
+                "additionalProperties": False,
+            },
+        },
+    },
+}
+
+SUGGESTIONS_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "category_suggestions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "suggestions": {
+                    "type": "array",
+                    "maxItems": 5,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string", "format": "uuid"},
+                            "name": {"type": "string", "maxLength": 30},
+                            "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+                        },
+                        "required": ["id", "name", "confidence"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["suggestions"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+TIPS_CONTENT = json.dumps([
+    {"message": "Your dining out expenses increased by 20% this week."},
+    {"message": "Consider setting a monthly budget for entertainment."},
+    {"message": "Groceries at Lidl make up 40% of your food spending."},
+])
+
+SUGGESTIONS_CONTENT = json.dumps({
+    "suggestions": [
+        {"id": str(uuid.uuid4()), "name": name, "confidence": score}
+        for name, score in (("Food", 0.82), ("Shopping", 0.11), ("Home", 0.04))
+    ]
+})
+
+
+def legacy_validate(resp_json, response_format):
+    """The previous `_validate_response` body."""
+    schema_def = response_format["json_schema"]["schema"]
+    parsed = json.loads(resp_json["choices"][0]["message"]["content"])
+    jsonschema.validate(instance=parsed, schema=schema_def)
+
+
+def measure(fn, repeat: int = 2000) -> float:
+    """Median microseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    service = OpenRouterService(api_key="benchmark")
+    print(f"{'schema':>12} {'before us':>10} {'after us':>9} {'speedup':>8}")
+    for name, response_format, content in (
+        ("tips", TIPS_FORMAT, TIPS_CONTENT),
+        ("suggestions", SUGGESTIONS_FORMAT, SUGGESTIONS_CONTENT),
+    ):
+        resp_json = {"choices": [{"message": {"content": content}}]}
+        before = measure(lambda: legacy_validate(resp_json, response_format))
+        after = measure(lambda: service._validate_response(resp_json, response_format))
+        print(f"{name:>12} {before:>10.1f} {after:>9.1f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Offline evaluation of the per-user category classifier.
+
+Usage:
+    python -m benchmarks.eval_category_classifier [--input expenses.csv]
+
+The input is a CSV export with `description`, `amount` and `category`
+columns, in chronological order (e.g. `select description, amount, c.name as
+category from expenses join categories c ... order by date_of_expense`).
+Without `--input` a seeded synthetic history is generated.
+
+Evaluation is prequential, mirroring production: each expense is first
+predicted with the model trained on all earlier expenses, then learned. Top-1
+and top-3 accuracy are compared with the previous ranking by usage count.
+Prediction latency and serialized model size are reported as well.
+"""
+import argparse
+import csv
+import random
+import statistics
+import time
+from collections import Counter
+from typing import List, Tuple
+
+from app.services.category_classifier import CategoryClassifier
+
+SYNTHETIC_CATEGORIES = {
+    'Groceries': (['biedronka', 'lidl', 'zabka', 'carrefour', 'auchan', 'groceries', 'zakupy spozywcze'], (8, 250)),
+    'Transport': (['uber', 'bolt', 'orlen fuel', 'shell', 'bilet mpk', 'pkp intercity', 'parking'], (4, 300)),
+    'Dining': (['mcdonalds', 'kfc', 'pizza hut', 'restaurant', 'kawiarnia', 'sushi', 'lunch with team'], (12, 180)),
+    'Bills': (['electricity bill', 'pgnig gas', 'internet orange', 'play phone', 'rent', 'water bill'], (40, 2500)),
+    'Entertainment': (['netflix', 'spotify', 'cinema city', 'steam game', 'concert tickets', 'hbo max'], (15, 250)),
+    'Health': (['apteka', 'pharmacy', 'dentist', 'luxmed', 'vitamins', 'gym membership'], (10, 400)),
+}
+
+
+def synthetic_history(n: int = 2000, seed: int = 7) -> List[Tuple[str, float, str]]:
+    """Generate a noisy expense history with typos, suffixes and shared words."""
+    rng = random.Random(seed)
+    weights = [5, 3, 3, 1, 1, 1]
+    names = list(SYNTHETIC_CATEGORIES)
+    rows = []
+    for _ in range(n):
+        category = rng.choices(names, weights)[0]
+        merchants, (low, high) = SYNTHETIC_CATEGORIES[category]
+        description = rng.choice(merchants)
+        if rng.random() < 0.2:  # typo
+            i = rng.randrange(len(description))
+            description = description[:i] + description[i + 1:]
+        if rng.random() < 0.3:
+            description += rng.choice([' warszawa', ' krakow', ' card payment', ' #' + str(rng.randint(1, 99))])
+        if rng.random() < 0.05:  # mislabelled / ambiguous
+            category = rng.choice(names)
+        rows.append((description, round(rng.uniform(low, high), 2), category))
+    return rows
+
+
+def read_csv(path: str) -> List[Tuple[str, float, str]]:
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(r['description'], float(r['amount']), r['category']) for r in csv.DictReader(f)]
+
+
+def evaluate(rows: List[Tuple[str, float, str]]) -> None:
+    model = CategoryClassifier()
+    usage = Counter()
+    hits = {'nb@1': 0, 'nb@3': 0, 'usage@1': 0, 'usage@3': 0}
+    latencies = []
+    evaluated = 0
+
+    for description, amount, category in rows:
+        if usage:
+            start = time.perf_counter()
+            ranked = [c for c, _ in model.predict(description, amount, usage)]
+            latencies.append((time.perf_counter() - start) * 1e6)
+            by_usage = [c for c, _ in usage.most_common()]
+            evaluated += 1
+            hits['nb@1'] += ranked[:1] == [category]
+            hits['nb@3'] += category in ranked[:3]
+            hits['usage@1'] += by_usage[:1] == [category]
+            hits['usage@3'] += category in by_usage[:3]
+        model.learn(description, amount, category)
+        usage[category] += 1
+
+    print(f"{len(rows)} expenses, {len(usage)} categories, {evaluated} predictions")
+    print(f"{'ranking':<14}{'top-1':>8}{'top-3':>8}")
+    print(f"{'usage count':<14}{hits['usage@1'] / evaluated:>8.1%}{hits['usage@3'] / evaluated:>8.1%}")
+    print(f"{'naive Bayes':<14}{hits['nb@1'] / evaluated:>8.1%}{hits['nb@3'] / evaluated:>8.1%}")
+    print(f"predict latency: median {statistics.median(latencies):.0f} us, "
+          f"p99 {statistics.quantiles(latencies, n=100)[98]:.0f} us")
+    print(f"serialized model: {len(model.to_bytes())} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--input', help='CSV export with description, amount, category columns')
+    args = parser.parse_args()
+    evaluate(read_csv(args.input) if args.input else synthetic_history())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+-- Migration: Add AI tips context function
+-- Description: Returns both the recent expenses slice and the per-category sum and count
+-- for the AI tips window in a single call. Replaces two PostgREST queries, one of which
+-- relied on a .group() aggregate that the query builder does not support.
+
+create or replace function get_ai_tips_context(
+  user_id_param uuid,
+  since_param timestamptz,
+  recent_limit_param integer default 200
+)
+returns jsonb
+language sql
+stable
+security definer
+set search_path = public, pg_catalog
+as $$
+  -- Served by idx_expenses_user_date (user_id, date_of_expense desc)
+  with window_expenses as (
+    select e.id, e.amount, e.description, e.date_of_expense, e.category_id, c.name as category_name
+    from public.expenses e
+    join public.categories c on c.id = e.category_id
+    where e.user_id = user_id_param
+      and e.date_of_expense >= since_param
+  )
+  select jsonb_build_object(
+    'recent_expenses', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'id', r.id,
+          'amount', r.amount,
+          'description', r.description,
+          'date_of_expense', r.date_of_expense,
+          'category', jsonb_build_object('id', r.category_id, 'name', r.category_name)
+        ) order by r.date_of_expense desc
+      )
+      from (
+        select * from window_expenses
+        order by date_of_expense desc
+        limit recent_limit_param
+      ) r
+    ), '[]'::jsonb),
+    -- Aggregates cover the whole window, even when the slice above is truncated
+    'category_summary', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'category_id', s.category_id,
+          'name', s.category_name,
+          'sum_amount', s.sum_amount,
+          'count', s.expense_count
+        ) order by s.sum_amount desc
+      )
+      from (
+        select category_id, category_name, sum(amount) as sum_amount, count(*) as expense_count
+        from window_expenses
+        group by category_id, category_name
+      ) s
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- Takes any user id, so only the backend (service role key) may call it; RLS does not
+-- apply inside security definer functions
+revoke execute on function get_ai_tips_context(uuid, timestamptz, integer) from public, anon, authenticated;
+grant execute on function get_ai_tips_context(uuid, timestamptz, integer) to service_role;
@@ -0,0 +1,61 @@
+-- Migration: Add LLM usage accounting
+-- Description: Daily per-user aggregates of OpenRouter token usage, cost and latency,
+-- split by caller (e.g. tips) and model. Rows are upserted by record_llm_usage,
+-- so the table grows by at most one row per user, day, caller and model.
+
+create table llm_usage_daily (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  day date not null,
+  caller varchar(30) not null,
+  model varchar(100) not null,
+  calls integer not null default 0,
+  prompt_tokens bigint not null default 0,
+  completion_tokens bigint not null default 0,
+  cost numeric(14, 6) not null default 0,
+  total_latency_ms bigint not null default 0,
+  max_latency_ms integer not null default 0,
+  updated_at timestamptz not null default now(),
+  primary key (user_id, day, caller, model)
+);
+
+-- Only the backend (service role) reads and writes usage; no policies for other roles
+alter table llm_usage_daily enable row level security;
+
+create or replace function record_llm_usage(
+  user_id_param uuid,
+  caller_param varchar,
+  model_param varchar,
+  prompt_tokens_param integer,
+  completion_tokens_param integer,
+  latency_ms_param integer,
+  cost_param numeric default 0
+)
+returns void
+language sql
+security definer
+set search_path = public, pg_catalog
+as $$
+  insert into public.llm_usage_daily as u (
+    user_id, day, caller, model, calls,
+    prompt_tokens, completion_tokens, cost, total_latency_ms, max_latency_ms
+  )
+  values (
+    user_id_param, (now() at time zone 'utc')::date, caller_param, model_param, 1,
+    prompt_tokens_param, completion_tokens_param, coalesce(cost_param, 0),
+    latency_ms_param, latency_ms_param
+  )
+  on conflict (user_id, day, caller, model) do update set
+    calls = u.calls + 1,
+    prompt_tokens = u.prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = u.completion_tokens + excluded.completion_tokens,
+    cost = u.cost + excluded.cost,
+    total_latency_ms = u.total_latency_ms + excluded.total_latency_ms,
+    max_latency_ms = greatest(u.max_latency_ms, excluded.max_latency_ms),
+    updated_at = now();
+$$;
+
+-- Takes any user id, so only the backend (service role key) may call it
+revoke execute on function record_llm_usage(uuid, varchar, varchar, integer, integer, integer, numeric)
+  from public, anon, authenticated;
+grant execute on function record_llm_usage(uuid, varchar, varchar, integer, integer, integer, numeric)
+  to service_role;
@@ -0,0 +1,20 @@
+-- Migration: Add category classifier storage
+-- Description: One serialized naive Bayes category classifier per user (zlib-compressed
+-- JSON, base64 text). Written by the application in the background after incremental
+-- updates; a few KB per user. Writers compare-and-set on version, so concurrent workers
+-- never overwrite each other's updates.
+
+create table category_classifiers (
+  user_id uuid primary key references auth.users(id) on delete cascade,
+  model text not null,
+  sample_count integer not null default 0,
+  version integer not null default 1,
+  updated_at timestamptz not null default now()
+);
+
+create trigger trg_category_classifiers_updated_at
+  before update on category_classifiers
+  for each row execute function public.update_updated_at_column();
+
+-- Only the backend (service role) reads and writes models; no policies for other roles
+alter table category_classifiers enable row level security;
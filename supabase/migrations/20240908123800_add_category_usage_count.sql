@@ -0,0 +1,71 @@
+-- Migration: Add trigger-maintained usage_count to categories
+-- Description: Keeps the number of expenses per category in categories.usage_count,
+-- updated by triggers on expenses, so usage lookups no longer aggregate over all of a
+-- user's expenses. Backfills existing counts and drops get_category_usage_counts, whose
+-- callers now read the column. Maintaining the count does not touch updated_at.
+
+-- 1. Column and index (usage lookups read a user's few categories, most used first)
+alter table categories add column usage_count integer not null default 0;
+
+create index idx_categories_user_usage on categories (user_id, usage_count desc);
+
+-- 2. Trigger function: +1 for the new category, -1 for the old one
+create or replace function update_category_usage_count()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_catalog
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    update public.categories
+    set usage_count = greatest(usage_count - 1, 0)
+    where id = old.category_id;
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    update public.categories
+    set usage_count = usage_count + 1
+    where id = new.category_id;
+  end if;
+
+  return null;
+end;
+$$;
+
+create trigger trg_expenses_usage_count_insert
+  after insert on expenses
+  for each row execute function public.update_category_usage_count();
+
+-- Also fires for "on delete set default" when a category is deleted
+create trigger trg_expenses_usage_count_update
+  after update of category_id on expenses
+  for each row
+  when (old.category_id is distinct from new.category_id)
+  execute function public.update_category_usage_count();
+
+create trigger trg_expenses_usage_count_delete
+  after delete on expenses
+  for each row execute function public.update_category_usage_count();
+
+-- 3. Usage counts are not edits: keep updated_at for changes to the category itself.
+-- usage_count is only ever updated on its own, by the triggers above.
+drop trigger if exists trg_categories_updated_at on categories;
+create trigger trg_categories_updated_at
+  before update on categories
+  for each row
+  when (old.usage_count is not distinct from new.usage_count)
+  execute function public.update_updated_at_column();
+
+-- 4. Backfill existing counts
+update categories c
+set usage_count = counts.expense_count
+from (
+  select category_id, count(*) as expense_count
+  from expenses
+  group by category_id
+) counts
+where counts.category_id = c.id;
+
+-- 5. The aggregating RPC has no callers left; the API reads categories.usage_count
+drop function if exists get_category_usage_counts(uuid);
@@ -0,0 +1,38 @@
+-- Migration: Add create_categories_bulk
+-- Description: Creates several categories for a user in one statement, e.g. the
+-- selection made during onboarding. Names that already exist are left untouched and
+-- returned with created = false, so the call is idempotent and reports per-name results.
+
+create or replace function create_categories_bulk(user_id_param uuid, names_param varchar[])
+returns table (id uuid, name varchar, is_default boolean, created boolean)
+language sql
+volatile
+security definer
+set search_path = public, pg_catalog
+as $$
+  with requested as (
+    select distinct r.name
+    from unnest(names_param) as r(name)
+  ),
+  inserted as (
+    insert into public.categories (user_id, name, is_default)
+    select user_id_param, requested.name, false
+    from requested
+    on conflict on constraint unique_name_per_user do nothing
+    returning categories.id, categories.name, categories.is_default
+  )
+  -- The statement snapshot does not include its own inserts, so new rows come
+  -- from "inserted" and pre-existing ones from the table
+  select
+    coalesce(i.id, c.id),
+    requested.name,
+    coalesce(i.is_default, c.is_default),
+    i.id is not null
+  from requested
+  left join inserted i on i.name = requested.name
+  left join public.categories c on c.user_id = user_id_param and c.name = requested.name;
+$$;
+
+-- Takes any user id, so only the backend (service role key) may call it
+revoke execute on function create_categories_bulk(uuid, varchar[]) from public, anon, authenticated;
+grant execute on function create_categories_bulk(uuid, varchar[]) to service_role;
@@ -0,0 +1,197 @@
+-- Migration: Add category merge and bulk recategorization
+-- Description: merge_categories moves all expenses of one category into another and
+-- deletes it; recategorize_expenses moves a list or a filtered set of expenses to a
+-- category. Each is a single UPDATE inside the RPC transaction. The usage_count
+-- triggers become statement-level with transition tables, so moving tens of thousands
+-- of expenses costs one counter update per affected category instead of two per row.
+
+-- 1. Lookups of a user's expenses by category (merge, recategorize, "on delete set default")
+create index idx_expenses_user_category on expenses (user_id, category_id);
+
+-- 2. Statement-level usage_count maintenance
+drop trigger if exists trg_expenses_usage_count_insert on expenses;
+drop trigger if exists trg_expenses_usage_count_update on expenses;
+drop trigger if exists trg_expenses_usage_count_delete on expenses;
+
+create or replace function update_category_usage_count()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_catalog
+as $$
+begin
+  if tg_op = 'INSERT' then
+    update public.categories c
+    set usage_count = c.usage_count + d.expense_count
+    from (
+      select category_id, count(*) as expense_count
+      from new_rows
+      group by category_id
+    ) d
+    where c.id = d.category_id;
+
+  elsif tg_op = 'DELETE' then
+    update public.categories c
+    set usage_count = greatest(c.usage_count - d.expense_count, 0)
+    from (
+      select category_id, count(*) as expense_count
+      from old_rows
+      group by category_id
+    ) d
+    where c.id = d.category_id;
+
+  else
+    update public.categories c
+    set usage_count = greatest(c.usage_count + d.delta, 0)
+    from (
+      select moves.category_id, sum(moves.delta) as delta
+      from (
+        select o.category_id, -1 as delta
+        from old_rows o
+        join new_rows n on n.id = o.id
+        where o.category_id is distinct from n.category_id
+        union all
+        select n.category_id, 1 as delta
+        from old_rows o
+        join new_rows n on n.id = o.id
+        where o.category_id is distinct from n.category_id
+      ) moves
+      group by moves.category_id
+    ) d
+    where c.id = d.category_id
+      and d.delta <> 0;
+  end if;
+
+  return null;
+end;
+$$;
+
+create trigger trg_expenses_usage_count_insert
+  after insert on expenses
+  referencing new table as new_rows
+  for each statement execute function public.update_category_usage_count();
+
+-- Transition tables cannot be combined with "update of category_id"; the
+-- function only counts rows whose category actually changed
+create trigger trg_expenses_usage_count_update
+  after update on expenses
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function public.update_category_usage_count();
+
+create trigger trg_expenses_usage_count_delete
+  after delete on expenses
+  referencing old table as old_rows
+  for each statement execute function public.update_category_usage_count();
+
+-- 3. Merge a category into another one
+-- Errors: P0002 when either category is not the user's, 22023 for invalid merges
+create or replace function merge_categories(
+  user_id_param uuid,
+  source_id_param uuid,
+  target_id_param uuid
+)
+returns integer
+language plpgsql
+security definer
+set search_path = public, pg_catalog
+as $$
+declare
+  source_is_default boolean;
+  moved_count integer;
+begin
+  if source_id_param = target_id_param then
+    raise exception 'Cannot merge a category into itself' using errcode = '22023';
+  end if;
+
+  -- Lock both rows so concurrent renames, deletes or merges wait for us
+  select c.is_default into source_is_default
+  from public.categories c
+  where c.id = source_id_param and c.user_id = user_id_param
+  for update;
+
+  if not found then
+    raise exception 'Category not found' using errcode = 'P0002';
+  end if;
+
+  if source_is_default then
+    raise exception 'Cannot merge the default category' using errcode = '22023';
+  end if;
+
+  perform 1
+  from public.categories c
+  where c.id = target_id_param and c.user_id = user_id_param
+  for update;
+
+  if not found then
+    raise exception 'Target category not found' using errcode = 'P0002';
+  end if;
+
+  update public.expenses
+  set category_id = target_id_param
+  where user_id = user_id_param
+    and category_id = source_id_param;
+
+  get diagnostics moved_count = row_count;
+
+  delete from public.categories
+  where id = source_id_param and user_id = user_id_param;
+
+  return moved_count;
+end;
+$$;
+
+-- 4. Move selected expenses to a category
+-- Expenses are selected by id list and/or the same filters as the expense list;
+-- null parameters do not filter. Errors: P0002 when the category is not the user's
+create or replace function recategorize_expenses(
+  user_id_param uuid,
+  category_id_param uuid,
+  expense_ids_param uuid[] default null,
+  source_category_id_param uuid default null,
+  search_param text default null,
+  date_from_param timestamptz default null,
+  date_to_param timestamptz default null,
+  amount_min_param numeric default null,
+  amount_max_param numeric default null
+)
+returns integer
+language plpgsql
+security definer
+set search_path = public, pg_catalog
+as $$
+declare
+  moved_count integer;
+begin
+  perform 1
+  from public.categories c
+  where c.id = category_id_param and c.user_id = user_id_param;
+
+  if not found then
+    raise exception 'Category not found' using errcode = 'P0002';
+  end if;
+
+  update public.expenses e
+  set category_id = category_id_param
+  where e.user_id = user_id_param
+    and e.category_id <> category_id_param
+    and (expense_ids_param is null or e.id = any(expense_ids_param))
+    and (source_category_id_param is null or e.category_id = source_category_id_param)
+    and (search_param is null or e.description ilike '%' || search_param || '%')
+    and (date_from_param is null or e.date_of_expense >= date_from_param)
+    and (date_to_param is null or e.date_of_expense <= date_to_param)
+    and (amount_min_param is null or e.amount >= amount_min_param)
+    and (amount_max_param is null or e.amount <= amount_max_param);
+
+  get diagnostics moved_count = row_count;
+  return moved_count;
+end;
+$$;
+
+-- 5. Both functions take any user id, so only the backend (service role key) may call them
+revoke execute on function merge_categories(uuid, uuid, uuid) from public, anon, authenticated;
+grant execute on function merge_categories(uuid, uuid, uuid) to service_role;
+
+revoke execute on function recategorize_expenses(uuid, uuid, uuid[], uuid, text, timestamptz, timestamptz, numeric, numeric)
+  from public, anon, authenticated;
+grant execute on function recategorize_expenses(uuid, uuid, uuid[], uuid, text, timestamptz, timestamptz, numeric, numeric)
+  to service_role;
@@ -0,0 +1,129 @@
+-- Migration: Add categorization rules
+-- Description: User-defined rules (keyword, prefix, regex or amount range -> category)
+-- applied to new expenses without a category. The application compiles a user's rules
+-- into one matcher; rows are ordered by priority, then creation time, first match wins.
+-- Rules follow their category through merges and are deleted with it.
+
+create table categorization_rules (
+  id uuid primary key default gen_random_uuid(),
+  user_id uuid not null references auth.users(id) on delete cascade,
+  category_id uuid not null references categories(id) on delete cascade,
+  kind varchar(10) not null,
+  pattern varchar(100),
+  amount_min numeric(12,2),
+  amount_max numeric(12,2),
+  priority integer not null default 0,
+  created_at timestamptz not null default now(),
+  updated_at timestamptz not null default now(),
+  constraint rule_kind check (kind in ('keyword', 'prefix', 'regex', 'amount')),
+  constraint rule_pattern check ((kind = 'amount') = (pattern is null)),
+  constraint rule_amount_range check (amount_min is null or amount_max is null or amount_min <= amount_max)
+);
+
+-- Rules are always loaded per user in matching order
+create index idx_categorization_rules_user_priority on categorization_rules (user_id, priority, created_at);
+
+-- "on delete cascade" from categories
+create index idx_categorization_rules_category on categorization_rules (category_id);
+
+create trigger trg_categorization_rules_updated_at
+  before update on categorization_rules
+  for each row execute function public.update_updated_at_column();
+
+-- Per-user caps: regex rules are matched one by one, so their number must stay bounded.
+-- Rule writes of one user are serialized, so concurrent creates cannot both pass the count.
+create or replace function enforce_categorization_rule_limits()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_catalog
+as $$
+begin
+  perform pg_advisory_xact_lock(hashtext('categorization_rules'), hashtext(new.user_id::text));
+
+  if tg_op = 'INSERT'
+     and (select count(*) from public.categorization_rules where user_id = new.user_id) >= 200 then
+    raise exception 'A user can have at most 200 rules' using errcode = '22023';
+  end if;
+
+  if new.kind = 'regex' and (tg_op = 'INSERT' or old.kind <> 'regex')
+     and (select count(*) from public.categorization_rules
+          where user_id = new.user_id and kind = 'regex') >= 20 then
+    raise exception 'A user can have at most 20 regex rules' using errcode = '22023';
+  end if;
+
+  return new;
+end;
+$$;
+
+create trigger trg_categorization_rules_limits
+  before insert or update of kind on categorization_rules
+  for each row execute function public.enforce_categorization_rule_limits();
+
+-- Only the backend (service role) reads and writes rules; no policies for other roles
+alter table categorization_rules enable row level security;
+
+-- Merging a category keeps its rules, pointed at the target
+create or replace function merge_categories(
+  user_id_param uuid,
+  source_id_param uuid,
+  target_id_param uuid
+)
+returns integer
+language plpgsql
+security definer
+set search_path = public, pg_catalog
+as $$
+declare
+  source_is_default boolean;
+  moved_count integer;
+begin
+  if source_id_param = target_id_param then
+    raise exception 'Cannot merge a category into itself' using errcode = '22023';
+  end if;
+
+  -- Lock both rows so concurrent renames, deletes or merges wait for us
+  select c.is_default into source_is_default
+  from public.categories c
+  where c.id = source_id_param and c.user_id = user_id_param
+  for update;
+
+  if not found then
+    raise exception 'Category not found' using errcode = 'P0002';
+  end if;
+
+  if source_is_default then
+    raise exception 'Cannot merge the default category' using errcode = '22023';
+  end if;
+
+  perform 1
+  from public.categories c
+  where c.id = target_id_param and c.user_id = user_id_param
+  for update;
+
+  if not found then
+    raise exception 'Target category not found' using errcode = 'P0002';
+  end if;
+
+  update public.expenses
+  set category_id = target_id_param
+  where user_id = user_id_param
+    and category_id = source_id_param;
+
+  get diagnostics moved_count = row_count;
+
+  update public.categorization_rules
+  set category_id = target_id_param
+  where user_id = user_id_param
+    and category_id = source_id_param;
+
+  delete from public.categories
+  where id = source_id_param and user_id = user_id_param;
+
+  return moved_count;
+end;
+$$;
+
+-- Takes any user id, so only the backend (service role key) may call it
+revoke execute on function merge_categories(uuid, uuid, uuid) from public, anon, authenticated;
+grant execute on function merge_categories(uuid, uuid, uuid) to service_role;
@@ -0,0 +1,70 @@
+-- Migration: Add global category popularity
+-- Description: Anonymized popularity of category names across all users, used to suggest
+-- categories to new users during onboarding. Names are grouped case-insensitively and
+-- only kept when at least min_users different users have them, so no name unique to a
+-- few users is ever exposed. Rebuilt daily (pg_cron when available, otherwise by the
+-- application when the snapshot is older than a day).
+
+create table category_popularity (
+  name varchar(30) primary key,
+  user_count integer not null
+);
+
+-- Time of the last rebuild, kept apart from the rows: a rebuild may keep no names
+create table category_popularity_refresh (
+  id boolean primary key default true,
+  refreshed_at timestamptz not null,
+  constraint single_row check (id)
+);
+
+-- Only the backend (service role) reads and writes popularity; no policies for other roles
+alter table category_popularity enable row level security;
+alter table category_popularity_refresh enable row level security;
+
+create or replace function refresh_category_popularity(
+  min_users integer default 5,
+  max_names integer default 100
+)
+returns void
+language plpgsql
+security definer
+set search_path = public, pg_catalog
+as $$
+begin
+  -- Workers noticing a stale table at the same time refresh it only once
+  if not pg_try_advisory_xact_lock(hashtext('refresh_category_popularity')) then
+    return;
+  end if;
+
+  delete from public.category_popularity;
+
+  insert into public.category_popularity (name, user_count)
+  select mode() within group (order by c.name), count(distinct c.user_id)
+  from public.categories c
+  where not c.is_default
+  group by lower(btrim(c.name))
+  having count(distinct c.user_id) >= min_users
+  order by count(distinct c.user_id) desc
+  limit max_names;
+
+  insert into public.category_popularity_refresh (id, refreshed_at)
+  values (true, now())
+  on conflict (id) do update set refreshed_at = excluded.refreshed_at;
+end;
+$$;
+
+-- Reads every user's categories, so only the backend (service role key) may call it
+revoke execute on function refresh_category_popularity(integer, integer) from public, anon, authenticated;
+grant execute on function refresh_category_popularity(integer, integer) to service_role;
+
+select refresh_category_popularity();
+
+do $$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule(
+      'refresh-category-popularity', '17 3 * * *', 'select public.refresh_category_popularity()'
+    );
+  end if;
+end;
+$$;
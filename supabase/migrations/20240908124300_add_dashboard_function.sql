@@ -0,0 +1,107 @@
+-- Migration: Add dashboard function
+-- Description: Returns everything the dashboard shows from the database in one call: the
+-- current week and month totals, the month's per-category breakdown and the most recent
+-- expenses. Replaces two get_summary aggregations and a list query per dashboard visit.
+-- Period boundaries are passed in by the application so they match GET /expenses/summary.
+-- Also adds ai_tips_latest, the user's last generated AI tips, written by whichever worker
+-- generated them, so the dashboard shows them without another LLM call.
+
+create table ai_tips_latest (
+  user_id uuid primary key references auth.users(id) on delete cascade,
+  tips jsonb not null,
+  generated_at timestamptz not null default now()
+);
+
+-- Only the backend (service role) reads and writes tips; no policies for other roles
+alter table ai_tips_latest enable row level security;
+
+create or replace function get_dashboard(
+  user_id_param uuid,
+  week_start_param timestamptz,
+  week_end_param timestamptz,
+  month_start_param timestamptz,
+  month_end_param timestamptz,
+  recent_limit_param integer default 5,
+  tips_since_param timestamptz default null,
+  tips_limit_param integer default 3
+)
+returns jsonb
+language sql
+stable
+security definer
+set search_path = public, pg_catalog
+as $$
+  -- One range scan of idx_expenses_user_date (user_id, date_of_expense desc) covers both periods
+  with period_expenses as (
+    select e.amount, e.category_id, e.date_of_expense
+    from public.expenses e
+    where e.user_id = user_id_param
+      and e.date_of_expense >= least(week_start_param, month_start_param)
+      and e.date_of_expense < greatest(week_end_param, month_end_param)
+  )
+  select jsonb_build_object(
+    'weekly', (
+      select jsonb_build_object('total_amount', coalesce(sum(p.amount), 0), 'transaction_count', count(*))
+      from period_expenses p
+      where p.date_of_expense >= week_start_param and p.date_of_expense < week_end_param
+    ),
+    'monthly', (
+      select jsonb_build_object('total_amount', coalesce(sum(p.amount), 0), 'transaction_count', count(*))
+      from period_expenses p
+      where p.date_of_expense >= month_start_param and p.date_of_expense < month_end_param
+    ),
+    'categories', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'category_id', s.category_id,
+          'name', c.name,
+          'total_amount', s.total_amount,
+          'transaction_count', s.transaction_count
+        ) order by s.total_amount desc, c.name
+      )
+      from (
+        select p.category_id, sum(p.amount) as total_amount, count(*) as transaction_count
+        from period_expenses p
+        where p.date_of_expense >= month_start_param and p.date_of_expense < month_end_param
+        group by p.category_id
+      ) s
+      join public.categories c on c.id = s.category_id
+    ), '[]'::jsonb),
+    'recent_expenses', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'id', r.id,
+          'amount', r.amount,
+          'description', r.description,
+          'category_id', r.category_id,
+          'date_of_expense', r.date_of_expense,
+          'created_at', r.created_at
+        ) order by r.date_of_expense desc
+      )
+      from (
+        select e.id, e.amount, e.description, e.category_id, e.date_of_expense, e.created_at
+        from public.expenses e
+        where e.user_id = user_id_param
+        order by e.date_of_expense desc
+        limit recent_limit_param
+      ) r
+    ), '[]'::jsonb),
+    -- Tips generated before tips_since_param are too old to show
+    'tips', coalesce((
+      select jsonb_agg(t.tip order by t.ord)
+      from public.ai_tips_latest l
+      cross join lateral jsonb_array_elements(l.tips) with ordinality as t(tip, ord)
+      where l.user_id = user_id_param
+        and l.generated_at >= coalesce(tips_since_param, '-infinity'::timestamptz)
+        and t.ord <= tips_limit_param
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- Takes any user id, so only the backend (service role key) may call it
+revoke execute on function
+  get_dashboard(uuid, timestamptz, timestamptz, timestamptz, timestamptz, integer, timestamptz, integer)
+  from public, anon, authenticated;
+grant execute on function
+  get_dashboard(uuid, timestamptz, timestamptz, timestamptz, timestamptz, integer, timestamptz, integer)
+  to service_role;
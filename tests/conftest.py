@@ -0,0 +1,31 @@
+import uuid
+
+import jwt
+import pytest
+
+JWT_SECRET = "test-secret"
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """API app against a Supabase URL that is never contacted (services are faked per test)."""
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost:54321")
+    monkeypatch.setenv("SUPABASE_KEY", "test.key.x")
+    monkeypatch.setenv("JWT_SECRET", JWT_SECRET)
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    """Build (Authorization headers, user id) for the given or a new random user."""
+    def make(user_id=None):
+        user_id = str(user_id or uuid.uuid4())
+        token = jwt.encode({"user_id": user_id}, JWT_SECRET, algorithm="HS256")
+        return {"Authorization": f"Bearer {token}"}, user_id
+    return make
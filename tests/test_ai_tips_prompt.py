@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from app.services.ai_tips_prompt import (
+    NEW_USER_PROMPT, TIPS_INSTRUCTIONS, build_tips_prompt, estimate_tokens
+)
+
+NOW = datetime(2024, 9, 15, 12, 0)
+
+
+def _expense(amount, description, category, day):
+    return {
+        'amount': amount,
+        'description': description,
+        'date_of_expense': f"2024-09-{day:02d}T10:00:00Z",
+        'category': {'name': category},
+    }
+
+
+EXPENSES = [
+    _expense(20, 'Biedronka', 'Jedzenie', 14),
+    _expense(30, ' biedronka ', 'Jedzenie', 12),
+    _expense(25, 'Lidl', 'Jedzenie', 10),
+    _expense(150, 'Restauracja', 'Jedzenie', 9),
+    _expense(40, 'Biedronka', 'Jedzenie', 5),
+    _expense(12, 'Bilet', 'Transport', 13),
+    _expense(12, 'Bilet', 'Transport', 3),
+]
+
+
+def test_prompt_summarizes_weeks_categories_merchants_and_outliers():
+    prompt = build_tips_prompt(EXPENSES, now=NOW)
+
+    assert prompt.endswith("\n\n" + TIPS_INSTRUCTIONS)
+    assert prompt.rsplit("\n\n", 1)[0].splitlines() == [
+        "This week: 237.00 (5 tx); previous week: 52.00 (2 tx); change: +356%",
+        "Categories (14d total, count, this wk, prev wk, change):",
+        "- Jedzenie: 265.00, 5, 225.00, 40.00, +462%",
+        "- Transport: 24.00, 2, 12.00, 12.00, +0%",
+        "Top merchants (count, total):",
+        "- biedronka: 3, 90.00",
+        "- bilet: 2, 24.00",
+        "- restauracja: 1, 150.00",
+        "- lidl: 1, 25.00",
+        "Unusual expenses:",
+        "- 2024-09-09 Jedzenie \"Restauracja\": 150.00 (5.0x category median)",
+    ]
+
+
+def test_window_aggregates_override_truncated_slice():
+    prompt = build_tips_prompt(EXPENSES, now=NOW, category_summary=[
+        {'name': 'Transport', 'sum_amount': 300, 'count': 20},
+    ])
+
+    categories = [line for line in prompt.splitlines() if line.startswith("- ") and ", +" in line]
+    # Ordered by window total, Transport now first
+    assert categories[0] == "- Transport: 300.00, 20, 12.00, 12.00, +0%"
+
+
+def test_over_budget_prompt_drops_outliers_then_merchants_then_small_categories():
+    full = build_tips_prompt(EXPENSES, now=NOW)
+
+    without_outliers = build_tips_prompt(EXPENSES, now=NOW, token_budget=estimate_tokens(full) - 1)
+    assert "Unusual expenses:" not in without_outliers
+    assert "- biedronka: 3, 90.00" in without_outliers
+    assert estimate_tokens(without_outliers) <= estimate_tokens(full) - 1
+
+    base = estimate_tokens(TIPS_INSTRUCTIONS)
+    without_merchants = build_tips_prompt(EXPENSES, now=NOW, token_budget=base + 60)
+    assert "Top merchants" not in without_merchants
+    assert "- Transport: 24.00" in without_merchants
+
+    largest_category_only = build_tips_prompt(EXPENSES, now=NOW, token_budget=base + 50)
+    assert largest_category_only.rsplit("\n\n", 1)[0].splitlines() == [
+        "This week: 237.00 (5 tx); previous week: 52.00 (2 tx); change: +356%",
+        "Categories (14d total, count, this wk, prev wk, change):",
+        "- Jedzenie: 265.00, 5, 225.00, 40.00, +462%",
+    ]
+
+    # Nothing left to drop: the data is truncated, the reply-format instructions are kept
+    truncated = build_tips_prompt(EXPENSES, now=NOW, token_budget=base + 10)
+    assert truncated.endswith("\n\n" + TIPS_INSTRUCTIONS)
+    assert estimate_tokens(truncated) <= base + 10
+    assert full.startswith(truncated.rsplit("\n\n", 1)[0])
+    assert build_tips_prompt(EXPENSES, now=NOW, token_budget=10) == "\n\n" + TIPS_INSTRUCTIONS
+
+def test_user_without_expenses_gets_new_user_prompt():
+    assert build_tips_prompt([], now=NOW) == NEW_USER_PROMPT
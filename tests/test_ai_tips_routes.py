@@ -0,0 +1,18 @@
+from app.services import llm_usage
+
+
+def test_stream_without_database_configuration_is_a_json_error(app, auth_headers, monkeypatch):
+    # Unhandled errors would raise here instead of reaching the app's generic 500 handler
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+
+    def unavailable():
+        raise EnvironmentError("SUPABASE_URL and SUPABASE_KEY environment variables must be set")
+
+    monkeypatch.setattr(llm_usage, "get_supabase_client", unavailable)
+    monkeypatch.setattr("app.routes.ai_tips.log_error", lambda **kwargs: None)
+    headers, _ = auth_headers()
+
+    response = app.test_client().get("/ai/tips/stream", headers=headers)
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Internal server error"}
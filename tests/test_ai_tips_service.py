@@ -0,0 +1,83 @@
+import uuid
+
+from app.schemas import AiTip
+from app.services import ai_tips_service
+from app.services.ai_tips_service import FALLBACK_TIP_MESSAGE, AiTipsService, get_cached_tips
+
+
+class _FakeTable:
+    """Supabase table recording upserts."""
+
+    def __init__(self, name, upserts):
+        self.name = name
+        self.upserts = upserts
+
+    def upsert(self, row):
+        self.upserts.append((self.name, row))
+        return self
+
+    def execute(self):
+        return None
+
+
+class _FakeClient:
+    def __init__(self):
+        self.upserts = []
+
+    def table(self, name):
+        return _FakeTable(name, self.upserts)
+
+
+def _service(content):
+    """Tips service whose AI call answers with *content*."""
+    service = AiTipsService.__new__(AiTipsService)
+    service._build_prompt = lambda user_id: "prompt"
+    service._call_ai_service_with_retry = lambda user_id, prompt: {"choices": [{"message": {"content": content}}]}
+    return service
+
+
+def test_only_parsed_model_output_is_cached(monkeypatch):
+    monkeypatch.setattr(ai_tips_service, "log_error", lambda **kwargs: None)
+    monkeypatch.setattr(ai_tips_service, "get_supabase_client", _FakeClient)
+    user_id = uuid.uuid4()
+
+    tips = _service('[{"message": "Cook at home twice a week."}]')._generate_tips(user_id, 3)
+    assert [tip.message for tip in tips] == ["Cook at home twice a week."]
+
+    # A malformed answer serves the last good tips and does not replace them
+    assert _service("Sorry, I can't help with that.")._generate_tips(user_id, 3)[0].message \
+        == "Sorry, I can't help with that."
+    assert _service("[]")._generate_tips(user_id, 3) == tips
+    assert get_cached_tips(user_id) == tips
+
+    other_user = uuid.uuid4()
+    assert [tip.message for tip in _service("{}")._generate_tips(other_user, 3)] == [FALLBACK_TIP_MESSAGE]
+    assert get_cached_tips(other_user) == []
+
+
+def test_cached_tips_are_stored_for_every_worker(monkeypatch):
+    client = _FakeClient()
+    monkeypatch.setattr(ai_tips_service, "get_supabase_client", lambda: client)
+    user_id = uuid.uuid4()
+
+    AiTipsService.__new__(AiTipsService)._cache_tips(user_id, [AiTip(message="Gotuj w domu")])
+
+    [(table, row)] = client.upserts
+    assert table == "ai_tips_latest"
+    assert row["user_id"] == str(user_id)
+    assert row["tips"] == [{"message": "Gotuj w domu"}]
+    assert "generated_at" in row
+
+
+def test_failed_tips_save_keeps_the_tips(monkeypatch):
+    def broken_client():
+        raise ConnectionError("database down")
+
+    monkeypatch.setattr(ai_tips_service, "get_supabase_client", broken_client)
+    monkeypatch.setattr(ai_tips_service, "log_error", lambda **kwargs: None)
+    user_id = uuid.uuid4()
+
+    tips = _service('[{"message": "Cook at home twice a week."}]')._generate_tips(user_id, 3)
+
+    assert [tip.message for tip in tips] == ["Cook at home twice a week."]
+    assert get_cached_tips(user_id) == tips
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+from flask import jsonify, request
+
+
+@pytest.fixture
+def app(app):
+    """The API app plus routes recording who called them and in which order."""
+    calls = []
+    lock = threading.Lock()
+
+    def whoami():
+        return jsonify({"user_id": request.user_id})
+
+    def record(name):
+        if request.method == 'POST':
+            # Slow writes would finish out of order if they ran in parallel
+            time.sleep(0.05 if name == "first" else 0)
+        with lock:
+            calls.append((request.method, name))
+            return jsonify({"seen": [n for _, n in calls]})
+
+    app.add_url_rule('/test/whoami', view_func=whoami)
+    app.add_url_rule('/test/record/<name>', view_func=record, methods=['GET', 'POST'])
+    app.config['RECORDED_CALLS'] = calls
+    return app
+
+
+def test_sub_requests_run_as_the_caller(client, auth_headers):
+    headers, user_id = auth_headers()
+    response = client.post("/batch", json={"requests": [{"path": "/test/whoami"}] * 3}, headers=headers)
+
+    assert response.status_code == 200
+    assert [r["body"] for r in response.get_json()["responses"]] == [{"user_id": user_id}] * 3
+
+
+def test_clients_cannot_claim_a_batch_identity(client):
+    for name in ("Smartwydatki-Batch-User-Id", "smartwydatki.batch_user_id"):
+        response = client.get("/test/whoami", headers={name: "someone-else"})
+        assert response.status_code == 401
+    assert client.post("/batch", json={"requests": [{"path": "/test/whoami"}]}).status_code == 401
+
+
+def test_batches_with_writes_run_in_order(app, client, auth_headers):
+    headers, _ = auth_headers()
+    response = client.post("/batch", json={"requests": [
+        {"method": "POST", "path": "/test/record/first"},
+        {"method": "GET", "path": "/test/record/read"},
+        {"method": "POST", "path": "/test/record/second"},
+    ]}, headers=headers)
+
+    assert response.status_code == 200
+    assert app.config['RECORDED_CALLS'] == [("POST", "first"), ("GET", "read"), ("POST", "second")]
+    assert response.get_json()["responses"][1]["body"] == {"seen": ["first", "read"]}
+
+
+def test_query_strings_belong_in_query(client, auth_headers):
+    headers, _ = auth_headers()
+    response = client.post("/batch", json={"requests": [{"path": "/test/whoami?user_id=x"}]}, headers=headers)
+    assert response.status_code == 400
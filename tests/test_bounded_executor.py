@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from app.bounded_executor import BoundedExecutor, DeadlineExceeded, ExecutorSaturated
+
+
+def test_deadline_bounds_latency_and_queued_task_is_dropped():
+    """The caller returns at its deadline; a task that never started is not run."""
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    ran = []
+
+    blocker = threading.Thread(target=lambda: executor.run(release.wait, 2, timeout=5))
+    blocker.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        executor.run(ran.append, "late", timeout=0.1)
+    assert time.monotonic() - start < 0.3
+
+    release.set()
+    blocker.join()
+    assert ran == []
+    metrics = executor.metrics()
+    assert metrics["timed_out"] == 1 and metrics["completed"] == 1
+    assert metrics["queued"] == 0 and metrics["running"] == 0
+    executor.shutdown()
+
+
+def test_full_queue_rejects_immediately():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+    release = threading.Event()
+    blocker = threading.Thread(target=lambda: executor.run(release.wait, 2, timeout=5))
+    blocker.start()
+    time.sleep(0.05)
+
+    with pytest.raises(ExecutorSaturated):
+        executor.run(lambda: None, timeout=1)
+
+    release.set()
+    blocker.join()
+    assert executor.run(lambda x: x * 2, 21, timeout=1) == 42
+    assert executor.metrics()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_run_many_runs_in_parallel_and_reports_each_outcome():
+    executor = BoundedExecutor("test", max_workers=3, max_queue=0)
+    barrier = threading.Barrier(2, timeout=1)
+
+    def meet():
+        barrier.wait()  # only passes if both calls run at once
+        time.sleep(0.1)  # still pending when the last call is submitted
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    start = time.monotonic()
+    outcomes = executor.run_many([meet, meet, fail, lambda: "rejected"], timeout=1)
+    assert time.monotonic() - start < 0.5
+    assert [error is None for _, error in outcomes[:2]] == [True, True]
+    assert isinstance(outcomes[2][1], ValueError)
+    assert isinstance(outcomes[3][1], ExecutorSaturated)
+    executor.shutdown()
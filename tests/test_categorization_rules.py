@@ -0,0 +1,178 @@
+import random
+import re
+import uuid
+from decimal import Decimal
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.schemas import CategorizationRuleCreate, ExpenseCreate
+from app.services import expenses
+from app.services.categorization_rules import (
+    MAX_REGEX_INPUT_LENGTH, CategorizationRuleService, RuleMatcher, check_regex
+)
+from app.services.category_classifier import normalize_description
+
+
+def _rule(category, kind, pattern=None, amount_min=None, amount_max=None):
+    return {'category_id': category, 'kind': kind, 'pattern': pattern,
+            'amount_min': amount_min, 'amount_max': amount_max}
+
+
+def test_first_matching_rule_wins():
+    matcher = RuleMatcher([
+        _rule("rent", "amount", amount_min=2000),
+        _rule("food", "keyword", "Uber Eats"),
+        _rule("taxi", "keyword", "uber"),
+        _rule("fuel", "prefix", "orl"),
+        _rule("subscriptions", "regex", r"netflix|spotify"),
+        _rule("small", "keyword", "uber", amount_max=5),
+    ])
+    assert matcher.match("UBER EATS order", 30) == "food"
+    assert matcher.match("Uber ride", 20) == "taxi"
+    assert matcher.match("uber", 3000) == "rent"
+    assert matcher.match("Orlen #12", 100) == "fuel"
+    assert matcher.match("my orlen", 100) is None  # prefix only at the start
+    assert matcher.match("ubering", 20) is None  # keywords match whole words
+    assert matcher.match("NETFLIX.COM", 40) == "subscriptions"
+    assert matcher.match(None, None) is None
+    assert RuleMatcher([]).match("uber", 1) is None
+
+
+def test_automaton_matches_brute_force():
+    """Overlapping and nested keywords are all found, whatever their order."""
+    rng = random.Random(3)
+    words = ["a", "ab", "abc", "b", "bc", "ca", "cab", "bca"]
+    rules = [_rule(f"c{i}", rng.choice(["keyword", "prefix"]), " ".join(rng.sample(words, rng.randint(1, 2))),
+                   amount_max=rng.choice([None, 50])) for i in range(40)]
+    matcher = RuleMatcher(rules)
+
+    def brute_force(description, amount):
+        text = normalize_description(description)
+        for rule in rules:
+            pattern = normalize_description(rule['pattern'])
+            if rule['amount_max'] is not None and amount > rule['amount_max']:
+                continue
+            if rule['kind'] == 'prefix' and text.startswith(pattern):
+                return rule['category_id']
+            if rule['kind'] == 'keyword' and re.search(rf"(^| ){re.escape(pattern)}( |$)", text):
+                return rule['category_id']
+        return None
+
+    for _ in range(500):
+        description = " ".join(rng.choice(words) for _ in range(rng.randint(1, 5)))
+        amount = rng.choice([10, 100])
+        assert matcher.match(description, amount) == brute_force(description, amount), description
+
+
+@pytest.mark.parametrize("pattern", [
+    r"(a+)+$", r"(\w+\s?)*x", r"(foo|foobar)+", r"(.)\1", r"(?P<x>a)(?(x)b)", r".*.*.*.*x", "a" * 51,
+])
+def test_regexes_that_can_backtrack_catastrophically_are_rejected(pattern):
+    with pytest.raises(ValueError):
+        check_regex(pattern)
+
+
+def test_simple_regexes_are_accepted_and_search_a_bounded_input():
+    for pattern in (r"netflix|spotify", r"rata \d+/\d+", r"^(?:zabka|biedronka)\b", r"[a-z]+\d{2,4}"):
+        check_regex(pattern)
+
+    matcher = RuleMatcher([_rule("late", "regex", r"x$"), _rule("unsafe", "regex", r"(a+)+$")])
+    assert matcher.match("a" * MAX_REGEX_INPUT_LENGTH + "x", 1) is None
+    assert matcher.match("a" * 30 + "!", 1) is None  # the stored unsafe rule is skipped
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client, table):
+        self.client, self.table, self.row = client, table, None
+
+    def select(self, _columns):
+        return self
+
+    def eq(self, _column, _value):
+        return self
+
+    def insert(self, row):
+        self.row = row
+        return self
+
+    def execute(self):
+        if self.table == 'categories':
+            return _Response([{'id': self.client.default_id}])
+        if self.row['category_id'] not in self.client.category_ids:
+            raise APIError({'code': '23503', 'message': 'insert or update on table "expenses" violates foreign key'})
+        self.client.inserted.append(self.row)
+        return _Response([{**self.row, 'id': str(uuid.uuid4()), 'created_at': self.row['date_of_expense']}])
+
+
+class _FakeClient:
+    def __init__(self, default_id):
+        self.default_id = default_id
+        self.category_ids = {default_id}
+        self.inserted = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def test_expense_matching_a_deleted_category_gets_the_default_one(monkeypatch):
+    """A rule cached before its category was deleted (e.g. in another worker) must not fail the create."""
+    default_id, deleted_id = str(uuid.uuid4()), str(uuid.uuid4())
+    service = expenses.ExpenseService.__new__(expenses.ExpenseService)
+    service.supabase = _FakeClient(default_id)
+    invalidated = []
+    monkeypatch.setattr(expenses, "get_rule_matcher", lambda user_id: RuleMatcher([_rule(deleted_id, "keyword", "uber")]))
+    monkeypatch.setattr(expenses, "invalidate_rule_cache", invalidated.append)
+    for name in ("log_info", "invalidate_suggestion_cache"):
+        monkeypatch.setattr(expenses, name, lambda *args, **kwargs: None)
+    for name in ("get_classifier_store", "get_description_index_store"):
+        monkeypatch.setattr(expenses, name, lambda: type("Store", (), {"observe": lambda self, *args: None})())
+    user_id = uuid.uuid4()
+
+    expense = service.create_expense(user_id, ExpenseCreate(amount=Decimal("25.00"), description="Uber ride"))
+
+    assert str(expense.category_id) == default_id
+    assert [row['category_id'] for row in service.supabase.inserted] == [default_id]
+    assert invalidated == [user_id]
+
+
+class _LimitedRulesClient:
+    """Rules table whose insert trigger rejects the write, as when a concurrent create took the last slot."""
+
+    def __init__(self):
+        self.table_name = None
+        self.op = None
+
+    def table(self, name):
+        self.table_name, self.op = name, 'select'
+        return self
+
+    def select(self, _columns):
+        return self
+
+    def eq(self, _column, _value):
+        return self
+
+    def insert(self, _row):
+        self.op = 'insert'
+        return self
+
+    def execute(self):
+        if self.table_name == 'categories':
+            return _Response([{'id': 'category'}])
+        assert self.op == 'insert'  # the limits are not pre-checked with a racy count
+        raise APIError({'code': '22023', 'message': 'A user can have at most 20 regex rules'})
+
+
+def test_rule_limits_reported_by_the_database_are_validation_errors():
+    service = CategorizationRuleService.__new__(CategorizationRuleService)
+    service.supabase = _LimitedRulesClient()
+    rule = CategorizationRuleCreate(category_id=uuid.uuid4(), kind="regex", pattern="netflix")
+
+    with pytest.raises(ValueError, match="at most 20 regex rules"):
+        service.create_rule(uuid.uuid4(), rule)
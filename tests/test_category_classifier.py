@@ -0,0 +1,193 @@
+import uuid
+
+from postgrest.exceptions import APIError
+
+from app.services import category_classifier
+from app.services.category_classifier import CategoryClassifier, ClassifierStore
+
+
+def _trained() -> CategoryClassifier:
+    model = CategoryClassifier(ignored_categories=["default"])
+    for description, amount, category in [
+        ("biedronka", 45.0, "groceries"),
+        ("lidl zakupy", 120.0, "groceries"),
+        ("biedronka warszawa", 60.0, "groceries"),
+        ("uber", 25.0, "transport"),
+        ("bolt ride", 18.0, "transport"),
+        ("anything", 10.0, "default"),
+    ]:
+        model.learn(description, amount, category)
+    return model
+
+
+def test_predict_uses_description_ngrams():
+    """Typos and suffixes still match the trained merchant's category."""
+    model = _trained()
+    ranked = model.predict("Biedronce", 50.0)
+    assert ranked[0][0] == "groceries"
+    assert abs(sum(p for _, p in ranked) - 1.0) < 1e-9
+    assert model.predict("ubr", 20.0, categories=["transport", "groceries"])[0][0] == "transport"
+    # The default category carries no signal and is never learned
+    assert model.sample_count == 5
+    assert "default" not in dict(model.predict("anything", 10.0))
+
+
+def test_unlearn_and_round_trip():
+    model = _trained()
+    model.unlearn("uber", 25.0, "transport")
+    model.unlearn("bolt ride", 18.0, "transport")
+    assert [c for c, _ in model.predict("uber", 25.0)] == ["groceries"]
+    assert model.vocabulary == CategoryClassifier.from_bytes(model.to_bytes()).vocabulary
+
+    restored = CategoryClassifier.from_bytes(_trained().to_bytes())
+    assert restored.predict("lidl", 80.0) == _trained().predict("lidl", 80.0)
+    assert restored.ignored == {"default"}
+
+
+def test_predict_many_matches_single_predictions():
+    model = _trained()
+    items = [("biedronka", 50.0), ("uber", 20.0), ("Biedronka!", 50.0), ("", None)]
+    assert model.predict_many(items, ["groceries", "transport"]) == [
+        model.predict(d, a, ["groceries", "transport"]) for d, a in items
+    ]
+    assert model.predict_many(items, ["unknown"]) == [[], [], [], []]
+
+
+def test_merge_category_equals_retraining_with_relabelled_expenses():
+    model = _trained()
+    model.merge_category("transport", "groceries")
+
+    relabelled = CategoryClassifier(ignored_categories=["default"])
+    for description, amount in [("biedronka", 45.0), ("lidl zakupy", 120.0), ("biedronka warszawa", 60.0),
+                                ("uber", 25.0), ("bolt ride", 18.0)]:
+        relabelled.learn(description, amount, "groceries")
+    assert model.to_bytes() == relabelled.to_bytes()
+    assert model.predict("uber", 25.0)[0][0] == "groceries"
+
+    # Merging into an ignored category forgets the expenses
+    model.merge_category("groceries", "default")
+    assert model.sample_count == 0
+    assert model.vocabulary == {}
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client, table):
+        self.client, self.table = client, table
+        self.op, self.values, self.filters = 'select', None, []
+
+    def select(self, _columns):
+        return self
+
+    def insert(self, values):
+        self.op, self.values = 'insert', values
+        return self
+
+    def update(self, values):
+        self.op, self.values = 'update', values
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def order(self, *_args, **_kwargs):
+        return self
+
+    def limit(self, _count):
+        return self
+
+    def execute(self):
+        self.client.statements.append((self.table, self.op))
+        rows = self.client.tables[self.table]
+        matches = [r for r in rows if all(r.get(c) == v for c, v in self.filters)]
+        if self.op == 'insert':
+            if any(r['user_id'] == self.values['user_id'] for r in rows):
+                raise APIError({'code': '23505', 'message': 'duplicate key'})
+            rows.append(dict(self.values))
+            return _Response([dict(self.values)])
+        if self.op == 'update':
+            for row in matches:
+                row.update(self.values)
+        if self.op == 'delete':
+            self.client.tables[self.table] = [r for r in rows if r not in matches]
+        return _Response([dict(r) for r in matches])
+
+
+class _FakeClient:
+    """Expenses, categories and category_classifiers tables of one user."""
+
+    def __init__(self, user_id, expenses):
+        self.tables = {
+            'categories': [{'id': 'default', 'user_id': user_id, 'is_default': True}],
+            'expenses': [
+                {'user_id': user_id, 'description': d, 'amount': a, 'category_id': c} for d, a, c in expenses
+            ],
+            'category_classifiers': [],
+        }
+        self.statements = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def stored(self):
+        row = self.tables['category_classifiers'][0]
+        return CategoryClassifier.from_bytes(row['model']), row['version']
+
+
+def _store(monkeypatch, expenses):
+    user_id = str(uuid.uuid4())
+    client = _FakeClient(user_id, expenses)
+    monkeypatch.setattr(category_classifier, 'get_supabase_client', lambda: client)
+    monkeypatch.setattr(category_classifier.threading.Thread, 'start', lambda self: None)
+    monkeypatch.setattr(category_classifier.atexit, 'register', lambda fn: None)
+    return ClassifierStore(), user_id, client
+
+
+def test_observe_is_queued_and_first_flush_trains_without_double_counting(monkeypatch):
+    store, user_id, client = _store(monkeypatch, [("uber", 25.0, "transport")])
+
+    # The expense is already written when it is observed
+    store.observe(user_id, "uber", 25.0, "transport")
+    assert client.statements == []
+
+    store.flush()
+    model, version = client.stored()
+    assert model.sample_count == 1 and version == 1
+
+
+def test_concurrent_workers_keep_each_others_updates(monkeypatch):
+    store, user_id, client = _store(monkeypatch, [("uber", 25.0, "transport")])
+    store.get(user_id)
+    other_worker = ClassifierStore()
+
+    store.observe(user_id, "biedronka", 45.0, "groceries")
+    other_worker.observe(user_id, "bolt", 18.0, "transport")
+    # This worker read version 1, then the other worker wrote version 2
+    real_load = store._load
+    loads = []
+
+    def load_then_lose_race(uid):
+        stored = real_load(uid)
+        if not loads:
+            other_worker.flush()
+        loads.append(stored[1])
+        return stored
+
+    monkeypatch.setattr(store, '_load', load_then_lose_race)
+    store.flush()
+
+    model, version = client.stored()
+    assert loads == [1, 2] and version == 3
+    assert model.doc_counts == {"transport": 2, "groceries": 1}
+    # Predictions in this worker saw its own update before the flush
+    assert store.get(user_id).doc_counts["groceries"] == 1
+
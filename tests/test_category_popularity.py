@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.category_popularity import CategoryPopularity
+
+
+class _Snapshot(CategoryPopularity):
+    """Popularity snapshot over fixed rows, counting table reads and rebuilds."""
+
+    def __init__(self, rows, refreshed_at):
+        super().__init__(reload_seconds=3600)
+        self.rows = rows
+        self.refreshed_at = refreshed_at
+        self.fetches = 0
+        self.refreshes = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def _fetch(self):
+        self.release.wait(5)
+        self.fetches += 1
+        return self.rows
+
+    def _fetch_refreshed_at(self):
+        return self.refreshed_at
+
+    def _refresh(self):
+        self.refreshes += 1
+        self.refreshed_at = datetime.now(timezone.utc).isoformat()
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_top_is_served_from_the_snapshot():
+    snapshot = _Snapshot([
+        {'name': 'Jedzenie', 'user_count': 120},
+        {'name': 'Transport', 'user_count': 90},
+        {'name': 'Uncategorized', 'user_count': 80},
+        {'name': 'Zdrowie', 'user_count': 40},
+    ], refreshed_at=datetime.now(timezone.utc).isoformat())
+    snapshot.release.clear()
+
+    # The first call only starts the background load
+    assert snapshot.top(2) == []
+    snapshot.release.set()
+    _wait_for(lambda: snapshot.top(1))
+
+    first = snapshot.top(2, exclude=("uncategorized ",))
+    assert [s.name for s in first] == ["Jedzenie", "Transport"]
+    assert [s.name for s in snapshot.top(5, exclude=("Uncategorized",))] == ["Jedzenie", "Transport", "Zdrowie"]
+    assert snapshot.fetches == 1
+    assert snapshot.refreshes == 0
+    # Suggestion ids are stable per name
+    other = _Snapshot(snapshot.rows, snapshot.refreshed_at)
+    other._reload()
+    assert other.top(1)[0].id == first[0].id
+
+
+def test_staleness_comes_from_the_last_rebuild_not_the_rows():
+    # A recent rebuild that kept no names is not rebuilt again
+    empty = _Snapshot([], refreshed_at=datetime.now(timezone.utc).isoformat())
+    empty._reload()
+    empty._reload()
+    assert empty.refreshes == 0
+
+    never_built = _Snapshot([], refreshed_at=None)
+    never_built._reload()
+    assert never_built.refreshes == 1
+
+    old = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+    stale = _Snapshot([{'name': 'Jedzenie', 'user_count': 120}], refreshed_at=old)
+    stale._reload()
+    stale._reload()
+    assert stale.refreshes == 1
@@ -0,0 +1,224 @@
+import threading
+import uuid
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services.categories import CategoryNameConflict, CategoryService
+
+
+class _FakeCategoriesTable:
+    """In-memory `categories` table enforcing unique (user_id, name) atomically, like Postgres."""
+
+    def __init__(self):
+        self.rows = []
+        self.lock = threading.Lock()
+        self.statements = 0
+
+
+class _Query:
+    def __init__(self, table: _FakeCategoriesTable):
+        self.table = table
+        self.op = None
+        self.values = None
+        self.filters = []
+        self.in_filters = []
+
+    def select(self, _columns):
+        self.op = 'select'
+        return self
+
+    def insert(self, values):
+        self.op, self.values = 'insert', values
+        return self
+
+    def update(self, values):
+        self.op, self.values = 'update', values
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def in_(self, column, values):
+        self.in_filters.append((column, values))
+        return self
+
+    def execute(self):
+        table = self.table
+        with table.lock:
+            table.statements += 1
+            matches = [
+                r for r in table.rows
+                if all(r[c] == v for c, v in self.filters) and all(r[c] in vs for c, vs in self.in_filters)
+            ]
+            if self.op == 'select':
+                return _Response([dict(r) for r in matches])
+            if self.op == 'insert':
+                row = {'id': str(uuid.uuid4()), **self.values}
+                self._check_unique(row)
+                table.rows.append(row)
+                return _Response([dict(row)])
+            for row in matches:
+                self._check_unique({**row, **self.values}, exclude=row)
+                row.update(self.values)
+            return _Response([dict(r) for r in matches])
+
+    def _check_unique(self, row, exclude=None):
+        for other in self.table.rows:
+            if other is not exclude and (other['user_id'], other['name']) == (row['user_id'], row['name']):
+                raise APIError({
+                    'code': '23505',
+                    'message': 'duplicate key value violates unique constraint "unique_name_per_user"',
+                })
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _BulkCreateCall:
+    """`create_categories_bulk` RPC: one statement over the snapshot taken when it starts."""
+
+    def __init__(self, client, params):
+        self.client = client
+        self.params = params
+
+    def execute(self):
+        table = self.client.categories
+        user_id = self.params['user_id_param']
+        with table.lock:
+            table.statements += 1
+            result = []
+            for name in dict.fromkeys(self.params['names_param']):
+                existing = next((r for r in table.rows if (r['user_id'], r['name']) == (user_id, name)), None)
+                if name in self.client.inserted_concurrently:
+                    # Committed by another request after this statement's snapshot:
+                    # the insert skips it and the final read cannot see it
+                    table.rows.append({'id': str(uuid.uuid4()), 'user_id': user_id, 'name': name, 'is_default': False})
+                    result.append({'id': None, 'name': name, 'is_default': None, 'created': False})
+                elif existing is not None:
+                    result.append({**existing, 'created': False})
+                else:
+                    row = {'id': str(uuid.uuid4()), 'user_id': user_id, 'name': name, 'is_default': False}
+                    table.rows.append(row)
+                    result.append({**row, 'created': True})
+            return _Response(result)
+
+
+class _FakeClient:
+    def __init__(self):
+        self.categories = _FakeCategoriesTable()
+        self.inserted_concurrently = set()
+
+    def table(self, name):
+        assert name == 'categories'
+        return _Query(self.categories)
+
+    def rpc(self, name, params):
+        assert name == 'create_categories_bulk'
+        return _BulkCreateCall(self, params)
+
+
+@pytest.fixture
+def service():
+    svc = CategoryService.__new__(CategoryService)
+    svc.supabase = _FakeClient()
+    return svc
+
+
+def test_parallel_creates_of_one_name_yield_one_category(service):
+    """Without a pre-check there is no check-then-write window: exactly one create wins."""
+    user_id = uuid.uuid4()
+    workers = 16
+    barrier = threading.Barrier(workers)
+    created, conflicts = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            created.append(service.create_category(user_id, "Groceries"))
+        except CategoryNameConflict:
+            conflicts.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(created) == 1
+    assert len(conflicts) == workers - 1
+    assert [r['name'] for r in service.supabase.categories.rows] == ["Groceries"]
+
+
+def test_create_is_a_single_statement(service):
+    service.create_category(uuid.uuid4(), "Travel")
+    assert service.supabase.categories.statements == 1
+
+
+def test_rename_to_existing_name_conflicts(service):
+    user_id = uuid.uuid4()
+    service.create_category(user_id, "Travel")
+    other = service.create_category(user_id, "Trips")
+    with pytest.raises(CategoryNameConflict):
+        service.update_category(user_id, other.id, "Travel")
+    # Other users' names do not conflict
+    assert service.create_category(uuid.uuid4(), "Travel").name == "Travel"
+
+
+def test_update_distinguishes_missing_and_default_category(service):
+    user_id = uuid.uuid4()
+    table = service.supabase.categories
+    table.rows.append({'id': str(uuid.uuid4()), 'user_id': str(user_id), 'name': 'Other', 'is_default': True})
+
+    assert service.update_category(user_id, uuid.uuid4(), "Renamed") is None
+    with pytest.raises(ValueError):
+        service.update_category(user_id, uuid.UUID(table.rows[0]['id']), "Renamed")
+
+    category = service.create_category(user_id, "Food")
+    table.statements = 0
+    assert service.update_category(user_id, category.id, "Meals").name == "Meals"
+    assert table.statements == 1
+
+
+def test_bulk_create_reports_existing_names_and_skips_repeats(service):
+    user_id = uuid.uuid4()
+    travel = service.create_category(user_id, "Travel")
+    table = service.supabase.categories
+    table.statements = 0
+
+    results = service.create_categories_bulk(user_id, ["Food", "Travel", "Food", "Rent"])
+
+    assert [(r.name, r.created) for r in results] == [("Food", True), ("Travel", False), ("Rent", True)]
+    assert results[1].id == travel.id
+    assert sorted(r['name'] for r in table.rows) == ["Food", "Rent", "Travel"]
+    assert table.statements == 1
+
+
+def test_bulk_create_reads_back_names_created_concurrently(service):
+    user_id = uuid.uuid4()
+    service.supabase.inserted_concurrently.add("Food")
+
+    results = service.create_categories_bulk(user_id, ["Food", "Rent"])
+
+    food = next(r for r in service.supabase.categories.rows if r['name'] == "Food")
+    assert [(r.name, r.created) for r in results] == [("Food", False), ("Rent", True)]
+    assert str(results[0].id) == food['id']
+
+
+def test_bulk_route_validates_and_creates(app, client, auth_headers, monkeypatch, service):
+    from app.routes import categories as categories_routes
+    monkeypatch.setattr(categories_routes, "category_service", service)
+    headers, user_id = auth_headers()
+
+    response = client.post("/categories/bulk", json={"names": ["Food", "Food", "Rent"]}, headers=headers)
+    assert response.status_code == 200
+    assert [(c["name"], c["created"]) for c in response.get_json()["categories"]] == [("Food", True), ("Rent", True)]
+    assert {r['user_id'] for r in service.supabase.categories.rows} == {user_id}
+
+    too_many = [f"Category {i}" for i in range(51)]
+    for body in ({"names": too_many}, {"names": ["x" * 31]}, {"names": []}):
+        assert client.post("/categories/bulk", json=body, headers=headers).status_code == 400
+    assert len(service.supabase.categories.rows) == 2
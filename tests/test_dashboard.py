@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.services.dashboard import DashboardService
+from app.services.expenses import get_period_bounds
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeClient:
+    """Supabase client answering the `get_dashboard` RPC, recording the calls."""
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return self
+
+    def execute(self):
+        return _Response(self.data)
+
+
+def test_dashboard_is_one_rpc_with_summary_period_bounds():
+    user_id = uuid.uuid4()
+    category_id = str(uuid.uuid4())
+    client = _FakeClient({
+        'weekly': {'total_amount': 12.5, 'transaction_count': 2},
+        'monthly': {'total_amount': 40, 'transaction_count': 5},
+        'categories': [
+            {'category_id': category_id, 'name': 'Jedzenie', 'total_amount': 40, 'transaction_count': 5},
+        ],
+        'recent_expenses': [{
+            'id': str(uuid.uuid4()), 'amount': 2.5, 'description': 'Kawa', 'category_id': category_id,
+            'date_of_expense': '2024-09-08T10:00:00+00:00', 'created_at': '2024-09-08T10:00:00+00:00',
+        }],
+        'tips': [{'message': 'Gotuj w domu'}],
+    })
+    svc = DashboardService.__new__(DashboardService)
+    svc.supabase = client
+
+    dashboard = svc.get_dashboard(user_id)
+
+    assert [name for name, _ in client.calls] == ['get_dashboard']
+    params = client.calls[0][1]
+    assert (params['week_start_param'], params['week_end_param']) == get_period_bounds('weekly')
+    assert (params['month_start_param'], params['month_end_param']) == get_period_bounds('monthly')
+    # Tips stored by any worker in the last 24 hours
+    tips_age = datetime.now(timezone.utc) - datetime.fromisoformat(params['tips_since_param'])
+    assert timedelta(hours=23, minutes=59) < tips_age <= timedelta(hours=24, minutes=1)
+    assert params['tips_limit_param'] == 3
+    assert dashboard.weekly.total_amount == Decimal('12.5')
+    assert dashboard.categories[0].name == 'Jedzenie'
+    assert dashboard.recent_expenses[0].description == 'Kawa'
+    assert [tip.message for tip in dashboard.tips] == ["Gotuj w domu"]
+
+
+def test_monthly_period_ends_at_next_month_midnight():
+    start, end = get_period_bounds('monthly')
+    start_dt, end_dt = datetime.fromisoformat(start), datetime.fromisoformat(end)
+
+    assert start_dt.day == 1 and end_dt.day == 1
+    assert end_dt.time() == datetime.min.time()
+    assert (end_dt.year * 12 + end_dt.month) - (start_dt.year * 12 + start_dt.month) == 1
@@ -0,0 +1,35 @@
+from decimal import Decimal
+from uuid import uuid4
+
+from app.services.description_index import DescriptionIndex
+
+
+def test_complete_ranks_by_frequency_with_usual_category_and_amount():
+    food, transport = uuid4(), uuid4()
+    index = DescriptionIndex()
+    for description, amount, category in [
+        ("Biedronka", 45.0, food),
+        ("biedronka", 45.0, food),
+        ("Biedronka!", 60.0, transport),
+        ("Bilet MPK", 4.4, transport),
+        ("Bolt", 20.0, transport),
+        ("uber", 25.0, transport),
+    ]:
+        index.add(description, amount, category)
+
+    suggestions = index.complete("bi")
+    assert [s.description for s in suggestions] == ["Biedronka!", "Bilet MPK"]
+    assert (suggestions[0].count, suggestions[0].category_id, suggestions[0].amount) == (3, food, Decimal("45.0"))
+    assert [s.description for s in index.complete("B", limit=1)] == ["Biedronka!"]
+    assert index.complete("x") == [] and index.complete("  ") == []
+
+
+def test_remove_updates_counts_and_drops_unused_descriptions():
+    food = uuid4()
+    index = DescriptionIndex()
+    index.add("Lidl", 10.0, food)
+    index.add("Lidl", 12.0, food)
+    index.remove("Lidl", 10.0, food)
+    assert [(s.count, s.amount) for s in index.complete("li")] == [(1, Decimal("12.0"))]
+    index.remove("Lidl", 12.0, food)
+    assert index.complete("li") == [] and len(index) == 0
@@ -0,0 +1,91 @@
+import uuid
+
+from app.invalidation_channel import InvalidationChannel, _LocalVersions
+from app.schemas import CategorySuggestion
+from app.services import categories
+
+
+def test_publish_is_visible_to_other_workers(tmp_path):
+    """Two channel instances on one file behave like two gunicorn workers."""
+    path = str(tmp_path / "invalidation.sqlite3")
+    worker_a, worker_b = InvalidationChannel(path), InvalidationChannel(path)
+
+    assert worker_b.version("categories:u1") == 0
+    worker_a.publish("categories:u1")
+    worker_a.publish("categories:u1")
+    assert worker_b.version("categories:u1") == 2
+    assert worker_b.version("categories:u2") == 0
+
+
+def test_unreadable_channel_reports_unknown_version(tmp_path):
+    channel = InvalidationChannel(str(tmp_path / "invalidation.sqlite3"))
+    channel.path = str(tmp_path / "missing-dir" / "x.sqlite3")
+    assert channel.version("categories:u1") is None
+    channel.publish("categories:u1")  # logged, never raised
+
+
+def test_suggestion_cache_honours_other_workers_invalidations(tmp_path, monkeypatch):
+    path = str(tmp_path / "invalidation.sqlite3")
+    monkeypatch.setenv("CACHE_INVALIDATION_PATH", path)
+    user_id, key = uuid.uuid4(), ("biedronka", 2)
+    suggestions = [CategorySuggestion(id=uuid.uuid4(), name="Jedzenie", usage_count=3)]
+
+    version = categories._suggestion_cache_version(user_id)
+    categories._cache_suggestions(user_id, key, version, suggestions)
+    assert categories._get_cached_suggestions(user_id, key, categories._suggestion_cache_version(user_id)) == suggestions
+
+    # Another worker recategorizes an expense
+    InvalidationChannel(path).publish(f"suggestions:{user_id}")
+    assert categories._get_cached_suggestions(user_id, key, categories._suggestion_cache_version(user_id)) is None
+
+
+class _RacingCategoriesClient:
+    """`categories` table whose reads race with a write that invalidates the cache mid-query."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.names = ["Food"]
+        self.selects = 0
+        self.race = True
+
+    def table(self, _name):
+        return self
+
+    def select(self, _columns):
+        return self
+
+    def eq(self, _column, _value):
+        return self
+
+    def execute(self):
+        self.selects += 1
+        rows = [{'id': str(uuid.uuid4()), 'name': name, 'is_default': False} for name in self.names]
+        if self.race:
+            # A create commits and invalidates after this read's snapshot
+            self.race = False
+            self.names = self.names + ["Travel"]
+            categories.invalidate_category_cache(self.user_id)
+        return type("Response", (), {"data": rows})()
+
+
+def test_category_list_read_racing_a_write_is_not_cached_without_a_channel(monkeypatch):
+    monkeypatch.delenv("CACHE_INVALIDATION_PATH", raising=False)
+    user_id = uuid.uuid4()
+    service = categories.CategoryService.__new__(categories.CategoryService)
+    service.supabase = _RacingCategoriesClient(user_id)
+
+    assert [c.name for c in service.list_categories(user_id)] == ["Food"]
+    assert [c.name for c in service.list_categories(user_id)] == ["Food", "Travel"]
+    assert [c.name for c in service.list_categories(user_id)] == ["Food", "Travel"]
+    assert service.supabase.selects == 2
+
+
+def test_local_versions_never_return_to_a_version_after_eviction():
+    versions = _LocalVersions(max_keys=2)
+    before = versions.version("categories:u1")
+    versions.publish("categories:u1")
+    versions.publish("categories:u2")
+    versions.publish("categories:u3")  # evicts u1
+
+    assert versions.version("categories:u1") not in (before, None)
+    assert versions.version("categories:u3") != versions.version("categories:u2")
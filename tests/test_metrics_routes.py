@@ -0,0 +1,16 @@
+def test_metrics_are_disabled_without_a_token(client, auth_headers):
+    headers, _ = auth_headers()
+    assert client.get("/metrics", headers=headers).status_code == 404
+
+
+def test_metrics_need_the_monitoring_token_not_a_user_token(client, auth_headers, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "monitoring-secret")
+    headers, _ = auth_headers()
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=headers).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer monitoring-secret"})
+    assert response.status_code == 200
+    assert "circuit_breakers" in response.get_json()
@@ -4,10 +4,17 @@ import json
 import httpx
 import pytest
 
+from app.circuit_breaker import BreakerState, CircuitBreaker, CircuitOpenError
 from app.openrouter_service import (
     OpenRouterConfigError,
+    OpenRouterSchemaError,
     OpenRouterService,
+    OpenRouterUnavailableError,
+    UsageRecord,
+    _compiled_validator,
 )
+from app.model_router import ModelRouter
+from app.response_cache import ResponseCache
 
 
 @pytest.mark.asyncio
@@ -59,4 +66,419 @@ async def test_retry_on_429_then_success():
 def test_missing_api_key():
     """Service should raise config error without API key."""
     with pytest.raises(OpenRouterConfigError):
-        OpenRouterService(api_key=None, http_client=httpx.AsyncClient()) 
\ No newline at end of file
+        OpenRouterService(api_key=None, http_client=httpx.AsyncClient()) 
+
+@pytest.mark.asyncio
+async def test_stream_chat_completion_yields_deltas():
+    """Streaming should yield content deltas and stop at [DONE]."""
+    captured = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        captured["payload"] = json.loads(request.content)
+        events = [
+            ": OPENROUTER PROCESSING",
+            "",
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            "",
+            'data: {"choices": [{"delta": {"content": "[{\\"message\\": "}}]}',
+            "",
+            'data: {"choices": [{"delta": {"content": "\\"Hi\\"}]"}}]}',
+            "",
+            "data: [DONE]",
+            "",
+            'data: {"choices": [{"delta": {"content": "ignored"}}]}',
+            "",
+        ]
+        return httpx.Response(
+            200,
+            content="\n".join(events).encode(),
+            headers={"Content-Type": "text/event-stream"},
+        )
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(api_key="test", http_client=client)
+        deltas = [
+            delta
+            async for delta in service.stream_chat_completion([{"role": "user", "content": "Hi"}])
+        ]
+
+    assert captured["payload"]["stream"] is True
+    assert deltas == ['[{"message": ', '"Hi"}]']
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_when_open():
+    """After repeated 5xx the breaker opens and calls stop reaching the API."""
+    calls = {"count": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        calls["count"] += 1
+        return httpx.Response(503)
+
+    breaker = CircuitBreaker("test", min_calls=2, open_seconds=60)
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, max_retries=2, backoff_factor=0, circuit_breaker=breaker
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.chat_completion([{"role": "user", "content": "Hi"}])
+        assert breaker.state is BreakerState.open
+
+        with pytest.raises(OpenRouterUnavailableError):
+            await service.chat_completion([{"role": "user", "content": "Hi"}])
+
+    assert calls["count"] == 2
+    assert breaker.metrics()["rejected"] == 1
+
+
+def test_circuit_breaker_half_open_probe_closes_on_success():
+    """A successful probe after the cool-down closes the breaker again."""
+    now = {"t": 0.0}
+    breaker = CircuitBreaker("test", min_calls=2, open_seconds=10, clock=lambda: now["t"])
+    breaker.record_failure(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state is BreakerState.open
+
+    now["t"] = 11.0
+    breaker.before_call()  # probe admitted
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_success(0.2)
+    assert breaker.state is BreakerState.closed
+
+
+def test_circuit_breaker_adaptive_timeout():
+    """Timeout follows p95 latency of successful calls, capped by the default."""
+    breaker = CircuitBreaker("test", min_calls=5, timeout_multiplier=2.0, min_timeout=0.5)
+    assert breaker.timeout_for(30.0) == 30.0  # not enough samples yet
+    for latency in (1.0, 1.0, 1.0, 1.0, 2.0):
+        breaker.record_success(latency)
+    assert breaker.timeout_for(30.0) == 4.0
+    assert breaker.timeout_for(3.0) == 3.0
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_many_bounded_and_ordered():
+    """Batch keeps input order, reports per-item errors and caps concurrency."""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        if prompt == "bad":
+            return httpx.Response(400, json={"error": "bad request"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": prompt}}]})
+
+    prompts = ["a", "b", "bad", "c", "d", "e"]
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, backoff_factor=0, circuit_breaker=CircuitBreaker("test")
+        )
+        results = await service.chat_completion_many(
+            [{"messages": [{"role": "user", "content": p}]} for p in prompts],
+            max_concurrency=2,
+        )
+
+    assert state["peak"] == 2
+    assert [r.index for r in results] == list(range(len(prompts)))
+    assert not results[2].ok and isinstance(results[2].error, httpx.HTTPStatusError)
+    assert [r.response["choices"][0]["message"]["content"] for r in results if r.ok] == ["a", "b", "c", "d", "e"]
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_many_429_pauses_whole_batch():
+    """A 429 on one request delays the other requests of the batch too."""
+    sent_at = []
+    loop = asyncio.get_running_loop()
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        sent_at.append(loop.time())
+        if len(sent_at) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.2"})
+        await asyncio.sleep(0)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, backoff_factor=0, circuit_breaker=CircuitBreaker("test")
+        )
+        start = loop.time()
+        results = await service.chat_completion_many(
+            [{"messages": [{"role": "user", "content": str(i)}]} for i in range(3)],
+            max_concurrency=1,
+        )
+
+    assert all(r.ok for r in results)
+    assert all(t - start >= 0.2 for t in sent_at[1:])
+
+
+@pytest.mark.asyncio
+async def test_response_cache_hits_and_temperature_bypass(tmp_path):
+    """Deterministic requests are served from cache; sampled ones bypass it."""
+    calls = {"count": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        calls["count"] += 1
+        return httpx.Response(200, json={"choices": [{"message": {"content": "cached"}}]})
+
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.sqlite3"))
+    messages = [{"role": "user", "content": "Hi"}]
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, circuit_breaker=CircuitBreaker("test"), response_cache=cache
+        )
+        for _ in range(2):
+            await service.chat_completion(messages, model_params={"temperature": 0})
+        assert calls["count"] == 1
+
+        await service.chat_completion(messages, model_params={"temperature": 0.7})
+        await service.chat_completion(messages, model_params={"temperature": 0.7})
+        assert calls["count"] == 3  # bypassed twice
+
+        await service.chat_completion(messages, model_params={"temperature": 0.7}, cache=True)
+        await service.chat_completion(messages, model_params={"temperature": 0.7}, cache=True)
+        assert calls["count"] == 4  # opted in
+
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["bypassed"]) == (2, 2, 2)
+
+    # The on-disk tier survives a fresh (e.g. restarted) cache instance
+    restarted = ResponseCache(disk_path=str(tmp_path / "cache.sqlite3"))
+    key = restarted.make_key({"model": "openrouter/azure/gpt-4o", "messages": messages, "temperature": 0})
+    assert restarted.get(key)["choices"][0]["message"]["content"] == "cached"
+    assert restarted.metrics()["disk_hits"] == 1
+
+
+def test_validate_response_uses_compiled_validator_and_fenced_json():
+    """Strict validation reuses one validator per schema and accepts fenced JSON."""
+    schema = {
+        "type": "array",
+        "items": {"type": "object", "properties": {"message": {"type": "string"}}, "required": ["message"]},
+    }
+    response_format = {"type": "json_schema", "json_schema": {"strict": True, "schema": schema}}
+    service = OpenRouterService(api_key="test", http_client=httpx.AsyncClient())
+
+    fenced = '```json\n[{"message": "Hi"}]\n```'
+    service._validate_response({"choices": [{"message": {"content": fenced}}]}, response_format)
+
+    # An equal schema built separately shares the compiled validator
+    assert _compiled_validator(schema) is _compiled_validator(json.loads(json.dumps(schema)))
+
+    with pytest.raises(OpenRouterSchemaError):
+        service._validate_response({"choices": [{"message": {"content": '[{"msg": 1}]'}}]}, response_format)
+
+
+@pytest.mark.asyncio
+async def test_model_router_falls_back_on_5xx():
+    """A 5xx from the preferred model is retried once on the next candidate."""
+    models_seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        model = json.loads(request.content)["model"]
+        models_seen.append(model)
+        if model == "primary":
+            return httpx.Response(502)
+        return httpx.Response(200, json={"choices": [{"message": {"content": model}}]})
+
+    router = ModelRouter(["primary", "secondary"])
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, backoff_factor=0,
+            circuit_breaker=CircuitBreaker("test"), model_router=router,
+        )
+        resp = await service.chat_completion([{"role": "user", "content": "Hi"}])
+
+    assert resp["choices"][0]["message"]["content"] == "secondary"
+    assert models_seen == ["primary", "secondary"]
+    stats = router.stats()
+    assert stats["primary"]["failures"] == 1 and stats["secondary"]["calls"] == 1
+
+
+def test_model_router_prefers_faster_healthy_model():
+    """Candidates are ordered by EWMA latency; failing models drop to the end."""
+    now = {"t": 0.0}
+    router = ModelRouter(["a", "b", "c"], alpha=0.5, cooldown_seconds=10, clock=lambda: now["t"])
+    router.record_success("a", 2.0)
+    router.record_success("b", 0.5)
+    router.record_success("c", 1.0)
+    assert router.candidates() == ["b", "c", "a"]
+
+    router.record_failure("b", 5.0)
+    assert router.candidates() == ["c", "a", "b"]
+
+    now["t"] = 11.0  # cool-down over, "b" gets another chance
+    assert router.candidates()[0] == "b"
+
+
+@pytest.mark.asyncio
+async def test_usage_recorder_receives_tokens_from_both_call_paths():
+    """Usage blocks of plain and streamed responses reach the recorder."""
+    records = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        payload = json.loads(request.content)
+        usage = {"prompt_tokens": 12, "completion_tokens": 5, "cost": 0.0001}
+        if not payload.get("stream"):
+            return httpx.Response(
+                200, json={"model": "routed/model", "usage": usage, "choices": [{"message": {"content": "ok"}}]}
+            )
+        assert payload["usage"] == {"include": True}
+        events = [
+            'data: {"choices": [{"delta": {"content": "ok"}}]}',
+            "data: " + json.dumps({"choices": [], "usage": usage}),
+            "data: [DONE]",
+        ]
+        return httpx.Response(200, content="\n\n".join(events).encode())
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", model_name="default/model", http_client=client,
+            circuit_breaker=CircuitBreaker("test"), usage_recorder=records.append,
+        )
+        await service.chat_completion([{"role": "user", "content": "Hi"}])
+        deltas = [d async for d in service.stream_chat_completion([{"role": "user", "content": "Hi"}])]
+
+    assert deltas == ["ok"]
+    assert [(r.model, r.prompt_tokens, r.completion_tokens, r.cost, r.streamed) for r in records] == [
+        ("routed/model", 12, 5, 0.0001, False),
+        ("default/model", 12, 5, 0.0001, True),
+    ]
+    assert all(isinstance(r, UsageRecord) and r.latency >= 0 for r in records)
+
+
+@pytest.mark.asyncio
+async def test_response_cache_is_keyed_on_the_routed_model(tmp_path):
+    """A response from a fallback model is cached under that model, not the primary."""
+    models_seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        model = json.loads(request.content)["model"]
+        models_seen.append(model)
+        if model == "primary":
+            return httpx.Response(502)
+        return httpx.Response(200, json={"choices": [{"message": {"content": model}}]})
+
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.sqlite3"))
+    messages = [{"role": "user", "content": "Hi"}]
+    router = ModelRouter(["primary", "secondary"], error_threshold=0.1)
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", model_name="primary", http_client=client, backoff_factor=0,
+            circuit_breaker=CircuitBreaker("test"), model_router=router, response_cache=cache,
+        )
+        await service.chat_completion(messages, model_params={"temperature": 0})
+        # "primary" is cooling down, so "secondary" is tried first and its answer is cached
+        resp = await service.chat_completion(messages, model_params={"temperature": 0})
+
+    assert resp["choices"][0]["message"]["content"] == "secondary"
+    assert models_seen == ["primary", "secondary"]
+    assert cache.get(cache.make_key({"model": "primary", "messages": messages, "temperature": 0})) is None
+
+
+@pytest.mark.asyncio
+async def test_model_router_falls_back_on_429_and_backs_off_on_last_model():
+    """A rate-limited model hands over to the next one; the last one retries with back-off."""
+    models_seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        model = json.loads(request.content)["model"]
+        models_seen.append(model)
+        if model == "primary" or models_seen.count("secondary") == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": model}}]})
+
+    router = ModelRouter(["primary", "secondary"])
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, backoff_factor=0, max_retries=2,
+            circuit_breaker=CircuitBreaker("test"), model_router=router,
+        )
+        resp = await service.chat_completion([{"role": "user", "content": "Hi"}])
+
+    assert resp["choices"][0]["message"]["content"] == "secondary"
+    assert models_seen == ["primary", "secondary", "secondary"]
+    assert router.stats()["primary"]["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_after_429_does_not_wait_for_the_rate_limited_model():
+    """Retry-After pauses only the model that returned it."""
+    models_seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        model = json.loads(request.content)["model"]
+        models_seen.append(model)
+        if model == "primary":
+            return httpx.Response(429, headers={"Retry-After": "30"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": model}}]})
+
+    loop = asyncio.get_running_loop()
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, backoff_factor=0,
+            circuit_breaker=CircuitBreaker("test"), model_router=ModelRouter(["primary", "secondary"]),
+        )
+        start = loop.time()
+        resp = await service.chat_completion([{"role": "user", "content": "Hi"}])
+
+    assert resp["choices"][0]["message"]["content"] == "secondary"
+    assert loop.time() - start < 1
+    assert models_seen == ["primary", "secondary"]
+    assert service._rate_limited_until["primary"] - loop.time() > 25
+    assert "secondary" not in service._rate_limited_until
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_on_429_and_backs_off_on_last_model():
+    """Before the stream starts, a 429 is handled like in `chat_completion`."""
+    models_seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        model = json.loads(request.content)["model"]
+        models_seen.append(model)
+        if model == "primary" or models_seen.count("secondary") == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        events = [f'data: {{"choices": [{{"delta": {{"content": "{model}"}}}}]}}', "data: [DONE]"]
+        return httpx.Response(200, content="\n\n".join(events).encode())
+
+    router = ModelRouter(["primary", "secondary"])
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, backoff_factor=0, max_retries=2,
+            circuit_breaker=CircuitBreaker("test"), model_router=router,
+        )
+        deltas = [d async for d in service.stream_chat_completion([{"role": "user", "content": "Hi"}])]
+
+    assert deltas == ["secondary"]
+    assert models_seen == ["primary", "secondary", "secondary"]
+    assert router.stats()["primary"]["failures"] == 1
+    assert set(service._rate_limited_until) == {"primary", "secondary"}
+
+
+@pytest.mark.asyncio
+async def test_stream_raises_when_every_attempt_is_rate_limited():
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: D401
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = OpenRouterService(
+            api_key="test", http_client=client, backoff_factor=0, max_retries=2,
+            circuit_breaker=CircuitBreaker("test"),
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            [d async for d in service.stream_chat_completion([{"role": "user", "content": "Hi"}])]
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+def _run_concurrently(flight: SingleFlight, fn, n: int):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(flight.do("key", fn))
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_execution():
+    """Callers arriving while the call runs get its result without re-running it."""
+    calls = {"count": 0}
+    flight = SingleFlight("test")
+
+    def slow():
+        calls["count"] += 1
+        time.sleep(0.1)
+        return {"total": 42}
+
+    results, errors = _run_concurrently(flight, slow, 5)
+
+    assert not errors
+    assert calls["count"] == 1
+    assert all(r is results[0] for r in results)
+    assert flight.metrics() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+    # Nothing is cached once the call has finished
+    flight.do("key", slow)
+    assert calls["count"] == 2
+
+
+def test_exception_propagates_to_all_waiters():
+    flight = SingleFlight("test")
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    results, errors = _run_concurrently(flight, failing, 3)
+
+    assert not results
+    assert len(errors) == 3 and all(isinstance(e, ValueError) for e in errors)
+    with pytest.raises(ValueError):
+        flight.do("key", failing)
@@ -0,0 +1,34 @@
+import time
+
+import jwt
+import pytest
+
+from app.token_cache import TokenVerifier
+
+
+def test_verified_tokens_are_cached_until_exp():
+    verifier = TokenVerifier("secret")
+    token = jwt.encode({"user_id": "u1", "exp": int(time.time()) + 1}, "secret", algorithm="HS256")
+
+    assert verifier.verify(token)["user_id"] == "u1"
+    assert verifier.verify(token)["user_id"] == "u1"
+    assert (verifier.metrics()["hits"], verifier.metrics()["misses"]) == (1, 1)
+
+    time.sleep(1.1)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(token)
+    assert verifier.metrics()["entries"] == 0
+
+
+def test_invalid_tokens_are_never_cached():
+    verifier = TokenVerifier("secret", max_entries=1)
+    forged = jwt.encode({"user_id": "u1"}, "other", algorithm="HS256")
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidSignatureError):
+            verifier.verify(forged)
+    assert verifier.metrics()["misses"] == 2
+
+    # Bounded: the oldest token is evicted
+    for user_id in ("a", "b"):
+        verifier.verify(jwt.encode({"user_id": user_id}, "secret", algorithm="HS256"))
+    assert verifier.metrics()["entries"] == 1